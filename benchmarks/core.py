@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Scan time, filter latency, thumbnail and metadata throughput and memory of the core library.
+
+Usage: python3 benchmarks/core.py [--sizes 1000,10000,100000] [--thumbs N] [--json FILE]
+
+Builds synthetic folders of images and videos (small PNGs and placeholder
+videos; scanning and searching never decode them) and drives the
+GTK-independent ``core`` package the way the gallery does, without a
+display. Thumbnail throughput is measured on ``--thumbs`` real images
+through ``ThumbnailScheduler`` and the shared worker pool, metadata
+indexing (header parsing, then manifest hits) on the same images. Caches live in
+a temporary $HOME, so every run starts cold. ``--json`` appends one
+record per run to FILE, to compare releases.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import queue
+import resource
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+
+# Keep the manifest and pack of this run out of the real cache
+os.environ["HOME"] = tempfile.mkdtemp(prefix="wallpygui-bench-")
+atexit.register(shutil.rmtree, os.environ["HOME"], True)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.constants import APP_VERSION
+from core.library import LibraryModel
+from core.metadata import media_index
+from core.thumbnails import ThumbnailScheduler
+
+WORDS = ["sunset", "mountain", "forest", "ocean", "city", "night", "aurora", "desert",
+         "river", "snow", "neon", "galaxy", "autumn", "lake", "street", "abstract"]
+QUERIES = ["s", "su", "sun", "suns", "sunse", "sunset", "mtn", "neon city", "glxy"]
+
+
+def make_png(width: int, height: int) -> bytes:
+    """A gradient PNG written with zlib alone."""
+    rows = b"".join(
+        b"\x00" + bytes(v for x in range(width) for v in (x * 255 // width, y * 255 // height, 128))
+        for y in range(height)
+    )
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+
+def make_folder(directory: str, count: int, video_ratio: float, png: bytes) -> None:
+    os.makedirs(directory)
+    videos = int(count * video_ratio)
+    now = time.time()
+    for i in range(count):
+        name = f"{WORDS[i % len(WORDS)]}_{WORDS[(i // len(WORDS)) % len(WORDS)]}_{i:06d}"
+        path = os.path.join(directory, name + (".mp4" if i < videos else ".png"))
+        with open(path, "wb") as f:
+            f.write(b"" if i < videos else png)
+        os.utime(path, (now - i, now - i))
+
+
+def bench_scan(directory: str, repeat: int = 3) -> tuple[LibraryModel, float]:
+    best = float("inf")
+    model = None
+    for _ in range(repeat):
+        model = LibraryModel()
+        start = time.perf_counter()
+        model.load(directory, background=False)
+        best = min(best, time.perf_counter() - start)
+    return model, best
+
+
+def bench_filter(model: LibraryModel) -> dict:
+    latencies = []
+    for _ in range(3):
+        for query in QUERIES:
+            start = time.perf_counter()
+            model.search(query)
+            model.visible()
+            latencies.append(time.perf_counter() - start)
+        model.search("")
+    return {"filter_median_ms": statistics.median(latencies) * 1000,
+            "filter_max_ms": max(latencies) * 1000}
+
+
+def bench_memory(directory: str) -> dict:
+    tracemalloc.start()
+    model = LibraryModel()
+    model.load(directory, background=False)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"bytes_per_item": current / max(1, len(model)), "peak_mib": peak / 2**20}
+
+
+def bench_thumbnails(directory: str) -> dict:
+    # Results reach the "owner" thread through a queue, like the UI batcher
+    results: queue.Queue = queue.Queue()
+    model = LibraryModel(dispatch=lambda fn, *args: results.put((fn, args)))
+    model.load(directory, background=False)
+    while not results.empty():
+        fn, args = results.get()
+        fn(*args)
+    scheduler = ThumbnailScheduler(model)
+    items = [item for item in model.items.values() if not item.thumbnail]
+    start = time.perf_counter()
+    for item in items:
+        scheduler.request(item)
+    while scheduler.generated + scheduler.failed < len(items):
+        fn, args = results.get(timeout=60)
+        fn(*args)
+    elapsed = time.perf_counter() - start
+    return {"thumbs_per_s": len(items) / elapsed, "thumbs_failed": scheduler.failed}
+
+
+def bench_metadata(directory: str) -> dict:
+    entries = [(entry.path, entry.stat()) for entry in os.scandir(directory)]
+    result = {}
+    for name in ("metadata_cold_per_s", "metadata_warm_per_s"):
+        start = time.perf_counter()
+        media_index(entries)
+        result[name] = len(entries) / (time.perf_counter() - start)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--video-ratio", type=float, default=0.1)
+    parser.add_argument("--thumbs", type=int, default=200)
+    parser.add_argument("--json", help="append results to this JSON-lines file")
+    args = parser.parse_args()
+
+    png = make_png(640, 360)
+    record = {"version": APP_VERSION, "time": time.time(), "results": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        thumbs_dir = os.path.join(tmp, "thumbs")
+        make_folder(thumbs_dir, args.thumbs, 0.0, png)
+        record["results"].update(bench_thumbnails(thumbs_dir))
+        print(f"thumbnails: {record['results']['thumbs_per_s']:8.1f} per second "
+              f"({args.thumbs} images, {record['results']['thumbs_failed']} failed)")
+        record["results"].update(bench_metadata(thumbs_dir))
+        print(f"metadata:   {record['results']['metadata_cold_per_s']:8.1f} per second cold, "
+              f"{record['results']['metadata_warm_per_s']:8.1f} warm")
+
+        for size in (int(s) for s in args.sizes.split(",")):
+            directory = os.path.join(tmp, f"folder_{size}")
+            make_folder(directory, size, args.video_ratio, png)
+            model, scan = bench_scan(directory)
+            result = {"scan_ms": scan * 1000, **bench_filter(model), **bench_memory(directory)}
+            record["results"][str(size)] = result
+            print(f"{size:>7} files: scan {result['scan_ms']:8.1f} ms, "
+                  f"filter {result['filter_median_ms']:6.2f} ms median "
+                  f"/ {result['filter_max_ms']:6.2f} ms max, "
+                  f"{result['bytes_per_item']:6.0f} B per item, "
+                  f"peak {result['peak_mib']:6.1f} MiB")
+    print(f"max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+    if args.json:
+        with open(args.json, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
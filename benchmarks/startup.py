@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Time from launch to the first frame and the first visible thumbnail.
+
+Usage: python3 benchmarks/startup.py [--dir DIR] [--runs N] [--cold]
+
+Starts the app N times on DIR (or a folder of synthetic images) with
+WALLPYGUI_STARTUP_BENCH set, which makes it print its startup marks and
+quit once the first thumbnail is shown. Reports the median of each mark
+and the slowest imports from ``python -X importtime``. Runs never touch
+the real $HOME: by default they share a temporary one that a warm-up run
+fills first; --cold gives every run an empty one instead.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MARK_RE = re.compile(r"\[wallpygui\] startup: (.+) ([\d.]+) ms$")
+IMPORT_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def make_images(directory: Path, count: int) -> None:
+    import gi
+    gi.require_version("GdkPixbuf", "2.0")
+    from gi.repository import GdkPixbuf
+    for i in range(count):
+        pixbuf = GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB, False, 8, 1920, 1080)
+        pixbuf.fill((i * 0x01F3A7C5) & 0xFFFFFF00 | 0xFF)
+        pixbuf.savev(str(directory / f"img_{i:03d}.jpg"), "jpeg", [], [])
+
+
+def run_once(directory: str, home: str) -> tuple[dict, list]:
+    # wallpygui.py takes WALLPYGUI_T0 out of its environment and starts its clock there
+    env = dict(os.environ, HOME=home, WALLPYGUI_STARTUP_BENCH=directory,
+               WALLPYGUI_T0=repr(time.time()))
+    proc = subprocess.run([sys.executable, "-X", "importtime", str(ROOT / "wallpygui.py")],
+                          env=env, capture_output=True, text=True, timeout=60)
+    marks = {}
+    for line in proc.stdout.splitlines():
+        match = MARK_RE.match(line.strip())
+        if match:
+            marks[match.group(1)] = float(match.group(2))
+    imports = []
+    for line in proc.stderr.splitlines():
+        match = IMPORT_RE.match(line)
+        if match and len(match.group(3)) == 1:
+            # Top-level imports only; nested ones are part of their parent
+            imports.append((int(match.group(2)), match.group(4)))
+    return marks, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", help="folder to open (default: synthetic images)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--count", type=int, default=60, help="synthetic images to create")
+    parser.add_argument("--cold", action="store_true", help="start every run with empty caches")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.dir
+        if directory is None:
+            directory = os.path.join(tmp, "wallpapers")
+            os.mkdir(directory)
+            make_images(Path(directory), args.count)
+        directory = os.path.abspath(directory)
+
+        # Caches and state of the warm runs, filled by a warm-up run
+        warm_home = None
+        if not args.cold:
+            warm_home = tempfile.mkdtemp(dir=tmp)
+            run_once(directory, warm_home)
+
+        results: dict[str, list[float]] = {}
+        imports: dict[str, list[int]] = {}
+        for i in range(args.runs):
+            home = tempfile.mkdtemp(dir=tmp) if args.cold else warm_home
+            marks, top_level = run_once(directory, home)
+            if "first thumbnail" not in marks:
+                print(f"run {i + 1}: no thumbnail shown, skipped")
+                continue
+            for name, ms in marks.items():
+                results.setdefault(name, []).append(ms)
+            for us, name in top_level:
+                imports.setdefault(name, []).append(us)
+
+    if not results:
+        sys.exit("no run reached the first thumbnail")
+    print(f"{'cold' if args.cold else 'warm'} start, median of {len(results['first thumbnail'])} runs:")
+    for name, values in sorted(results.items(), key=lambda kv: statistics.median(kv[1])):
+        print(f"  {name:>16}: {statistics.median(values):8.1f} ms")
+    print("slowest top-level imports (cumulative):")
+    slowest = sorted(((statistics.median(v), n) for n, v in imports.items()), reverse=True)
+    for us, name in slowest[:10]:
+        print(f"  {name:>32}: {us / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
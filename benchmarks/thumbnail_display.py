@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Main-thread cost of putting a thumbnail on screen, before and after.
+
+Usage: python3 benchmarks/thumbnail_display.py [--count N]
+
+"png" is what the gallery used to do on the main thread (decode a PNG
+file per thumbnail), "pack decode" is reading and inflating the pack
+record inline, and "swap" is what is left on the main thread now that
+workers hand over finished textures: a cache lookup. Run the app with
+WALLPYGUI_PERF=1 to see the same number measured live after each load.
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import gi
+gi.require_version("Gdk", "4.0")
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import Gdk, GdkPixbuf, GLib
+
+from utils.constants import THUMB_WIDTH, THUMB_HEIGHT
+from utils.texture_cache import TextureCache, texture_from_thumbnail
+from core.thumbnail_pack import ThumbnailPack
+
+
+def make_pixels(i: int) -> bytes:
+    row = bytes((x + i) % 256 for x in range(THUMB_WIDTH * 3))
+    return b"".join(row[y % 7:] + row[:y % 7] for y in range(THUMB_HEIGHT))
+
+
+def per_item(label: str, count: int, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    us = (time.perf_counter() - start) / count * 1e6
+    print(f"{label:>12}: {us:8.1f} us per thumbnail on the main thread")
+    return us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pack = ThumbnailPack(Path(tmp, "thumbnails.pack"))
+        keys, pngs = [], []
+        for i in range(args.count):
+            pixels = make_pixels(i)
+            key = hashlib.sha256(str(i).encode()).hexdigest()
+            png = Path(tmp, f"{key}.png")
+            GdkPixbuf.Pixbuf.new_from_bytes(
+                GLib.Bytes.new(pixels), GdkPixbuf.Colorspace.RGB, False, 8,
+                THUMB_WIDTH, THUMB_HEIGHT, THUMB_WIDTH * 3,
+            ).savev(str(png), "png", [], [])
+            pack.put(key, THUMB_WIDTH, THUMB_HEIGHT, 3, pixels)
+            keys.append(key)
+            pngs.append(png)
+
+        cache = TextureCache(budget_bytes=1 << 30)
+        for key in keys:
+            # What the worker threads do ahead of time
+            cache.put(key, pack.get(key))
+
+        png = per_item("png", args.count,
+                       lambda: [Gdk.Texture.new_from_filename(str(p)) for p in pngs])
+        per_item("pack decode", args.count,
+                 lambda: [texture_from_thumbnail(pack.get(k)) for k in keys])
+        swap = per_item("swap", args.count, lambda: [cache.lookup(k) for k in keys])
+        print(f"main-thread time per thumbnail reduced {png / swap:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
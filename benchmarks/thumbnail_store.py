@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Compare reading thumbnails from one PNG per file against the pack file.
+
+Usage: python3 benchmarks/thumbnail_store.py [--count N]
+
+Both stores are written to a temporary directory and the page cache is
+not dropped, so this measures the per-thumbnail decode and syscall cost
+rather than cold disk seeks (which favour the pack even more).
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import gi
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import GdkPixbuf, GLib
+
+from utils.constants import THUMB_WIDTH, THUMB_HEIGHT
+from core.thumbnail_pack import ThumbnailPack
+
+
+def make_pixels(i: int) -> bytes:
+    # Gradients compress like real thumbnails; pure noise would not
+    row = bytes((x + i) % 256 for x in range(THUMB_WIDTH * 3))
+    return b"".join(row[y % 7:] + row[:y % 7] for y in range(THUMB_HEIGHT))
+
+
+def timed(label: str, count: int, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>12}: {count} thumbnails in {elapsed * 1000:.1f} ms "
+          f"({count / elapsed:.0f}/s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        png_dir = Path(tmp, "png")
+        png_dir.mkdir()
+        pack = ThumbnailPack(Path(tmp, "thumbnails.pack"))
+        keys, paths = [], []
+        for i in range(args.count):
+            pixels = make_pixels(i)
+            key = hashlib.sha256(str(i).encode()).hexdigest()
+            path = png_dir / f"{key}.png"
+            GdkPixbuf.Pixbuf.new_from_bytes(
+                GLib.Bytes.new(pixels), GdkPixbuf.Colorspace.RGB, False, 8,
+                THUMB_WIDTH, THUMB_HEIGHT, THUMB_WIDTH * 3,
+            ).savev(str(path), "png", [], [])
+            pack.put(key, THUMB_WIDTH, THUMB_HEIGHT, 3, pixels)
+            keys.append(key)
+            paths.append(path)
+
+        png_bytes = sum(p.stat().st_size for p in paths)
+        print(f"png files: {png_bytes // 1024} KiB, pack: {pack.stats()['file_bytes'] // 1024} KiB")
+        png = timed("png", args.count,
+                    lambda: [GdkPixbuf.Pixbuf.new_from_file(str(p)) for p in paths])
+        single = timed("pack get", args.count, lambda: [pack.get(k) for k in keys])
+        batched = timed("pack get_many", args.count, lambda: pack.get_many(keys))
+        print(f"speedup: {png / single:.1f}x (get), {png / batched:.1f}x (get_many)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Compare thumbnail throughput of the in-process decoder and ffmpeg.
+
+Usage: python3 benchmarks/thumbnails.py [--count N] [--size WxH]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import gi
+gi.require_version("GdkPixbuf", "2.0")
+from gi.repository import GdkPixbuf, GLib
+
+from utils.constants import THUMB_WIDTH, THUMB_HEIGHT
+from core.thumbnailer import get_thumbnailer
+from core.thumbnails import ffmpeg_thumbnail
+
+
+def make_images(directory: Path, count: int, width: int, height: int) -> list[Path]:
+    """Write ``count`` noisy JPEGs and PNGs so decoders can't shortcut."""
+    files = []
+    rowstride = width * 3
+    for i in range(count):
+        data = GLib.Bytes.new(os.urandom(64) * (rowstride * height // 64 + 1))
+        pixbuf = GdkPixbuf.Pixbuf.new_from_bytes(
+            data, GdkPixbuf.Colorspace.RGB, False, 8, width, height, rowstride
+        )
+        fmt = "jpeg" if i % 2 == 0 else "png"
+        path = directory / f"img_{i:04d}.{'jpg' if fmt == 'jpeg' else 'png'}"
+        pixbuf.savev(str(path), fmt, [], [])
+        files.append(path)
+    return files
+
+
+def run(label: str, render, files: list[Path]) -> float:
+    start = time.perf_counter()
+    for path in files:
+        if not render(path, THUMB_WIDTH, THUMB_HEIGHT):
+            raise RuntimeError(f"{label} failed on {path}")
+    elapsed = time.perf_counter() - start
+    rate = len(files) / elapsed
+    print(f"{label:>10}: {len(files)} thumbnails in {elapsed:.2f}s ({rate:.1f}/s)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=40)
+    parser.add_argument("--size", default="3840x2160")
+    args = parser.parse_args()
+    width, height = map(int, args.size.lower().split("x"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = make_images(Path(tmp), args.count, width, height)
+
+        thumbnailer = get_thumbnailer()
+        in_process = run("pixbuf", thumbnailer.render, files)
+        ffmpeg = run("ffmpeg", ffmpeg_thumbnail, files)
+        print(f"speedup: {in_process / ffmpeg:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Command-line interface for tasks that don't need the GTK window."""
+
+import argparse
+import json
+import os
+import time
+from typing import Any, Optional
+
+from utils.ipc import DaemonError, DaemonUnavailable, request
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def cmd_cache(args) -> int:
+    from utils.cache_gc import cache_stats, collect_garbage
+    from utils.storage import StorageManager
+
+    if args.action == "gc":
+        report = collect_garbage(StorageManager.load_config())
+        print(f"orphans removed: {report['orphans']}")
+        print(f"expired:         {report['expired']}")
+        print(f"evicted (LRU):   {report['evicted']}")
+        print(f"freed:           {_format_bytes(report['freed_bytes'])}")
+        return 0
+
+    stats = cache_stats()
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return 0
+    manifest = stats["manifest"]
+    print(f"thumbnails:    {stats['thumbnails']['files']} entries, "
+          f"{_format_bytes(stats['thumbnails']['bytes'])} "
+          f"({_format_bytes(stats['thumbnails']['dead_bytes'])} reclaimable)")
+    print(f"scaled videos: {stats['scaled_videos']['files']} files, "
+          f"{_format_bytes(stats['scaled_videos']['bytes'])}")
+    print(f"manifest:      {manifest['entries']} entries ({manifest['failed']} failed)")
+    print(f"hit rate:      {manifest['lifetime_hit_rate']:.1%}")
+    return 0
+
+
+def _call(cmd: str, **args) -> Any:
+    """Run ``cmd`` in the daemon, or in-process when none is running."""
+    try:
+        return request(cmd, **args)
+    except DaemonUnavailable:
+        from daemon import WallpaperService
+        return WallpaperService().handle(cmd, args)
+
+
+def cmd_wallpaper(args) -> int:
+    kwargs = {"resize": args.resize} if args.resize else {}
+    if args.command == "set":
+        # The daemon has its own working directory
+        kwargs["path"] = os.path.abspath(args.path)
+    try:
+        print(_call(args.command, **kwargs))
+    except (DaemonError, OSError, LookupError, ValueError) as e:
+        print(f"wallpygui: {e}")
+        return 1
+    return 0
+
+
+def cmd_status(args) -> int:
+    start = time.perf_counter()
+    try:
+        status = request("status")
+    except DaemonUnavailable:
+        print("daemon: not running")
+        return 1
+    except (DaemonError, OSError) as e:
+        print(f"wallpygui: {e}")
+        return 1
+    round_trip = (time.perf_counter() - start) * 1000
+    if args.json:
+        print(json.dumps(status, indent=2))
+        return 0
+    print(f"daemon:     pid {status['pid']}, up {status['uptime'] / 60:.0f} min")
+    print(f"directory:  {status['directory']} ({status['wallpapers']} wallpapers)")
+    print(f"current:    {status['current'] or '-'}")
+    outputs = ", ".join(f"{o['name']} {o['width']}x{o['height']}@{o['scale']:g}x"
+                        for o in status["outputs"])
+    print(f"outputs:    {outputs or '-'}")
+    print(f"resize:     {status['resize']}")
+    _print_rotation(status["rotation"])
+    print(f"last apply: {status['last_apply_ms']:.0f} ms")
+    for step, ms in status["last_apply_steps"].items():
+        print(f"  {step:<16}{ms:8.1f} ms")
+    print(f"round trip: {round_trip:.1f} ms")
+    return 0
+
+
+def cmd_daemon(args) -> int:
+    if args.action == "stop":
+        try:
+            request("stop")
+        except DaemonUnavailable:
+            print("daemon: not running")
+            return 1
+        return 0
+    from daemon import run_daemon
+    return run_daemon(args.dir, rotate=args.rotate)
+
+
+def cmd_rotate(args) -> int:
+    kwargs = {"action": args.action}
+    if args.interval:
+        kwargs["interval"] = args.interval
+    if args.shuffle is not None:
+        kwargs["shuffle"] = args.shuffle
+    try:
+        status = request("rotate", **kwargs)
+    except DaemonUnavailable:
+        print("wallpygui: rotation runs in the daemon; start it with `wallpygui daemon --rotate`")
+        return 1
+    except DaemonError as e:
+        print(f"wallpygui: {e}")
+        return 1
+    _print_rotation(status)
+    return 0
+
+
+def _print_rotation(rotation: dict) -> None:
+    if not rotation["running"]:
+        print("rotation:   off")
+        return
+    order = "shuffle" if rotation["shuffle"] else "sequential"
+    print(f"rotation:   every {rotation['interval']:.0f}s ({order}), "
+          f"next in {rotation['next_in']:.0f}s")
+
+
+def cmd_prescale(args) -> int:
+    import threading
+    from utils.prescale import VideoPrescaler
+    from utils.storage import StorageManager
+
+    config = StorageManager.load_config()
+    finished = threading.Event()
+
+    def progress(p):
+        if p.total:
+            print(f"\r[{p.done}/{p.total}] {p.current} {p.fraction:.0%}\033[K", end="", flush=True)
+        if p.finished:
+            finished.set()
+
+    prescaler = VideoPrescaler(jobs=args.jobs or config.get("prescale_jobs", 1),
+                               on_progress=progress)
+    prescaler.start(os.path.abspath(args.dir), recursive=config.get("recursive_scan", False),
+                    max_depth=config.get("scan_max_depth", 3))
+    try:
+        finished.wait()
+    except KeyboardInterrupt:
+        prescaler.cancel()
+        print()
+        return 130
+    print()
+    return 0
+
+
+def cmd_duplicates(args) -> int:
+    from core.duplicates import find_library_duplicates
+    from core.library import LibraryModel
+    from utils.storage import StorageManager
+
+    config = StorageManager.load_config()
+    model = LibraryModel(recursive=config.get("recursive_scan", False),
+                         max_depth=config.get("scan_max_depth", 3))
+    model.load(os.path.abspath(args.dir), background=False)
+    distance = args.distance if args.distance is not None else config.get("duplicate_distance", 6)
+    try:
+        groups = find_library_duplicates(model.thumbnail_snapshot(), distance)
+    except ValueError as e:
+        print(f"wallpygui: {e}")
+        return 1
+    if args.json:
+        print(json.dumps(groups, indent=2))
+        return 0
+    for group in groups:
+        print("\n".join(group) + "\n")
+    print(f"{len(groups)} groups, {sum(len(group) - 1 for group in groups)} redundant files")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="wallpygui", description="GTK4 wallpaper manager")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write tracing spans to FILE (.json: Chrome trace, else JSON lines)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    cache = sub.add_parser("cache", help="inspect or clean the thumbnail and video caches")
+    cache.add_argument("action", choices=("stats", "gc"), nargs="?", default="stats")
+    cache.add_argument("--json", action="store_true", help="print stats as JSON")
+    cache.set_defaults(func=cmd_cache)
+
+    set_cmd = sub.add_parser("set", help="apply a wallpaper")
+    set_cmd.add_argument("path")
+    for name, text in (("random", "apply a random wallpaper from the current folder"),
+                       ("next", "apply the next (older) wallpaper in the current folder"),
+                       ("prev", "apply the previous (newer) wallpaper in the current folder")):
+        sub.add_parser(name, help=text)
+    for name in ("set", "random", "next", "prev"):
+        command = sub.choices[name]
+        command.add_argument("--resize", choices=("crop", "fit", "stretch"),
+                             help="resize mode (default: the last one used)")
+        command.set_defaults(func=cmd_wallpaper)
+
+    prescale = sub.add_parser("prescale", help="scale a folder's videos to the output size now")
+    prescale.add_argument("dir", nargs="?", default=".")
+    prescale.add_argument("--jobs", type=int, help="parallel encodes (default: prescale_jobs)")
+    prescale.set_defaults(func=cmd_prescale)
+
+    duplicates = sub.add_parser("duplicates", help="list near-duplicate wallpapers in a folder")
+    duplicates.add_argument("dir", nargs="?", default=".")
+    duplicates.add_argument("--distance", type=int,
+                            help="max differing hash bits (default: duplicate_distance)")
+    duplicates.add_argument("--json", action="store_true", help="print groups as JSON")
+    duplicates.set_defaults(func=cmd_duplicates)
+
+    rotate = sub.add_parser("rotate", help="control timed wallpaper rotation in the daemon")
+    rotate.add_argument("action", choices=("start", "stop", "status"), nargs="?",
+                        default="status")
+    rotate.add_argument("--interval", type=float, help="seconds between wallpapers")
+    order = rotate.add_mutually_exclusive_group()
+    order.add_argument("--shuffle", dest="shuffle", action="store_true", default=None)
+    order.add_argument("--sequential", dest="shuffle", action="store_false")
+    rotate.set_defaults(func=cmd_rotate)
+
+    status = sub.add_parser("status", help="show the daemon's state")
+    status.add_argument("--json", action="store_true", help="print status as JSON")
+    status.set_defaults(func=cmd_status)
+
+    daemon = sub.add_parser("daemon", help="run the background daemon in the foreground")
+    daemon.add_argument("action", choices=("start", "stop"), nargs="?", default="start")
+    daemon.add_argument("--dir", help="wallpaper folder (default: the current wallpaper's)")
+    daemon.add_argument("--rotate", action="store_true", help="start rotating wallpapers")
+    daemon.set_defaults(func=cmd_daemon)
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.trace:
+        from utils import tracing
+        tracing.enable(args.trace)
+    return args.func(args)
@@ -27,6 +27,14 @@ class FooterBar(Gtk.Box):
         self.selected_label.set_max_width_chars(50)
         self.append(self.selected_label)
 
+        self.status_label = Gtk.Label()
+        self.status_label.set_css_classes(["meta-label"])
+        self.status_label.set_valign(Gtk.Align.CENTER)
+        self.status_label.set_ellipsize(Pango.EllipsizeMode.MIDDLE)
+        self.status_label.set_max_width_chars(40)
+        self.status_label.set_visible(False)
+        self.append(self.status_label)
+
         mode_label = Gtk.Label(label="Resize")
         mode_label.set_css_classes(["meta-label"])
         mode_label.set_valign(Gtk.Align.CENTER)
@@ -56,6 +64,11 @@ class FooterBar(Gtk.Box):
             self.selected_label.set_text("No wallpaper selected")
             self.apply_btn.set_sensitive(False)
 
+    def set_status(self, text: str):
+        """Show background activity (e.g. video pre-scaling); empty hides it."""
+        self.status_label.set_text(text)
+        self.status_label.set_visible(bool(text))
+
     def set_busy(self, busy: bool):
         self.apply_btn.set_sensitive(not busy and self.selected_label.get_text() != "No wallpaper selected")
         self.apply_btn.set_label("Applying..." if busy else "Apply Wallpaper")
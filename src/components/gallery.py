@@ -3,117 +3,348 @@
 
 import gi
 gi.require_version("Gtk", "4.0")
-from gi.repository import Gtk, GLib, Pango
+from gi.repository import Gtk, GLib, GObject, Gio, Pango
 from pathlib import Path
 import threading
+import time
 from typing import Callable, Optional
 
-from utils.constants import SUPPORTED_EXTS
-from utils.wallpaper_utils import generate_cached_thumbnail
+from core.library import (FILTER_DIFFERENT, FILTER_LOOSER, FILTER_STRICTER, FILTER_UNCHANGED,
+                          LibraryItem, LibraryModel)
+from core.scanner import ScanEntry
+from core.thumbnails import ThumbnailScheduler
+from utils.constants import DEFAULT_CONFIG
+from utils.dir_watcher import DirectoryWatcher
+from utils.perf import log, mark
+from utils.texture_cache import get_texture_cache
+from utils.ui_dispatch import get_ui_batcher
+
+_FILTER_CHANGES = {
+    FILTER_STRICTER: Gtk.FilterChange.MORE_STRICT,
+    FILTER_LOOSER: Gtk.FilterChange.LESS_STRICT,
+    FILTER_DIFFERENT: Gtk.FilterChange.DIFFERENT,
+}
+
+
+class WallpaperItem(GObject.Object, LibraryItem):
+    """Library item as a list model row; thumbnail changes emit ``notify``."""
+
+    __gtype_name__ = "WallpyWallpaperItem"
+
+    thumbnail = GObject.Property(type=str, default="")
+    thumbnail_failed = GObject.Property(type=bool, default=False)
+
+    def __init__(self, entry: ScanEntry):
+        GObject.Object.__init__(self)
+        LibraryItem.__init__(self, entry)
+        # Handed from a worker to the next redraw so it needn't hit the cache
+        self.pending_texture = None
 
 
 class Gallery(Gtk.Box):
-    """Gallery component displays thumbnails."""
-    
+    """Gallery component displays thumbnails.
+
+    A view over a ``LibraryModel``: its items are mirrored into a
+    ``Gio.ListStore`` and shown through a recycling ``Gtk.GridView``, so
+    the widget count follows the viewport size rather than the number of
+    files in the folder. Thumbnail jobs are ordered by distance from the
+    viewport and re-ordered as the user scrolls.
+    """
+
+    # Pending jobs further than this many screens away are dropped
+    DROP_SCREENS = 3
+    # Removals above this size rebuild the store in one splice
+    BULK_REMOVE = 64
+    # Quiet period after the last keystroke before searching
+    SEARCH_DEBOUNCE_MS = 120
+
     def __init__(self, on_thumbnail_selected: Optional[Callable[[str], None]] = None,
-                 on_thumbnail_double_clicked: Optional[Callable[[str], None]] = None):
+                 on_thumbnail_double_clicked: Optional[Callable[[str], None]] = None,
+                 recursive: bool = False, max_depth: int = 3, fuzzy_search: bool = True,
+                 texture_cache_mb: int = 64, duplicate_distance: int = DEFAULT_CONFIG["duplicate_distance"]):
         super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=0)
         self.set_vexpand(True)
 
         self.on_thumbnail_selected = on_thumbnail_selected
         self.on_thumbnail_double_clicked = on_thumbnail_double_clicked
 
-        self.loading = False
-        self.thumbnail_threads = []
         self.search_text = ""
-        self.selected_child: Optional[Gtk.FlowBoxChild] = None
-        self._thumb_queue = []  # list of (Path, Gtk.Image)
-        self._thumb_workers = 0
-        self._max_thumb_workers = 2  # adjustable
-        self._load_generation = 0
-        
+        self._search_source = 0
+        self.duplicate_distance = duplicate_distance
+        self._show_duplicates = False
+        self._duplicates_request = 0
+        self._colours_request = 0
+        self._media_request = 0
+        self._ui = get_ui_batcher()
+        self.model = LibraryModel(
+            recursive=recursive, max_depth=max_depth, fuzzy_search=fuzzy_search,
+            item_factory=WallpaperItem, dispatch=self._ui.post,
+            on_added=self._on_items_added, on_removed=self._on_items_removed,
+            on_loaded=self._loading_done,
+        )
+        # Shared across directory loads, so revisited folders render at once
+        self._textures = get_texture_cache()
+        self._textures.set_budget(texture_cache_mb * 1024 * 1024)
+        self._display_count = 0
+        self._display_seconds = 0.0
+        self._display_max = 0.0
+        self.thumbnails = ThumbnailScheduler(
+            self.model, priority=lambda item: self._viewport_distance(item.position),
+            decode=self._textures.get, on_ready=self._on_thumbnail_ready,
+        )
+        self._watcher = DirectoryWatcher(self.model.apply_changes)
+        self._reprioritize_source = 0
+
+        self.store = Gio.ListStore(item_type=WallpaperItem)
+        self.filter = Gtk.CustomFilter.new(self.model.matches)
+        self.filter_model = Gtk.FilterListModel(model=self.store, filter=self.filter)
+        self.sorter = Gtk.CustomSorter.new(self._sort_func)
+        self.sort_model = Gtk.SortListModel(model=self.filter_model, sorter=self.sorter)
+        self.sort_model.set_incremental(True)
+        self.selection = Gtk.SingleSelection(model=self.sort_model)
+        self.selection.set_autoselect(False)
+        self.selection.set_can_unselect(True)
+        self.selection.connect("selection-changed", self._on_selection_changed)
+
+        factory = Gtk.SignalListItemFactory()
+        factory.connect("setup", self._on_factory_setup)
+        factory.connect("bind", self._on_factory_bind)
+        factory.connect("unbind", self._on_factory_unbind)
+
         scroll = Gtk.ScrolledWindow()
         scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
         scroll.set_vexpand(True)
         scroll.set_css_classes(["gallery-scroll"])
-        
-        self.flow = Gtk.FlowBox()
-        self.flow.set_valign(Gtk.Align.START)
-        self.flow.set_selection_mode(Gtk.SelectionMode.NONE)
-        self.flow.set_min_children_per_line(3)
-        self.flow.set_max_children_per_line(8)
-        self.flow.set_row_spacing(10)
-        self.flow.set_column_spacing(10)
-        self.flow.set_margin_top(10)
-        self.flow.set_margin_bottom(10)
-        self.flow.set_margin_start(10)
-        self.flow.set_margin_end(10)
-        self.flow.set_homogeneous(True)
-        
-        scroll.set_child(self.flow)
+        scroll.get_vadjustment().connect("value-changed", self._on_scrolled)
+        self.scroll = scroll
+
+        self.grid = Gtk.GridView(model=self.selection, factory=factory)
+        self.grid.set_min_columns(3)
+        self.grid.set_max_columns(8)
+        self.grid.set_single_click_activate(False)
+        self.grid.connect("activate", self._on_grid_activate)
+
+        scroll.set_child(self.grid)
         self.append(scroll)
-        
+
         self.spinner = Gtk.Spinner()
         self.spinner.set_visible(False)
         self.append(self.spinner)
-    
+
+    @property
+    def loading(self) -> bool:
+        return self.model.loading
+
     def load_directory(self, directory: str):
-        path = Path(directory)
+        path = Path(directory).absolute()
         if not path.exists() or not path.is_dir():
             print(f"Directory not found: {directory}")
             return
 
-        self._load_generation += 1
-        generation = self._load_generation
-        self._thumb_queue.clear()
-        self._clear_flowbox()
+        self.store.remove_all()
+        self.model.load(str(path))
+        self.thumbnails.cancel_stale()
+        self._watcher.watch(str(path))
+        self.spinner.set_visible(True)
+        self.spinner.start()
+
+    def set_filter(self, query: str):
+        """Filter by name; runs once typing pauses for ``SEARCH_DEBOUNCE_MS``."""
+        self.search_text = (query or "").strip()
+        if self._search_source:
+            GLib.source_remove(self._search_source)
+        self._search_source = GLib.timeout_add(self.SEARCH_DEBOUNCE_MS, self._run_search)
+
+    def _run_search(self):
+        self._search_source = 0
+        searching = self.model.scores is not None
+        change = self.model.search(self.search_text)
+        # Rank by match score while searching, by the sort mode otherwise
+        self._apply_filter_change(change, resort=searching != (self.model.scores is not None))
+        return False
+
+    def _apply_filter_change(self, change: str, resort: bool = False):
+        """Re-filter after a ``FILTER_*`` change, re-sorting only if the ranking changed.
+
+        A stricter or looser filter keeps the order of the items that stay,
+        so the Python ``compare`` runs only for the ones coming in.
+        """
+        if change != FILTER_UNCHANGED:
+            self.filter.changed(_FILTER_CHANGES[change])
+        if resort:
+            self.sorter.changed(Gtk.SorterChange.DIFFERENT)
+
+    def show_duplicates(self, active: bool):
+        """Show only groups of near-duplicates, largest copy first.
+
+        Hashing (and generating any missing thumbnails) runs on a background
+        thread; the view switches once the groups are known, and again
+        after each folder load while active.
+        """
+        self._show_duplicates = active
+        self._duplicates_request += 1
+        if not active:
+            change = self.model.show_duplicates(None)
+            self._apply_filter_change(change, resort=change != FILTER_UNCHANGED)
+        elif not self.model.loading:
+            self._find_duplicates()
+
+    def _find_duplicates(self):
+        request = self._duplicates_request
+        generation = self.model.generation
+        items = self.model.thumbnail_snapshot()
+        distance = self.duplicate_distance
         self.spinner.set_visible(True)
         self.spinner.start()
-        self.loading = True
-        
-        def scan_worker():
+
+        def worker():
             try:
-                files = [p for p in path.iterdir() if p.suffix.lower() in SUPPORTED_EXTS]
-                # Show a quick initial unsorted batch to reduce perceived delay
-                head, tail = files[:30], files[30:]
-                for fp in head:
-                    if not self.loading or generation != self._load_generation:
-                        break
-                    GLib.idle_add(self._add_thumbnail, fp, generation)
-                tail.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-                for fp in tail:
-                    if not self.loading or generation != self._load_generation:
-                        break
-                    GLib.idle_add(self._add_thumbnail, fp, generation)
+                # NumPy and the hashing code load on first use, not at startup
+                from core.duplicates import find_library_duplicates
+                groups = find_library_duplicates(items, distance)
             except Exception as e:
-                GLib.idle_add(print, f"Gallery Error: {e}")
-            finally:
-                if generation == self._load_generation:
-                    GLib.idle_add(self.spinner.stop)
-                    GLib.idle_add(self.spinner.set_visible, False)
-                    GLib.idle_add(self._loading_done)
-
-        threading.Thread(target=scan_worker, daemon=True).start()
-        
-    def set_filter(self, query: str):
-        self.search_text = (query or "").lower().strip()
-        self._apply_filter()
+                print(f"[wallpygui] Finding duplicates failed: {e}")
+                groups = []
+            self._ui.post(self._duplicates_found, groups, request, generation)
 
-    def _add_thumbnail(self, filepath: Path, generation: int):
-        """Create a thumbnail entry quickly, then load image asynchronously."""
-        if generation != self._load_generation:
-            return False
+        threading.Thread(target=worker, name="wallpygui-duplicates", daemon=True).start()
+
+    def _duplicates_found(self, groups: list[list[str]], request: int, generation: int):
+        if not self.model.loading:
+            self.spinner.stop()
+            self.spinner.set_visible(False)
+        if request != self._duplicates_request or not self.model.is_current(generation):
+            return
+        log(f"duplicates: {len(groups)} groups, "
+            f"{sum(len(group) - 1 for group in groups)} redundant files")
+        # Groups come first, in order
+        self._apply_filter_change(self.model.show_duplicates(groups), resort=True)
+
+    def set_sort(self, mode: str):
+        """Order by one of ``library.SORT_MODES``, reading an index if the mode needs one."""
+        if mode == self.model.sort:
+            return
+        self.model.set_sort(mode)
+        self.sorter.changed(Gtk.SorterChange.DIFFERENT)
+        self._update_indexes()
+
+    def filter_colour(self, name: Optional[str]):
+        """Show only wallpapers that are largely ``name`` (None for all)."""
+        self._apply_filter_change(self.model.filter_colour(name))
+        self._update_indexes()
+
+    def filter_min_width(self, width: int):
+        """Show only wallpapers at least ``width`` pixels wide (0 for all)."""
+        self._apply_filter_change(self.model.filter_media(width, self.model.aspect))
+        self._update_indexes()
+
+    def filter_aspect(self, aspect: Optional[str]):
+        """Show only wallpapers of one ``constants.ASPECT_RATIOS`` ratio (None for all)."""
+        self._apply_filter_change(self.model.filter_media(self.model.min_width, aspect))
+        self._update_indexes()
+
+    def _update_indexes(self):
+        self._colours_request += 1
+        self._media_request += 1
+        if self.model.loading:
+            return  # _loading_done indexes the whole folder
+        if self.model.needs_colours():
+            self._index_colours()
+        if self.model.needs_media():
+            self._index_media()
+
+    def _index_media(self, paths: Optional[set[str]] = None):
+        """Read (or parse once) size, duration and codec of items not in the model's index.
+
+        ``paths`` limits that to some of the items, e.g. ones just added.
+        """
+        entries = [entry for entry in self.model.media_snapshot()
+                   if paths is None or entry[0] in paths]
+        if not entries:
+            return
+        request = self._media_request
+        generation = self.model.generation
+
+        def worker():
+            try:
+                from core.metadata import media_index
+                media = media_index(entries)
+            except Exception as e:
+                print(f"[wallpygui] Indexing metadata failed: {e}")
+                media = {}
+            self._ui.post(self._media_indexed, media, request, generation)
+
+        threading.Thread(target=worker, name="wallpygui-metadata", daemon=True).start()
+
+    def _media_indexed(self, media: dict, request: int, generation: int):
+        if request != self._media_request or not self.model.is_current(generation):
+            return
+        log(f"metadata: {len(media)} of {len(self.model)} items indexed")
+        self._apply_filter_change(self.model.set_media(media), resort=self.model.sorts_by_media())
+
+    def _index_colours(self, paths: Optional[set[str]] = None):
+        """Read (or extract once) the palettes of items not in the model's index yet.
+
+        ``paths`` limits that to some of the items, e.g. ones just added.
+        """
+        items = [entry for entry in self.model.thumbnail_snapshot()
+                 if entry[0] not in self.model.colours and (paths is None or entry[0] in paths)]
+        if not items:
+            return
+        request = self._colours_request
+        generation = self.model.generation
+        self.spinner.set_visible(True)
+        self.spinner.start()
+
+        def worker():
+            try:
+                from core.colours import library_colours
+                colours = library_colours(items)
+            except Exception as e:
+                print(f"[wallpygui] Indexing colours failed: {e}")
+                colours = {}
+            self._ui.post(self._colours_indexed, colours, request, generation)
+
+        threading.Thread(target=worker, name="wallpygui-colours", daemon=True).start()
+
+    def _colours_indexed(self, colours: dict, request: int, generation: int):
+        if not self.model.loading:
+            self.spinner.stop()
+            self.spinner.set_visible(False)
+        if request != self._colours_request or not self.model.is_current(generation):
+            return
+        log(f"colours: {len(colours)} of {len(self.model)} items indexed")
+        self._apply_filter_change(self.model.set_colours(colours),
+                                  resort=self.model.sorts_by_colour())
+
+    def _on_items_added(self, items: list[WallpaperItem]):
+        self.store.splice(self.store.get_n_items(), 0, items)
+        if not self.model.loading:
+            # Found by the directory watcher; a load indexes the folder once done
+            paths = {item.path for item in items}
+            if self.model.needs_colours():
+                self._index_colours(paths)
+            if self.model.needs_media():
+                self._index_media(paths)
 
+    def _on_items_removed(self, items: list[WallpaperItem]):
+        if len(items) > self.BULK_REMOVE:
+            # One pass over the store instead of a linear find per item
+            paths = {item.path for item in items}
+            kept = [it for it in self.store if it.path not in paths]
+            self.store.splice(0, self.store.get_n_items(), kept)
+            return
+        for item in items:
+            found, position = self.store.find(item)
+            if found:
+                self.store.remove(position)
+
+    def _on_factory_setup(self, factory, list_item):
         img = Gtk.Image()
         img.set_pixel_size(160)
         img.set_size_request(170, 106)
-        # Placeholder icon until loaded
-        if filepath.suffix.lower() in {".mp4", ".mkv", ".mov"}:
-            img.set_from_icon_name("media-playback-start")
-        else:
-            img.set_from_icon_name("image-x-generic")
 
-        label = Gtk.Label(label=filepath.name)
+        label = Gtk.Label()
         label.set_css_classes(["thumb-label"])
         label.set_halign(Gtk.Align.CENTER)
         label.set_wrap(False)
@@ -127,127 +358,165 @@ class Gallery(Gtk.Box):
         child_box.set_halign(Gtk.Align.CENTER)
         child_box.append(img)
         child_box.append(label)
+        child_box.image = img
+        child_box.label = label
+        child_box.notify_handler = None
+        list_item.set_child(child_box)
 
-        child = Gtk.FlowBoxChild()
-        child.set_child(child_box)
-        child.filepath = str(filepath)
-        child.inner_box = child_box
-        child.add_controller(self._make_click_controller(child))
-        self.flow.append(child)
+    def _on_factory_bind(self, factory, list_item):
+        child_box = list_item.get_child()
+        item = list_item.get_item()
+        child_box.label.set_text(item.name)
+        item.position = list_item.get_position()
+        child_box.notify_handler = item.connect("notify", self._on_item_notify, child_box.image)
+        self._show_thumbnail(child_box.image, item)
 
-        self._thumb_queue.append((filepath, img, generation))
-        self._maybe_start_thumb_worker()
-        return False
+        if not item.thumbnail and not item.thumb_requested:
+            self.thumbnails.request(item)
 
-    def _maybe_start_thumb_worker(self):
-        if self._thumb_workers >= self._max_thumb_workers or not self._thumb_queue:
-            return
-        filepath, img, generation = self._thumb_queue.pop(0)
-        if generation != self._load_generation:
-            self._maybe_start_thumb_worker()
+    def _on_factory_unbind(self, factory, list_item):
+        child_box = list_item.get_child()
+        item = list_item.get_item()
+        if item is not None:
+            # Scrolled out of view: its pending jobs rank last and get dropped
+            item.position = -1
+            if child_box.notify_handler is not None:
+                item.disconnect(child_box.notify_handler)
+        child_box.notify_handler = None
+
+    def _on_item_notify(self, item: WallpaperItem, pspec, image: Gtk.Image):
+        self._show_thumbnail(image, item)
+
+    def _show_thumbnail(self, image: Gtk.Image, item: WallpaperItem):
+        start = time.perf_counter()
+        self._set_image(image, item)
+        elapsed = time.perf_counter() - start
+        self._display_count += 1
+        self._display_seconds += elapsed
+        self._display_max = max(self._display_max, elapsed)
+
+    def _set_image(self, image: Gtk.Image, item: WallpaperItem):
+        """Only swaps paintables; decoding happens on the scheduler's workers."""
+        texture = item.pending_texture
+        if texture is None and item.thumbnail:
+            texture = self._textures.lookup(item.thumbnail)
+        if texture is not None:
+            image.set_from_paintable(texture)
+            mark("first thumbnail")
             return
-        self._thumb_workers += 1
+        if item.thumbnail:
+            self.thumbnails.request_decode(item)
 
-        def worker(fp=filepath, image=img):
-            try:
-                thumb_path = generate_cached_thumbnail(fp, width=170, height=106)
-                if thumb_path and generation == self._load_generation:
-                    GLib.idle_add(self._set_image_from_file, image, thumb_path, generation)
-            except Exception:
-                if generation == self._load_generation:
-                    GLib.idle_add(lambda im=image: im.set_from_icon_name("image-missing"))
-            finally:
-                def done():
-                    self._thumb_workers -= 1
-                    self._maybe_start_thumb_worker()
-                    return False
-                GLib.idle_add(done)
-
-        threading.Thread(target=worker, daemon=True).start()
-        self._maybe_start_thumb_worker()
-
-    def _set_image_from_file(self, image: Gtk.Image, path: str, generation: int):
-        if generation == self._load_generation:
-            image.set_from_file(path)
+        if item.thumbnail_failed:
+            image.set_from_icon_name("image-missing")
+        elif item.is_video:
+            image.set_from_icon_name("media-playback-start")
+        else:
+            image.set_from_icon_name("image-x-generic")
+
+    def _on_thumbnail_ready(self, item: WallpaperItem, key: str, texture):
+        item.pending_texture = texture
+        if item.thumbnail == key:
+            item.notify("thumbnail")
+        else:
+            item.thumbnail = key
+        item.pending_texture = None
+
+    def _viewport_distance(self, position: int) -> float:
+        """Distance in items between ``position`` and the viewport centre.
+
+        Items no cell shows (``position`` -1) are infinitely far.
+        """
+        if position < 0:
+            return float("inf")
+        adj = self.scroll.get_vadjustment()
+        n_items = self.sort_model.get_n_items()
+        upper = adj.get_upper()
+        if n_items == 0 or upper <= 0:
+            return float(position)
+        center = (adj.get_value() + adj.get_page_size() / 2) / upper * n_items
+        return abs(position - center)
+
+    def _on_scrolled(self, adj):
+        # Coalesce scroll bursts into one queue reorder per frame or so
+        if not self._reprioritize_source:
+            self._reprioritize_source = GLib.timeout_add(16, self._reprioritize_thumbnails)
+
+    def _reprioritize_thumbnails(self):
+        """Reorder pending jobs by viewport distance, dropping far off-screen ones."""
+        self._reprioritize_source = 0
+        adj = self.scroll.get_vadjustment()
+        n_items = self.sort_model.get_n_items()
+        upper = adj.get_upper()
+        if n_items == 0 or upper <= 0:
+            return False
+        visible = max(1.0, n_items * adj.get_page_size() / upper)
+        # Dropped items are re-queued by the factory if they scroll back into view
+        self.thumbnails.reprioritize(visible * self.DROP_SCREENS)
         return False
-    
-    def _make_click_controller(self, child):
-        gesture = Gtk.GestureClick()
-        def on_press(gesture, n_press, x, y):
-            if n_press == 1:
-                self._select_child(child)
-                if self.on_thumbnail_selected:
-                    self.on_thumbnail_selected(child.filepath)
-            elif n_press == 2:
-                self._select_child(child)
-                if self.on_thumbnail_double_clicked:
-                    self.on_thumbnail_double_clicked(child.filepath)
-        gesture.connect("pressed", on_press)
-        return gesture
-
-    def _select_child(self, child: Gtk.FlowBoxChild):
-        try:
-            if self.selected_child and hasattr(self.selected_child, 'inner_box'):
-                old_box = self.selected_child.inner_box
-                classes = list(old_box.get_css_classes())
-                if "selected-thumb" in classes:
-                    classes.remove("selected-thumb")
-                    old_box.set_css_classes(classes)
-        except Exception:
-            pass
-
-        # Apply selection style to new child
-        try:
-            inner = getattr(child, 'inner_box', None)
-            if inner is not None:
-                classes = list(inner.get_css_classes())
-                if "selected-thumb" not in classes:
-                    classes.append("selected-thumb")
-                    inner.set_css_classes(classes)
-            self.selected_child = child
-        except Exception:
-            self.selected_child = child
+
+    def _on_selection_changed(self, selection, position, n_items):
+        item = selection.get_selected_item()
+        if item is not None and self.on_thumbnail_selected:
+            self.on_thumbnail_selected(item.path)
+
+    def _on_grid_activate(self, grid, position):
+        item = self.sort_model.get_item(position)
+        if item is None:
+            return
+        self.selection.set_selected(position)
+        if self.on_thumbnail_double_clicked:
+            self.on_thumbnail_double_clicked(item.path)
+
+    def _sort_func(self, a: WallpaperItem, b: WallpaperItem) -> Gtk.Ordering:
+        return Gtk.Ordering(self.model.compare(a, b))
+
+    def playlist(self) -> list[str]:
+        """Paths of the loaded wallpapers, newest first (any thread)."""
+        return self.model.playlist()
 
     def select_random(self, rng) -> Optional[str]:
-        visible_children = []
-        child = self.flow.get_first_child()
-        while child is not None:
-            if child.get_visible() and hasattr(child, "filepath"):
-                visible_children.append(child)
-            child = child.get_next_sibling()
-
-        if not visible_children:
+        n_items = self.sort_model.get_n_items()
+        if n_items == 0:
             return None
 
-        selected = rng.choice(visible_children)
-        self._select_child(selected)
-        return selected.filepath
-    
-    def _clear_flowbox(self):
-        try:
-            child = self.flow.get_first_child()
-            while child is not None:
-                next_child = child.get_next_sibling()
-                self.flow.remove(child)
-                child = next_child
-        except AttributeError:
-            pass
-    
-    def _apply_filter(self):
-        query = self.search_text
-        child = self.flow.get_first_child()
-        while child is not None:
-            try:
-                box = child.get_child()
-                label_child = box.get_first_child()
-                if label_child and hasattr(label_child, 'get_next_sibling'):
-                    label_child = label_child.get_next_sibling()
-                if label_child and hasattr(label_child, 'get_text'):
-                    name = label_child.get_text().lower()
-                    child.set_visible(query in name if query else True)
-            except (AttributeError, TypeError):
-                child.set_visible(True)
-            child = child.get_next_sibling()
-    
+        position = rng.randrange(n_items)
+        self.selection.set_selected(position)
+        if hasattr(self.grid, "scroll_to"):
+            self.grid.scroll_to(position, Gtk.ListScrollFlags.NONE, None)
+        return self.sort_model.get_item(position).path
+
+    def dispatch_stats(self) -> dict:
+        """Main-loop dispatch rates, to measure how busy the UI thread is."""
+        return self._ui.stats()
+
+    def texture_stats(self) -> dict:
+        """Texture cache hits, misses and resident bytes."""
+        return self._textures.stats()
+
+    def display_stats(self) -> dict:
+        """Main-thread time spent putting thumbnails on screen."""
+        count = self._display_count
+        return {
+            "count": count,
+            "total_ms": self._display_seconds * 1000,
+            "avg_us": self._display_seconds / count * 1e6 if count else 0.0,
+            "max_ms": self._display_max * 1000,
+        }
+
     def _loading_done(self):
-        self.loading = False
+        self.spinner.stop()
+        self.spinner.set_visible(False)
+        if self._show_duplicates:
+            self._find_duplicates()
+        if self.model.needs_colours():
+            self._index_colours()
+        if self.model.needs_media():
+            self._index_media()
+        stats = self._textures.stats()
+        log(f"textures: {stats['entries']} resident, "
+            f"{stats['resident_bytes'] // 1024} KiB of {stats['budget_bytes'] // 1024} KiB, "
+            f"hit rate {stats['hit_rate']:.0%}")
+        display = self.display_stats()
+        log(f"thumbnail display: {display['count']} updates, {display['total_ms']:.1f} ms "
+            f"on the main thread (avg {display['avg_us']:.0f} us, max {display['max_ms']:.2f} ms)")
@@ -3,7 +3,13 @@ import gi
 gi.require_version("Gtk", "4.0")
 from gi.repository import Gtk
 from typing import Callable, Optional
-from utils.constants import APP_TITLE
+from utils.constants import APP_TITLE, ASPECT_RATIOS, COLOUR_NAMES, MIN_WIDTHS
+from core.library import (SORT_ASPECT, SORT_DURATION, SORT_HUE, SORT_NEWEST, SORT_RESOLUTION,
+                          SORT_SIZE)
+
+SORT_LABELS = ((SORT_NEWEST, "Newest"), (SORT_HUE, "Hue"), (SORT_SIZE, "File size"),
+               (SORT_RESOLUTION, "Resolution"), (SORT_ASPECT, "Aspect ratio"),
+               (SORT_DURATION, "Duration"))
 
 
 class HeaderBar(Gtk.Box):
@@ -12,7 +18,13 @@ class HeaderBar(Gtk.Box):
     def __init__(self,
                  on_open_dir: Callable[[], None],
                  on_random: Optional[Callable[[], None]] = None,
-                 on_search_changed: Optional[Callable[[str], None]] = None):
+                 on_search_changed: Optional[Callable[[str], None]] = None,
+                 on_rotate_toggled: Optional[Callable[[bool], None]] = None,
+                 on_duplicates_toggled: Optional[Callable[[bool], None]] = None,
+                 on_sort_changed: Optional[Callable[[str], None]] = None,
+                 on_colour_changed: Optional[Callable[[Optional[str]], None]] = None,
+                 on_min_width_changed: Optional[Callable[[int], None]] = None,
+                 on_aspect_changed: Optional[Callable[[Optional[str]], None]] = None):
         super().__init__(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
         self.set_css_classes(["header-box"])
         self.set_hexpand(True)
@@ -45,3 +57,73 @@ class HeaderBar(Gtk.Box):
             random_btn.set_valign(Gtk.Align.CENTER)
             random_btn.connect("clicked", lambda *_: on_random())
             self.append(random_btn)
+
+        self.rotate_btn = None
+        if on_rotate_toggled is not None:
+            self.rotate_btn = Gtk.ToggleButton(label="Rotate")
+            self.rotate_btn.set_css_classes(["tool-btn"])
+            self.rotate_btn.set_valign(Gtk.Align.CENTER)
+            self.rotate_btn.set_tooltip_text("Change the wallpaper periodically")
+            self.rotate_btn.connect("toggled", lambda b: on_rotate_toggled(b.get_active()))
+            self.append(self.rotate_btn)
+
+        self.duplicates_btn = None
+        if on_duplicates_toggled is not None:
+            self.duplicates_btn = Gtk.ToggleButton(label="Duplicates")
+            self.duplicates_btn.set_css_classes(["tool-btn"])
+            self.duplicates_btn.set_valign(Gtk.Align.CENTER)
+            self.duplicates_btn.set_tooltip_text("Show only near-duplicate wallpapers")
+            self.duplicates_btn.connect("toggled",
+                                        lambda b: on_duplicates_toggled(b.get_active()))
+            self.append(self.duplicates_btn)
+
+        self.sort_combo = None
+        if on_sort_changed is not None:
+            self.sort_combo = Gtk.ComboBoxText()
+            self.sort_combo.set_valign(Gtk.Align.CENTER)
+            self.sort_combo.set_tooltip_text("Order of the wallpapers")
+            for mode, label in SORT_LABELS:
+                self.sort_combo.append(mode, label)
+            self.sort_combo.set_active_id(SORT_NEWEST)
+            self.sort_combo.connect("changed",
+                                    lambda c: on_sort_changed(c.get_active_id() or SORT_NEWEST))
+            self.append(self.sort_combo)
+
+        self.colour_combo = None
+        if on_colour_changed is not None:
+            self.colour_combo = Gtk.ComboBoxText()
+            self.colour_combo.set_valign(Gtk.Align.CENTER)
+            self.colour_combo.set_tooltip_text("Show only wallpapers of one colour")
+            self.colour_combo.append("any", "Any colour")
+            for name in COLOUR_NAMES:
+                self.colour_combo.append(name, name.capitalize())
+            self.colour_combo.set_active_id("any")
+            self.colour_combo.connect("changed", lambda c: on_colour_changed(
+                None if c.get_active_id() in (None, "any") else c.get_active_id()))
+            self.append(self.colour_combo)
+
+        self.width_combo = None
+        if on_min_width_changed is not None:
+            self.width_combo = Gtk.ComboBoxText()
+            self.width_combo.set_valign(Gtk.Align.CENTER)
+            self.width_combo.set_tooltip_text("Show only wallpapers at least this wide")
+            self.width_combo.append("0", "Any size")
+            for width in MIN_WIDTHS:
+                self.width_combo.append(str(width), f"\u2265 {width} wide")
+            self.width_combo.set_active_id("0")
+            self.width_combo.connect("changed",
+                                     lambda c: on_min_width_changed(int(c.get_active_id() or 0)))
+            self.append(self.width_combo)
+
+        self.aspect_combo = None
+        if on_aspect_changed is not None:
+            self.aspect_combo = Gtk.ComboBoxText()
+            self.aspect_combo.set_valign(Gtk.Align.CENTER)
+            self.aspect_combo.set_tooltip_text("Show only wallpapers of one aspect ratio")
+            self.aspect_combo.append("any", "Any aspect")
+            for name in ASPECT_RATIOS:
+                self.aspect_combo.append(name, name)
+            self.aspect_combo.set_active_id("any")
+            self.aspect_combo.connect("changed", lambda c: on_aspect_changed(
+                None if c.get_active_id() in (None, "any") else c.get_active_id()))
+            self.append(self.aspect_combo)
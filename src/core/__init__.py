@@ -0,0 +1 @@
+# Core Package
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Average and dominant colours of the cached thumbnails, for sorting and filtering."""
+
+import colorsys
+import os
+from typing import NamedTuple, Optional
+
+from utils.constants import COLOUR_HUES
+from core.thumbnail_manifest import get_manifest
+from core.thumbnail_pack import Thumbnail, get_pack
+from core.thumbnails import ensure_thumbnails
+
+try:
+    import numpy as np
+except ImportError:  # optional; median cut in plain Python is used instead
+    np = None
+
+# Palette entries per thumbnail
+PALETTE_SIZE = 5
+# Every n-th pixel in both directions is sampled (~1,100 of a 170x106 thumbnail)
+SAMPLE_STEP = 4
+KMEANS_ITERATIONS = 8
+# Thumbnails clustered together in one NumPy batch
+BATCH_SIZE = 256
+
+# A picture is "blue" when at least this much of its palette is blue
+MIN_SHARE = 0.25
+
+
+class Colours(NamedTuple):
+    """Colours of one thumbnail as 0xRRGGBB ints.
+
+    ``palette`` holds ``(colour, share)`` pairs, largest share first, so
+    its first entry is the dominant colour.
+    """
+
+    average: int
+    palette: tuple[tuple[int, float], ...]
+
+    @property
+    def dominant(self) -> int:
+        return self.palette[0][0] if self.palette else self.average
+
+    def encode(self) -> tuple[int, str]:
+        """Row for the manifest's ``thumbnail_colours`` table."""
+        return self.average, ",".join(f"{rgb:06x}:{round(share * 1000)}"
+                                      for rgb, share in self.palette)
+
+    @classmethod
+    def decode(cls, average: int, palette: str) -> "Colours":
+        entries = []
+        for entry in filter(None, palette.split(",")):
+            rgb, share = entry.split(":")
+            entries.append((int(rgb, 16), int(share) / 1000))
+        return cls(average, tuple(entries))
+
+
+def _pack_rgb(r: float, g: float, b: float) -> int:
+    return (round(r) << 16) | (round(g) << 8) | round(b)
+
+
+def _hsv(rgb: int) -> tuple[float, float, float]:
+    return colorsys.rgb_to_hsv((rgb >> 16) / 255, ((rgb >> 8) & 0xFF) / 255, (rgb & 0xFF) / 255)
+
+
+def colour_name(rgb: int) -> str:
+    """The ``COLOUR_NAMES`` entry closest to a 0xRRGGBB colour."""
+    h, s, v = _hsv(rgb)
+    if v < 0.18:
+        return "black"
+    if s < 0.2:
+        return "white" if v > 0.85 else "grey"
+    hue = h * 360
+    return min(COLOUR_HUES, key=lambda entry: min(abs(hue - entry[1]), 360 - abs(hue - entry[1])))[0]
+
+
+def colour_share(colours: Colours, name: str) -> float:
+    """How much of the palette is the named colour (0 to 1)."""
+    return sum(share for rgb, share in colours.palette if colour_name(rgb) == name)
+
+
+def hue_key(colours: Optional[Colours]) -> tuple:
+    """Sort key: chromatic pictures around the colour wheel, then neutrals light to dark."""
+    if colours is None:
+        return (2, 0.0, 0.0)
+    h, s, v = _hsv(colours.dominant)
+    if v < 0.18 or s < 0.2:
+        return (1, 0.0, -v)
+    return (0, h, -v)
+
+
+def _palette(entries) -> tuple[tuple[int, float], ...]:
+    """Merge entries of the same colour and order them by share."""
+    shares: dict[int, float] = {}
+    for rgb, share in entries:
+        if share > 0:
+            shares[rgb] = shares.get(rgb, 0.0) + share
+    return tuple(sorted(shares.items(), key=lambda entry: -entry[1]))
+
+
+def _median_cut(samples: list[tuple[int, int, int]], count: int) -> list[tuple[int, float]]:
+    """Palette by repeatedly halving the box of samples with the widest channel."""
+    def spread(box):
+        ranges = [max(p[c] for p in box) - min(p[c] for p in box) for c in range(3)]
+        widest = max(range(3), key=ranges.__getitem__)
+        return ranges[widest] * len(box), widest
+
+    boxes = [(spread(samples), samples)]
+    while len(boxes) < count:
+        i = max(range(len(boxes)), key=lambda n: boxes[n][0][0])
+        (size, channel), box = boxes[i]
+        if size == 0:
+            break
+        box = sorted(box, key=lambda p: p[channel])
+        half = len(box) // 2
+        boxes[i:i + 1] = [(spread(box[:half]), box[:half]), (spread(box[half:]), box[half:])]
+
+    total = len(samples)
+    palette = []
+    for _, box in boxes:
+        n = len(box)
+        palette.append((_pack_rgb(sum(p[0] for p in box) / n, sum(p[1] for p in box) / n,
+                                  sum(p[2] for p in box) / n), n / total))
+    return palette
+
+
+def extract_colours(thumb: Thumbnail) -> Colours:
+    """Average colour and median-cut palette of one thumbnail, in plain Python."""
+    width, height, channels, pixels = thumb
+    stride = thumb.stride
+    step = channels * SAMPLE_STEP
+    samples = []
+    for y in range(0, height, SAMPLE_STEP):
+        row = pixels[y * stride:y * stride + width * channels]
+        samples.extend(zip(row[0::step], row[1::step], row[2::step]) if channels >= 3
+                       else ((v, v, v) for v in row[0::step]))
+    n = len(samples)
+    average = _pack_rgb(sum(p[0] for p in samples) / n, sum(p[1] for p in samples) / n,
+                        sum(p[2] for p in samples) / n)
+    return Colours(average, _palette(_median_cut(samples, PALETTE_SIZE)))
+
+
+def _kmeans(samples, count: int, iterations: int):
+    """Batched k-means over ``(thumbnails, samples, 3)``; returns centres and shares."""
+    size = samples.shape[1]
+    # Deterministic start: samples at evenly spaced brightness ranks
+    order = np.argsort(samples.sum(axis=2), axis=1)
+    picks = order[:, (np.arange(count) * 2 + 1) * size // (2 * count)]
+    centres = np.take_along_axis(samples, picks[:, :, None], axis=1)
+    clusters = np.arange(count)
+    for _ in range(iterations):
+        distances = ((samples[:, :, None, :] - centres[:, None, :, :]) ** 2).sum(axis=3)
+        members = distances.argmin(axis=2)[:, :, None] == clusters
+        counts = members.sum(axis=1)
+        sums = np.einsum("nsk,nsc->nkc", members.astype(np.float32), samples)
+        centres = np.where(counts[:, :, None] > 0,
+                           sums / np.maximum(counts, 1)[:, :, None], centres)
+    return centres, counts / size
+
+
+def extract_many(thumbs: list[Thumbnail]) -> list[Colours]:
+    """Colours of many thumbnails; with NumPy, one k-means run per batch of equal sizes."""
+    if np is None:
+        return [extract_colours(thumb) for thumb in thumbs]
+    results: list[Optional[Colours]] = [None] * len(thumbs)
+    shapes: dict[tuple[int, int, int], list[int]] = {}
+    for i, thumb in enumerate(thumbs):
+        shapes.setdefault((thumb.width, thumb.height, thumb.channels), []).append(i)
+    for (width, height, channels), indices in shapes.items():
+        for start in range(0, len(indices), BATCH_SIZE):
+            batch = indices[start:start + BATCH_SIZE]
+            grids = []
+            for i in batch:
+                grid = np.frombuffer(thumbs[i].pixels, np.uint8).reshape(height, width, channels)
+                grid = grid[::SAMPLE_STEP, ::SAMPLE_STEP]
+                grids.append(grid[:, :, :3] if channels >= 3 else grid[:, :, :1].repeat(3, axis=2))
+            samples = np.stack(grids).reshape(len(batch), -1, 3).astype(np.float32)
+            averages = samples.mean(axis=1)
+            centres, shares = _kmeans(samples, PALETTE_SIZE, KMEANS_ITERATIONS)
+            for row, i in enumerate(batch):
+                palette = _palette((_pack_rgb(*centres[row, k].tolist()), float(shares[row, k]))
+                                   for k in range(PALETTE_SIZE))
+                results[i] = Colours(_pack_rgb(*averages[row].tolist()), palette)
+    return results
+
+
+def thumbnail_colours(thumbs: dict[str, str]) -> dict[str, Colours]:
+    """Colours for ``{path: pack key}``; computed once per thumbnail and kept in the manifest.
+
+    Pack keys change with the source file's mtime and size, so a stored
+    palette is never served for a file that has since been modified.
+    """
+    manifest = get_manifest()
+    keys = list(set(thumbs.values()))
+    known = {key: Colours.decode(*row) for key, row in manifest.lookup_colours(keys).items()}
+    missing = [key for key in keys if key not in known]
+    pack = get_pack()
+    for i in range(0, len(missing), BATCH_SIZE):
+        loaded = pack.get_many(missing[i:i + BATCH_SIZE])
+        fresh = dict(zip(loaded, extract_many(list(loaded.values()))))
+        if fresh:
+            manifest.record_colours({key: colours.encode() for key, colours in fresh.items()})
+            known.update(fresh)
+    return {path: known[key] for path, key in thumbs.items() if key in known}
+
+
+def library_colours(items: list[tuple[str, str, os.stat_result]]) -> dict[str, Colours]:
+    """Colours of ``(path, thumbnail key, stat)`` items, generating missing thumbnails first."""
+    return thumbnail_colours(ensure_thumbnails(items))
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Near-duplicate detection from perceptual hashes of the cached thumbnails."""
+
+import os
+from typing import Iterator
+
+from core.thumbnail_manifest import get_manifest
+from core.thumbnail_pack import Thumbnail, get_pack
+from core.thumbnails import ensure_thumbnails
+
+try:
+    import numpy as np
+except ImportError:  # optional; the pure Python paths below give the same results
+    np = None
+
+# Hashes at most this many bits apart count as the same picture
+DEFAULT_MAX_DISTANCE = 6
+
+
+def dhash(thumb: Thumbnail) -> int:
+    """64-bit difference hash of a pack thumbnail.
+
+    The thumbnail is averaged down to a 9x8 grey grid and each bit says
+    whether a cell is brighter than its right neighbour, which survives
+    rescaling and re-encoding. Every cached thumbnail is cropped to the same
+    size, so copies of one picture at any resolution hash alike.
+    """
+    width, height, channels, pixels = thumb
+    stride = thumb.stride
+    colour = min(channels, 3)  # alpha doesn't count
+    cols = [x * width // 9 for x in range(10)]
+    rows = [y * height // 8 for y in range(9)]
+    if np is not None:
+        grey = np.frombuffer(pixels, np.uint8).reshape(height, width, channels)[:, :, :colour]
+        cells = np.add.reduceat(np.add.reduceat(grey.sum(axis=2, dtype=np.uint32),
+                                                rows[:-1], axis=0), cols[:-1], axis=1)
+        means = cells / np.diff(cols)
+        return int.from_bytes(np.packbits(means[:, :-1] > means[:, 1:]).tobytes(), "big")
+    bits = 0
+    for gy in range(8):
+        sums = [0] * 9
+        for y in range(rows[gy], rows[gy + 1]):
+            base = y * stride
+            for gx in range(9):
+                start, end = base + cols[gx] * channels, base + cols[gx + 1] * channels
+                for c in range(colour):
+                    sums[gx] += sum(pixels[start + c:end:channels])
+        means = [sums[gx] / (cols[gx + 1] - cols[gx]) for gx in range(9)]
+        for gx in range(8):
+            bits = (bits << 1) | (means[gx] > means[gx + 1])
+    return bits
+
+
+def _buckets(values: list[int], max_distance: int) -> Iterator[list[int]]:
+    """Indices of hashes that agree on one of ``max_distance + 1`` bit ranges.
+
+    Two hashes at most ``max_distance`` bits apart must agree completely on
+    at least one range (pigeonhole), so comparing within these buckets
+    finds every close pair without comparing every hash to every other.
+    """
+    segments = max_distance + 1
+    bounds = [i * 64 // segments for i in range(segments + 1)]
+    for lo, hi in zip(bounds, bounds[1:]):
+        mask = (1 << (hi - lo)) - 1
+        buckets: dict[int, list[int]] = {}
+        for i, value in enumerate(values):
+            buckets.setdefault((value >> lo) & mask, []).append(i)
+        for bucket in buckets.values():
+            if len(bucket) > 1:
+                yield bucket
+
+
+def _popcount(x):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return table[x.view(np.uint8)].reshape(x.shape + (8,)).sum(axis=-1)
+
+
+def _close_pairs(values: list[int], max_distance: int) -> Iterator[tuple[int, int]]:
+    """Index pairs of hashes within ``max_distance`` bits of each other."""
+    arr = np.array(values, dtype=np.uint64) if np is not None else None
+    for bucket in _buckets(values, max_distance):
+        if arr is None or len(bucket) < 8:
+            for n, i in enumerate(bucket):
+                value = values[i]
+                for j in bucket[n + 1:]:
+                    if (value ^ values[j]).bit_count() <= max_distance:
+                        yield i, j
+            continue
+        index = np.array(bucket)
+        hashes = arr[index]
+        # One XOR/popcount per block of rows, bounded to a few million cells
+        block = max(1, 4_000_000 // len(bucket))
+        for start in range(0, len(bucket), block):
+            distances = _popcount(hashes[start:start + block, None] ^ hashes[None, :])
+            rows, cols = np.nonzero(distances <= max_distance)
+            a, b = index[start + rows], index[cols]
+            keep = a < b
+            yield from zip(a[keep].tolist(), b[keep].tolist())
+
+
+def find_duplicates(hashes: dict[str, int],
+                    max_distance: int = DEFAULT_MAX_DISTANCE) -> list[list[str]]:
+    """Group keys whose hashes are within ``max_distance`` bits, largest group first.
+
+    Exact (not approximate): candidate pairs come from ``_buckets`` and are
+    checked with NumPy when it is installed, in plain Python otherwise.
+    """
+    if not 0 <= max_distance < 32:
+        raise ValueError(f"max_distance must be between 0 and 31, not {max_distance}")
+    by_value: dict[int, list[str]] = {}
+    for key, value in hashes.items():
+        by_value.setdefault(value, []).append(key)
+    values = list(by_value)
+
+    # Union-find over distinct hash values
+    parent = list(range(len(values)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in _close_pairs(values, max_distance):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    groups: dict[int, list[str]] = {}
+    for i, value in enumerate(values):
+        groups.setdefault(find(i), []).extend(by_value[value])
+    clusters = [keys for keys in groups.values() if len(keys) > 1]
+    clusters.sort(key=len, reverse=True)
+    return clusters
+
+
+def thumbnail_hashes(thumbs: dict[str, str]) -> dict[str, int]:
+    """Hashes for ``{path: pack key}``; computed once per thumbnail and kept in the manifest."""
+    manifest = get_manifest()
+    keys = list(set(thumbs.values()))
+    known = manifest.lookup_hashes(keys)
+    missing = [key for key in keys if key not in known]
+    pack = get_pack()
+    fresh = {}
+    for i in range(0, len(missing), 256):
+        for key, thumb in pack.get_many(missing[i:i + 256]).items():
+            fresh[key] = dhash(thumb)
+    if fresh:
+        manifest.record_hashes(fresh)
+        known.update(fresh)
+    return {path: known[key] for path, key in thumbs.items() if key in known}
+
+
+def find_library_duplicates(items: list[tuple[str, str, os.stat_result]],
+                            max_distance: int = DEFAULT_MAX_DISTANCE) -> list[list[str]]:
+    """Near-duplicate groups among ``(path, thumbnail key, stat)`` items.
+
+    Items without a thumbnail yet get one generated first. Within each
+    group the largest file comes first, as the copy most worth keeping.
+    """
+    sizes = {path: st.st_size for path, _, st in items}
+    clusters = find_duplicates(thumbnail_hashes(ensure_thumbnails(items)), max_distance)
+    for cluster in clusters:
+        cluster.sort(key=lambda path: sizes.get(path, 0), reverse=True)
+    return clusters
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""Display-independent model of the wallpapers in one folder."""
+
+import os
+import threading
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+from utils.constants import VIDEO_EXTS, THUMB_WIDTH, THUMB_HEIGHT
+from core.scanner import ScanEntry, scan_newest_first, stat_paths
+from core.search_index import NameIndex
+from core.thumbnail_manifest import STATUS_OK, ManifestEntry, get_manifest
+from core.thumbnail_pack import get_pack
+
+# How a search result relates to the previous one, so a view can re-check
+# only the items whose visibility may have changed
+FILTER_UNCHANGED = "unchanged"
+FILTER_STRICTER = "stricter"
+FILTER_LOOSER = "looser"
+FILTER_DIFFERENT = "different"
+
+# Display orders besides search rank and duplicate groups
+SORT_NEWEST = "newest"
+SORT_HUE = "hue"
+SORT_SIZE = "size"
+SORT_RESOLUTION = "resolution"
+SORT_ASPECT = "aspect"
+SORT_DURATION = "duration"
+SORT_MODES = (SORT_NEWEST, SORT_HUE, SORT_SIZE, SORT_RESOLUTION, SORT_ASPECT, SORT_DURATION)
+# Orders that read the media index
+_MEDIA_SORTS = {SORT_RESOLUTION, SORT_ASPECT, SORT_DURATION}
+
+if TYPE_CHECKING:
+    from core.colours import Colours
+    from core.metadata import MediaInfo
+
+
+def _filter_change(previous: Optional[set], current: Optional[set]) -> str:
+    """The ``FILTER_*`` change between two sets of matching paths (None: all)."""
+    if previous is None and current is None:
+        return FILTER_UNCHANGED
+    if previous is None:
+        return FILTER_STRICTER
+    if current is None:
+        return FILTER_LOOSER
+    if current <= previous:
+        return FILTER_STRICTER
+    if previous <= current:
+        return FILTER_LOOSER
+    return FILTER_DIFFERENT
+
+
+class LibraryItem:
+    """One wallpaper file and the state of its thumbnail."""
+
+    def __init__(self, entry: ScanEntry):
+        self.path = entry.path
+        self.name = entry.name
+        self.stat = entry.stat
+        self.mtime = entry.stat.st_mtime_ns
+        self.is_video = os.path.splitext(entry.name)[1].lower() in VIDEO_EXTS
+        self.thumbnail = ""
+        self.thumbnail_failed = False
+        self.thumb_requested = False
+        self.decode_requested = False
+        # Set once an unreadable thumbnail was regenerated, so it is not retried forever
+        self.regenerated = False
+        # Where a view shows the item, -1 while it shows none; schedules its thumbnail
+        self.position = -1
+
+
+class LibraryModel:
+    """The wallpapers of one folder, the active search and their order.
+
+    ``load`` scans on a background thread and hands batches to the owning
+    thread through ``dispatch(fn, *args)`` (the gallery passes the GTK
+    main-loop batcher; the default calls inline), so all state changes
+    happen on one thread; only ``playlist`` may be called from others, so
+    changes to ``items`` take a short lock. ``on_added`` and
+    ``on_removed`` get the items that came and went, ``on_loaded`` fires
+    once a scan completes. Each load starts a new generation; whatever a
+    superseded scan posts afterwards is ignored. Views reset themselves
+    when they call ``load``.
+
+    ``item_factory`` builds the items, which lets a toolkit use its own
+    subclass of ``LibraryItem`` (the gallery's is a ``GObject``).
+
+    Colour sorting and filtering read ``colours`` (path -> ``Colours``),
+    size, aspect and duration ones read ``media`` (path -> ``MediaInfo``);
+    the owner fills both through ``set_colours`` and ``set_media`` from
+    the persistent indexes, so no file is opened or decoded per query.
+    """
+
+    def __init__(self, recursive: bool = False, max_depth: int = 3, fuzzy_search: bool = True,
+                 item_factory: Callable[[ScanEntry], LibraryItem] = LibraryItem,
+                 dispatch: Optional[Callable] = None,
+                 on_added: Optional[Callable[[list[LibraryItem]], None]] = None,
+                 on_removed: Optional[Callable[[list[LibraryItem]], None]] = None,
+                 on_loaded: Optional[Callable[[], None]] = None,
+                 batch_size: int = 256):
+        self.recursive = recursive
+        self.max_depth = max_depth
+        self.item_factory = item_factory
+        self.dispatch = dispatch or (lambda fn, *args: fn(*args))
+        self.on_added = on_added
+        self.on_removed = on_removed
+        self.on_loaded = on_loaded
+        self.batch_size = batch_size
+
+        self.items: dict[str, LibraryItem] = {}
+        # Held while ``items`` changes, for ``playlist`` on other threads
+        self._items_lock = threading.Lock()
+        self.index = NameIndex(fuzzy=fuzzy_search)
+        self.query = ""
+        # None while not searching, else path -> match score
+        self.scores: Optional[dict[str, float]] = None
+        # None unless showing duplicates, else path -> (group, rank in group)
+        self.duplicates: Optional[dict[str, tuple[int, int]]] = None
+        self.sort = SORT_NEWEST
+        self.colours: dict[str, "Colours"] = {}
+        # None unless filtering by colour, else the paths of that colour
+        self.colour: Optional[str] = None
+        self._colour_paths: Optional[set[str]] = None
+        self.media: dict[str, "MediaInfo"] = {}
+        # Media filters: minimum pixel width and an ``ASPECT_RATIOS`` name
+        self.min_width = 0
+        self.aspect: Optional[str] = None
+        self._media_paths: Optional[set[str]] = None
+        # Sort keys by path, rebuilt lazily after the order changes
+        self._keys: dict[str, tuple] = {}
+        self.directory: Optional[str] = None
+        self.generation = 0
+        self.loading = False
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def load(self, directory: str, background: bool = True) -> int:
+        """Replace the contents with ``directory``'s wallpapers; returns the new generation."""
+        self.generation += 1
+        generation = self.generation
+        with self._items_lock:
+            self.items.clear()
+        self.index.clear()
+        if self.scores is not None:
+            self.scores = {}
+        self.duplicates = None
+        self.colours = {}
+        if self._colour_paths is not None:
+            self._colour_paths = set()
+        self.media = {}
+        if self._media_paths is not None:
+            self._media_paths = set()
+        self._keys = {}
+        self.directory = os.path.abspath(directory)
+        self.loading = True
+        if background:
+            threading.Thread(target=self._scan, args=(self.directory, generation),
+                             daemon=True).start()
+        else:
+            self._scan(self.directory, generation)
+        return generation
+
+    def is_current(self, generation: int) -> bool:
+        return generation == self.generation
+
+    def apply_changes(self, paths: Iterable[str]) -> None:
+        """Re-check ``paths`` (e.g. after filesystem events) and update only those items."""
+        if self.directory is None:
+            return
+        generation = self.generation
+        directory = self.directory
+        paths = set(paths)
+        if not self.recursive:
+            paths = {p for p in paths if os.path.dirname(p) == directory}
+        if not paths:
+            return
+
+        def worker():
+            try:
+                present, gone = stat_paths(paths)
+                manifest = get_manifest()
+                known = manifest.lookup_directory(directory, THUMB_WIDTH, THUMB_HEIGHT)
+                batch = self._resolve(manifest, known, present)
+                self.dispatch(self._apply_changes, batch, gone, generation)
+            except Exception as e:
+                self.dispatch(print, f"[wallpygui] Cannot update {directory}: {e}")
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def search(self, query: str) -> str:
+        """Filter by name; returns one of the ``FILTER_*`` changes."""
+        self.query = (query or "").strip()
+        previous = self.scores
+        scores = self.index.search(self.query)
+        self.scores = scores
+        self._keys = {}
+        return _filter_change(None if previous is None else previous.keys(),
+                              None if scores is None else scores.keys())
+
+    def show_duplicates(self, groups: Optional[list[list[str]]]) -> str:
+        """Limit the items to the given duplicate groups, or show all again with None.
+
+        Returns one of the ``FILTER_*`` changes.
+        """
+        previous = self.duplicates
+        self._keys = {}
+        if groups is None:
+            self.duplicates = None
+            return FILTER_UNCHANGED if previous is None else FILTER_LOOSER
+        self.duplicates = {path: (i, rank) for i, group in enumerate(groups)
+                           for rank, path in enumerate(group)}
+        return FILTER_STRICTER if previous is None else FILTER_DIFFERENT
+
+    def set_sort(self, mode: str) -> None:
+        """Order by one of ``SORT_MODES`` (search rank and duplicate groups still come first)."""
+        if mode not in SORT_MODES:
+            raise ValueError(f"Unknown sort mode: {mode}")
+        self.sort = mode
+        self._keys = {}
+
+    def filter_colour(self, name: Optional[str]) -> str:
+        """Show only items whose palette is largely ``name`` (see ``constants.COLOUR_NAMES``).
+
+        None shows all again. Returns one of the ``FILTER_*`` changes.
+        """
+        if (name or None) == self.colour:
+            return FILTER_UNCHANGED
+        self.colour = name or None
+        previous = self._colour_paths
+        self._colour_paths = self._match_colour() if self.colour else None
+        return _filter_change(previous, self._colour_paths)
+
+    def set_colours(self, colours: dict[str, "Colours"]) -> str:
+        """Add colour index entries; returns the ``FILTER_*`` change of the colour filter."""
+        self.colours.update(colours)
+        self._keys = {}
+        if self.colour is None:
+            return FILTER_UNCHANGED
+        previous = self._colour_paths
+        self._colour_paths = self._match_colour()
+        return _filter_change(previous, self._colour_paths)
+
+    def needs_colours(self) -> bool:
+        """Whether the current order or filter reads the colour index."""
+        return self.sorts_by_colour() or self.colour is not None
+
+    def sorts_by_colour(self) -> bool:
+        """Whether the current order reads the colour index."""
+        return self.sort == SORT_HUE
+
+    def filter_media(self, min_width: int = 0, aspect: Optional[str] = None) -> str:
+        """Show only items at least ``min_width`` pixels wide and of the named aspect ratio.
+
+        ``aspect`` is a ``constants.ASPECT_RATIOS`` name; 0 and None don't
+        filter. Returns one of the ``FILTER_*`` changes.
+        """
+        self.min_width = min_width or 0
+        self.aspect = aspect or None
+        previous = self._media_paths
+        self._media_paths = self._match_media() if self.min_width or self.aspect else None
+        return _filter_change(previous, self._media_paths)
+
+    def set_media(self, media: dict[str, "MediaInfo"]) -> str:
+        """Add media index entries; returns the ``FILTER_*`` change of the media filter."""
+        self.media.update(media)
+        self._keys = {}
+        if self._media_paths is None:
+            return FILTER_UNCHANGED
+        previous = self._media_paths
+        self._media_paths = self._match_media()
+        return _filter_change(previous, self._media_paths)
+
+    def needs_media(self) -> bool:
+        """Whether the current order or filter reads the media index."""
+        return self.sorts_by_media() or bool(self.min_width) or self.aspect is not None
+
+    def sorts_by_media(self) -> bool:
+        """Whether the current order reads the media index."""
+        return self.sort in _MEDIA_SORTS
+
+    def media_snapshot(self) -> list[tuple[str, os.stat_result]]:
+        """``(path, stat)`` of the items not in the media index yet."""
+        return [(item.path, item.stat) for item in self.items.values()
+                if item.path not in self.media]
+
+    def thumbnail_snapshot(self) -> list[tuple[str, str, os.stat_result]]:
+        """``(path, thumbnail key, stat)`` of every item that can have a thumbnail."""
+        return [(item.path, item.thumbnail, item.stat) for item in self.items.values()
+                if not item.thumbnail_failed]
+
+    def matches(self, item: LibraryItem) -> bool:
+        scores = self.scores
+        duplicates = self.duplicates
+        colour_paths = self._colour_paths
+        media_paths = self._media_paths
+        return ((scores is None or item.path in scores)
+                and (duplicates is None or item.path in duplicates)
+                and (colour_paths is None or item.path in colour_paths)
+                and (media_paths is None or item.path in media_paths))
+
+    def sort_key(self, item: LibraryItem) -> tuple:
+        """Duplicate groups in order, else best match first while searching,
+        then by the sort mode, newest first among equals."""
+        key = self._keys.get(item.path)
+        if key is None:
+            key = ()
+            if self.duplicates is not None:
+                key += (self.duplicates.get(item.path, (len(self.duplicates), 0)),)
+            if self.scores is not None:
+                key += (-self.scores.get(item.path, 0.0),)
+            if self.sort != SORT_NEWEST:
+                key += (self._mode_key(item),)
+            key += (-item.mtime,)
+            self._keys[item.path] = key
+        return key
+
+    def compare(self, a: LibraryItem, b: LibraryItem) -> int:
+        key_a, key_b = self.sort_key(a), self.sort_key(b)
+        return (key_a > key_b) - (key_a < key_b)
+
+    def visible(self) -> list[LibraryItem]:
+        """The items passing the search and filters, in display order."""
+        scores = self.scores
+        if scores is not None:
+            items = [self.items[p] for p in scores if p in self.items]
+        else:
+            items = list(self.items.values())
+        if (self.duplicates is not None or self._colour_paths is not None
+                or self._media_paths is not None):
+            items = [item for item in items if self.matches(item)]
+        if self.sort == SORT_NEWEST and self.duplicates is None:
+            if scores is None:
+                items.sort(key=lambda item: item.mtime, reverse=True)
+            else:
+                items.sort(key=lambda item: (scores[item.path], item.mtime), reverse=True)
+        else:
+            items.sort(key=self.sort_key)
+        return items
+
+    def playlist(self) -> list[str]:
+        """Paths of the loaded wallpapers, newest first.
+
+        Safe to call from other threads (the rotation scheduler does).
+        """
+        with self._items_lock:
+            items = list(self.items.values())
+        items.sort(key=lambda item: item.mtime, reverse=True)
+        return [item.path for item in items]
+
+    # -- owner thread ----------------------------------------------------
+
+    def _scan(self, directory: str, generation: int) -> None:
+        def stale() -> bool:
+            return not self.loading or generation != self.generation
+
+        try:
+            manifest = get_manifest()
+            pack = get_pack()
+            known = manifest.lookup_directory(directory, THUMB_WIDTH, THUMB_HEIGHT)
+            for entries in scan_newest_first(directory, batch_size=self.batch_size,
+                                             recursive=self.recursive,
+                                             max_depth=self.max_depth,
+                                             should_stop=stale):
+                if stale():
+                    break
+                batch = self._resolve(manifest, known, entries)
+                # Page this batch's thumbnails in before a view asks for them
+                pack.prefetch(e.thumb for _, e in batch if e is not None and e.status == STATUS_OK)
+                self.dispatch(self._add, batch, generation)
+        except Exception as e:
+            self.dispatch(print, f"[wallpygui] Cannot scan {directory}: {e}")
+        finally:
+            if generation == self.generation:
+                self.dispatch(self._loading_done, generation)
+
+    @staticmethod
+    def _resolve(manifest, known: dict[str, ManifestEntry],
+                 entries: list[ScanEntry]) -> list[tuple[ScanEntry, Optional[ManifestEntry]]]:
+        return [
+            (entry, manifest.resolve(known, entry.path, entry.stat.st_mtime_ns, entry.stat.st_size))
+            for entry in entries
+        ]
+
+    def _add(self, batch: list[tuple[ScanEntry, Optional[ManifestEntry]]], generation: int) -> None:
+        if generation != self.generation:
+            return
+        items = []
+        for scan_entry, entry in batch:
+            if scan_entry.path in self.items:
+                # Already added by a filesystem event during the scan
+                continue
+            item = self.item_factory(scan_entry)
+            with self._items_lock:
+                self.items[item.path] = item
+            self.index.add(item.path, item.name)
+            if self.scores is not None:
+                score = self.index.score(self.query, item.name)
+                if score is not None:
+                    self.scores[item.path] = score
+            if entry is not None:
+                # Known to the manifest: no thumbnail job needed
+                item.thumb_requested = True
+                if entry.status == STATUS_OK:
+                    item.thumbnail = entry.thumb
+                else:
+                    item.thumbnail_failed = True
+            items.append(item)
+        if items and self.on_added:
+            self.on_added(items)
+
+    def _apply_changes(self, batch: list[tuple[ScanEntry, Optional[ManifestEntry]]],
+                       gone: list[str], generation: int) -> None:
+        if generation != self.generation:
+            return
+        stale = set(gone)
+        added = []
+        for scan_entry, entry in batch:
+            item = self.items.get(scan_entry.path)
+            if item is not None:
+                if (item.stat.st_mtime_ns, item.stat.st_size) == (
+                        scan_entry.stat.st_mtime_ns, scan_entry.stat.st_size):
+                    continue
+                stale.add(scan_entry.path)  # modified: replace the item
+            added.append((scan_entry, entry))
+        self._remove(stale)
+        if added:
+            self._add(added, generation)
+
+    def _remove(self, paths: set[str]) -> None:
+        with self._items_lock:
+            items = [self.items.pop(p) for p in paths if p in self.items]
+        if not items:
+            return
+        for item in items:
+            self.index.remove(item.path)
+            if self.scores is not None:
+                self.scores.pop(item.path, None)
+            self.colours.pop(item.path, None)
+            self.media.pop(item.path, None)
+            self._keys.pop(item.path, None)
+        if self.on_removed:
+            self.on_removed(items)
+
+    def _mode_key(self, item: LibraryItem) -> tuple:
+        """Sort key of the current mode; items missing from an index go last."""
+        if self.sort == SORT_HUE:
+            from core.colours import hue_key
+            return hue_key(self.colours.get(item.path))
+        if self.sort == SORT_SIZE:
+            return (0, -item.stat.st_size)
+        info = self.media.get(item.path)
+        if info is None or not info.width:
+            return (1, 0.0)
+        if self.sort == SORT_RESOLUTION:
+            return (0, -info.pixels)
+        if self.sort == SORT_ASPECT:
+            return (0, -info.aspect)  # widest first
+        return (0, -info.duration)  # longest video first, images after
+
+    def _match_media(self) -> set[str]:
+        from core.metadata import matches_aspect
+        min_width, aspect = self.min_width, self.aspect
+        return {path for path, info in self.media.items()
+                if info.width >= min_width and (aspect is None or matches_aspect(info, aspect))}
+
+    def _match_colour(self) -> set[str]:
+        from core.colours import MIN_SHARE, colour_share
+        name = self.colour
+        return {path for path, colours in self.colours.items()
+                if colour_share(colours, name) >= MIN_SHARE}
+
+    def _loading_done(self, generation: int) -> None:
+        if generation != self.generation:
+            return
+        self.loading = False
+        if self.on_loaded:
+            self.on_loaded()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Pixel size, duration and codec of wallpapers, read once and kept in the manifest."""
+
+import json
+import os
+import struct
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, NamedTuple, Optional
+
+from utils import tracing
+from utils.constants import ASPECT_RATIOS, VIDEO_EXTS
+from core.thumbnail_manifest import get_manifest
+
+# A picture has one of the ``ASPECT_RATIOS`` within this relative tolerance
+ASPECT_TOLERANCE = 0.02
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, ...)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class MediaInfo(NamedTuple):
+    """What the index knows about one file; zeros when it could not be read."""
+
+    width: int
+    height: int
+    duration: float
+    codec: str
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+    @property
+    def aspect(self) -> float:
+        return self.width / self.height if self.height else 0.0
+
+
+UNKNOWN = MediaInfo(0, 0, 0.0, "")
+
+
+def matches_aspect(info: MediaInfo, name: str) -> bool:
+    """Whether ``info`` has the ``ASPECT_RATIOS`` ratio ``name``, give or take rounding."""
+    ratio = ASPECT_RATIOS[name]
+    return abs(info.aspect - ratio) <= ratio * ASPECT_TOLERANCE
+
+
+def _jpeg_size(f: BinaryIO) -> Optional[tuple[int, int]]:
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            continue  # no payload
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        if marker in _JPEG_SOF:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">HH", data[1:5])
+            return width, height
+        f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+def image_info(path: str) -> Optional[MediaInfo]:
+    """Dimensions from the file header alone (PNG, JPEG, GIF, BMP, WebP).
+
+    Reads a few dozen bytes (JPEG: seeks from segment to segment until the
+    frame header), never the image data. None for anything unrecognised.
+    """
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            width, height = struct.unpack(">II", head[16:24])
+            return MediaInfo(width, height, 0.0, "png")
+        if head[:2] == b"\xff\xd8":
+            size = _jpeg_size(f)
+            return MediaInfo(*size, 0.0, "jpeg") if size else None
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            width, height = struct.unpack("<HH", head[6:10])
+            return MediaInfo(width, height, 0.0, "gif")
+        if head[:2] == b"BM" and len(head) >= 26:
+            width, height = struct.unpack("<ii", head[18:26])
+            return MediaInfo(abs(width), abs(height), 0.0, "bmp")
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            chunk = head[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", head[26:30])
+                return MediaInfo(width & 0x3FFF, height & 0x3FFF, 0.0, "webp")
+            if chunk == b"VP8L":
+                bits = int.from_bytes(head[21:25], "little")
+                return MediaInfo((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, 0.0, "webp")
+            if chunk == b"VP8X":
+                width = int.from_bytes(head[24:27], "little") + 1
+                height = int.from_bytes(head[27:30], "little") + 1
+                return MediaInfo(width, height, 0.0, "webp")
+    return None
+
+
+def ffprobe_info(path: str) -> Optional[MediaInfo]:
+    """Size, duration and codec of a video's first stream; None if ffprobe can't read it."""
+    result = tracing.run([
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "stream=width,height,codec_name:format=duration",
+        "-of",
+        "json",
+        path,
+    ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    if result.returncode != 0:
+        return None
+    try:
+        info = json.loads(result.stdout)
+        stream = info["streams"][0]
+        duration = float(info.get("format", {}).get("duration") or 0.0)
+        return MediaInfo(int(stream["width"]), int(stream["height"]), duration,
+                         stream.get("codec_name", ""))
+    except (ValueError, KeyError, IndexError):
+        return None
+
+
+def read_info(path: str) -> Optional[MediaInfo]:
+    """Uncached ``MediaInfo`` of any supported file.
+
+    ``UNKNOWN`` when the file can't be parsed, None when it couldn't be
+    tried at all (unreadable, or ffprobe missing), which isn't cached.
+    """
+    try:
+        if os.path.splitext(path)[1].lower() in VIDEO_EXTS:
+            return ffprobe_info(path) or UNKNOWN
+        return image_info(path) or UNKNOWN
+    except OSError:
+        return None
+
+
+def media_index(entries: list[tuple[str, os.stat_result]]) -> dict[str, MediaInfo]:
+    """``MediaInfo`` for ``(path, stat)`` pairs, reading only files the manifest lacks.
+
+    Rows are keyed by path and checked against mtime and size, so a file is
+    read again only after it changes. Videos are probed in parallel.
+    """
+    manifest = get_manifest()
+    known = manifest.lookup_media([path for path, _ in entries])
+    found = {}
+    missing = []
+    for path, st in entries:
+        row = known.get(path)
+        if row is not None and row[:2] == (st.st_mtime_ns, st.st_size):
+            found[path] = MediaInfo(*row[2:])
+        else:
+            missing.append((path, st))
+    if missing:
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 2) as executor:
+            infos = list(executor.map(read_info, [path for path, _ in missing]))
+        manifest.record_media([(path, st.st_mtime_ns, st.st_size, *info)
+                               for (path, st), info in zip(missing, infos) if info is not None])
+        found.update((path, info or UNKNOWN) for (path, _), info in zip(missing, infos))
+    return found
+
+
+def probe_video(path: str) -> MediaInfo:
+    """``MediaInfo`` of one video (or image), cached in the manifest."""
+    path = os.path.abspath(path)
+    return media_index([(path, os.stat(path))])[path]
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Streaming directory scanner built on os.scandir."""
+
+import heapq
+import os
+import stat
+import time
+from typing import Callable, Iterator, NamedTuple, Optional
+
+from utils.constants import SUPPORTED_EXTS
+
+# A walk still running after this long hands out the newest files found so far
+FIRST_BATCH_SECONDS = 0.15
+
+
+class ScanEntry(NamedTuple):
+    path: str
+    name: str
+    stat: os.stat_result
+
+
+def _mtime(entry: ScanEntry) -> int:
+    return entry.stat.st_mtime_ns
+
+
+def iter_wallpapers(directory: str, exts: set[str] = SUPPORTED_EXTS, recursive: bool = False,
+                    max_depth: int = 3,
+                    should_stop: Optional[Callable[[], bool]] = None) -> Iterator[ScanEntry]:
+    """Yield supported files below ``directory`` in directory order.
+
+    Stat data comes from the ``DirEntry`` (cached after the first call), so
+    each file costs at most one ``stat``. Subfolders are visited only when
+    ``recursive`` is set, down to ``max_depth`` levels; unreadable
+    subfolders are reported and skipped, while an unreadable ``directory``
+    raises.
+    """
+    stack = [(directory, 0)]
+    while stack:
+        current, depth = stack.pop()
+        try:
+            it = os.scandir(current)
+        except OSError as e:
+            if current == directory:
+                raise
+            print(f"[wallpygui] Skipping unreadable folder {current}: {e}")
+            continue
+        with it:
+            for entry in it:
+                if should_stop and should_stop():
+                    return
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and depth < max_depth and not entry.name.startswith("."):
+                            stack.append((entry.path, depth + 1))
+                        continue
+                    if os.path.splitext(entry.name)[1].lower() not in exts:
+                        continue
+                    if not entry.is_file():
+                        continue
+                    yield ScanEntry(entry.path, entry.name, entry.stat())
+                except OSError:
+                    # Vanished or unreadable entry; keep scanning
+                    continue
+
+
+def scan_newest_first(directory: str, batch_size: int = 256, first: int = 64,
+                      first_seconds: float = FIRST_BATCH_SECONDS,
+                      **kwargs) -> Iterator[list[ScanEntry]]:
+    """Scan ``directory`` and yield batches ordered newest first.
+
+    The first batch holds the ``first`` newest files, picked with a heap so
+    the first screen can be shown before the full sort of the remainder.
+    A walk that takes longer than ``first_seconds`` (a huge or remote
+    folder) does not hold that batch back: it is picked from the files
+    found so far, so it is provisional, and newer files may come in later
+    batches; views ordered by date put them in place as they arrive.
+    Keyword arguments are passed through to ``iter_wallpapers``.
+    """
+    entries: list[ScanEntry] = []
+    provisional = False
+    deadline = time.monotonic() + first_seconds
+    for entry in iter_wallpapers(directory, **kwargs):
+        entries.append(entry)
+        if not provisional and len(entries) % first == 0 and time.monotonic() > deadline:
+            provisional = True
+            head = heapq.nlargest(first, entries, key=_mtime)
+            yield head
+            entries = _without(entries, head)
+    if not entries:
+        return
+    if not provisional and len(entries) > first:
+        head = heapq.nlargest(first, entries, key=_mtime)
+        yield head
+        entries = _without(entries, head)
+
+    entries.sort(key=_mtime, reverse=True)
+    for i in range(0, len(entries), batch_size):
+        yield entries[i:i + batch_size]
+
+
+def _without(entries: list[ScanEntry], head: list[ScanEntry]) -> list[ScanEntry]:
+    paths = {e.path for e in head}
+    return [e for e in entries if e.path not in paths]
+
+
+def stat_paths(paths: set[str], exts: set[str] = SUPPORTED_EXTS) -> tuple[list[ScanEntry], list[str]]:
+    """Re-check individual paths, e.g. after filesystem events.
+
+    Returns the supported files that exist and the paths that are gone (or
+    no longer wallpapers).
+    """
+    present, gone = [], []
+    for path in paths:
+        name = os.path.basename(path)
+        if os.path.splitext(name)[1].lower() not in exts:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            gone.append(path)
+            continue
+        if stat.S_ISREG(st.st_mode):
+            present.append(ScanEntry(path, name, st))
+        else:
+            gone.append(path)
+    return present, gone
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""In-memory filename search index with substring and fuzzy matching."""
+
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Optional
+
+_SEPARATORS = re.compile(r"[\s_\-.]+")
+# Shorter queries match substrings only; longer ones are narrowed by trigrams
+MIN_GRAM_QUERY = 3
+# Scores of short queries: at the start of the name, of a word, anywhere else
+SHORT_SCORES = (3.0, 2.5, 2.0)
+# Marks the start of a name in the gram index (word starts follow a space)
+_HEAD = "\0"
+# Fuzzy matches are looked for only when substrings found fewer names than this
+FUZZY_MIN_MATCHES = 20
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and fold separators to single spaces."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _SEPARATORS.sub(" ", text.lower()).strip()
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _grams(norm: str) -> set[str]:
+    """The 1-, 2- and 3-character substrings of ``norm`` with its start marked."""
+    text = _HEAD + norm
+    return {text[i:i + n] for n in (1, 2, 3) for i in range(len(text) - n + 1)}
+
+
+class NameIndex:
+    """Index of the 1- to 3-character grams of normalized names, keyed by path.
+
+    Queries shorter than ``MIN_GRAM_QUERY`` are answered from the index
+    alone: the names holding the gram, ranked by ``SHORT_SCORES``. Longer
+    ones check only the names holding all their trigrams, and a query that
+    refines the previous one (the old query is contained in the new one)
+    only re-checks the previous matches. The slower subsequence match runs
+    only when substrings gave fewer than ``FUZZY_MIN_MATCHES`` results.
+    """
+
+    def __init__(self, fuzzy: bool = True):
+        self.fuzzy = fuzzy
+        self._names: dict[str, str] = {}
+        self._grams: dict[str, set[str]] = defaultdict(set)
+        self._last_query = ""
+        self._last_result: Optional[dict[str, float]] = None
+        # Whether the last result includes the fuzzy matches too
+        self._last_fuzzy = False
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def clear(self) -> None:
+        self._names.clear()
+        self._grams.clear()
+        self._invalidate()
+
+    def add(self, key: str, name: str) -> None:
+        if key in self._names:
+            self.remove(key)
+        norm = normalize(name)
+        self._names[key] = norm
+        for gram in _grams(norm):
+            self._grams[gram].add(key)
+        self._invalidate()
+
+    def remove(self, key: str) -> None:
+        norm = self._names.pop(key, None)
+        if norm is None:
+            return
+        for gram in _grams(norm):
+            self._grams[gram].discard(key)
+        self._invalidate()
+
+    def search(self, query: str) -> Optional[dict[str, float]]:
+        """Return ``{key: score}`` for matching names, or None for "match all".
+
+        Substring matches always rank above fuzzy (subsequence) matches.
+        """
+        q = normalize(query)
+        if not q:
+            return None
+        if len(q) < MIN_GRAM_QUERY:
+            result = self._short_search(q)
+            self._last_query = q
+            self._last_result = result
+            self._last_fuzzy = False
+            return result
+        names = self._names
+        previous = self._last_result
+        refine = (previous is not None and len(self._last_query) >= MIN_GRAM_QUERY
+                  and self._last_query in q)
+        candidates = previous.keys() if refine else self._gram_candidates(q)
+
+        result = {}
+        for key in candidates:
+            score = self._substring_score(q, names[key])
+            if score is not None:
+                result[key] = score
+
+        fuzzy = self.fuzzy and len(q) >= MIN_GRAM_QUERY and len(result) < FUZZY_MIN_MATCHES
+        if fuzzy:
+            # A refined query's fuzzy matches are among the previous ones only
+            # if those were looked for too
+            pool = previous.keys() if refine and self._last_fuzzy else self._char_candidates(q)
+            pattern = self._fuzzy_pattern(q)
+            for key in pool:
+                if key not in result:
+                    score = self._fuzzy_score(q, names[key], pattern)
+                    if score is not None:
+                        result[key] = score
+
+        self._last_query = q
+        self._last_result = result
+        self._last_fuzzy = fuzzy
+        return result
+
+    def score(self, query: str, name: str) -> Optional[float]:
+        """Score a single name against ``query`` (for items added later)."""
+        q = normalize(query)
+        if not q:
+            return 0.0
+        name = normalize(name)
+        if len(q) < MIN_GRAM_QUERY:
+            if q not in name:
+                return None
+            head, word, other = SHORT_SCORES
+            return head if name.startswith(q) else word if " " + q in name else other
+        score = self._substring_score(q, name)
+        if score is None and self.fuzzy and len(q) >= MIN_GRAM_QUERY:
+            score = self._fuzzy_score(q, name, self._fuzzy_pattern(q))
+        return score
+
+    def _invalidate(self) -> None:
+        self._last_query = ""
+        self._last_result = None
+        self._last_fuzzy = False
+
+    def _short_search(self, q: str) -> dict[str, float]:
+        """Substring matches of a short query, built from the gram sets without
+        visiting names one by one (a letter can match most of a library)."""
+        grams = self._grams
+        head, word, other = SHORT_SCORES
+        result = dict.fromkeys(grams.get(q, ()), other)
+        result.update(dict.fromkeys(grams.get(" " + q, ()), word))
+        result.update(dict.fromkeys(grams.get(_HEAD + q, ()), head))
+        return result
+
+    def _char_candidates(self, q: str) -> set[str]:
+        """Names holding every character of ``q`` (spaces aside)."""
+        return self._intersect([self._grams.get(c, set()) for c in set(q.replace(" ", ""))])
+
+    def _gram_candidates(self, q: str) -> set[str]:
+        """Names holding every trigram of ``q``: a superset of its substring matches."""
+        return self._intersect([self._grams.get(g, set()) for g in _trigrams(q)])
+
+    def _intersect(self, sets: list[set[str]]) -> set[str]:
+        if not sets:
+            return set(self._names)
+        sets.sort(key=len)
+        return set.intersection(*sets)
+
+    @staticmethod
+    def _fuzzy_pattern(q: str) -> re.Pattern:
+        # "m[^t]*t[^n]*n" finds the same leftmost, tightest-from-there span as
+        # "m.*?t.*?n" without backtracking
+        chars = q.replace(" ", "")
+        parts = [re.escape(chars[0])]
+        parts += [f"[^{re.escape(c)}]*{re.escape(c)}" for c in chars[1:]]
+        return re.compile("".join(parts))
+
+    @staticmethod
+    def _substring_score(q: str, name: str) -> Optional[float]:
+        pos = name.find(q)
+        if pos < 0:
+            return None
+        score = 2.0 - min(pos * 0.01 + len(name) * 0.001, 0.9)
+        if pos == 0:
+            score += 1.0
+        elif name[pos - 1] == " ":
+            score += 0.5
+        return score
+
+    @staticmethod
+    def _fuzzy_score(q: str, name: str, pattern: re.Pattern) -> Optional[float]:
+        match = pattern.search(name)
+        if match is None:
+            return None
+        # Tighter spans rank higher; always below any substring match
+        return len(q) / (match.end() - match.start() + 1)
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Persistent SQLite manifest for the thumbnail cache."""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from utils.constants import MANIFEST_FILE
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+
+
+class ManifestEntry(NamedTuple):
+    path: str
+    mtime_ns: int
+    size: int
+    thumb: str
+    status: str
+
+    def matches(self, mtime_ns: int, size: int) -> bool:
+        return self.mtime_ns == mtime_ns and self.size == size
+
+
+class ThumbnailManifest:
+    """Maps (path, mtime_ns, size, dimensions) to a thumbnail pack key.
+
+    Lookups never touch the filesystem, so a warm cache costs one indexed
+    query per file (or one per directory with ``lookup_directory``) instead
+    of resolve/stat/mkdir/exists calls. Known failures are recorded too so
+    broken files are not retried until they change on disk.
+
+    Hits update a last-access time (buffered in memory and flushed in
+    batches) and hit/miss counts are persisted, which is what cache
+    eviction and ``wallpygui cache stats`` work from. Scaled video files
+    are tracked in a second table for the same purpose, and each file's
+    pixel size, duration and codec in a third (from image headers or one
+    ffprobe run) until it changes. Values
+    derived from thumbnail pixels (perceptual hashes, colour palettes) are
+    keyed by pack key, which changes whenever the source file does.
+    """
+
+    FLUSH_EVERY = 256
+
+    def __init__(self, db_path: Path = MANIFEST_FILE):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS thumbnails (
+                path TEXT NOT NULL,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                thumb TEXT NOT NULL,
+                status TEXT NOT NULL,
+                PRIMARY KEY (path, width, height)
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(thumbnails)")}
+        if "accessed" not in columns:
+            self._conn.execute("ALTER TABLE thumbnails ADD COLUMN accessed REAL NOT NULL DEFAULT 0")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS scaled_videos (
+                path TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS media_info (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                duration REAL NOT NULL,
+                codec TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS thumbnail_hashes (
+                thumb TEXT PRIMARY KEY,
+                dhash INTEGER NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS thumbnail_colours (
+                thumb TEXT PRIMARY KEY,
+                average INTEGER NOT NULL,
+                palette TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            # Thumbnails used to be PNG paths; they now live in the pack file
+            self._conn.execute("DELETE FROM thumbnails WHERE status = ?", (STATUS_OK,))
+            self._conn.execute("PRAGMA user_version = 1")
+        if version < 2:
+            # Video probes are part of media_info now, which also has images
+            self._conn.execute("DROP TABLE IF EXISTS video_probes")
+            self._conn.execute("PRAGMA user_version = 2")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self._pending_access: dict[str, float] = {}
+        self._pending_hits = 0
+        self._pending_misses = 0
+        atexit.register(self.flush)
+
+    def lookup(self, path: str, mtime_ns: int, size: int,
+               width: int, height: int) -> Optional[ManifestEntry]:
+        """Return the entry for ``path`` if it is still valid for this stat."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, mtime_ns, size, thumb, status FROM thumbnails "
+                "WHERE path = ? AND width = ? AND height = ?",
+                (path, width, height),
+            ).fetchone()
+        entry = ManifestEntry(*row) if row else None
+        return self.resolve({path: entry} if entry else {}, path, mtime_ns, size)
+
+    def lookup_directory(self, directory: str, width: int, height: int) -> dict[str, ManifestEntry]:
+        """Fetch every entry below ``directory`` in a single range query."""
+        prefix = os.path.join(os.path.abspath(directory), "")
+        # "0" sorts right after "/" so this bounds the prefix range
+        upper = prefix[:-1] + chr(ord(os.sep) + 1)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, mtime_ns, size, thumb, status FROM thumbnails "
+                "WHERE path >= ? AND path < ? AND width = ? AND height = ?",
+                (prefix, upper, width, height),
+            ).fetchall()
+        return {row[0]: ManifestEntry(*row) for row in rows}
+
+    def resolve(self, entries: dict[str, ManifestEntry], path: str,
+                mtime_ns: int, size: int) -> Optional[ManifestEntry]:
+        """Pick a still-valid entry out of a ``lookup_directory`` result."""
+        entry = entries.get(path)
+        if entry is None or not entry.matches(mtime_ns, size):
+            return None
+        with self._lock:
+            self.hits += 1
+            self._pending_hits += 1
+            self._pending_access[path] = time.time()
+            if len(self._pending_access) >= self.FLUSH_EVERY:
+                self._flush_locked()
+        return entry
+
+    def record(self, path: str, mtime_ns: int, size: int, width: int, height: int,
+               thumb: str, status: str = STATUS_OK) -> None:
+        """Store the outcome of a thumbnail generation attempt."""
+        with self._lock:
+            self.misses += 1
+            self._pending_misses += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO thumbnails "
+                "(path, width, height, mtime_ns, size, thumb, status, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, width, height, mtime_ns, size, thumb, status, time.time()),
+            )
+            self._flush_locked()
+
+    def record_scaled_video(self, path: str, source: str) -> None:
+        """Note that the scaled video at ``path`` was created or reused."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scaled_videos (path, source, accessed) VALUES (?, ?, ?)",
+                (path, source, time.time()),
+            )
+            self._conn.commit()
+
+    def lookup_media(self, paths: list[str]) -> dict[str, tuple]:
+        """Stored (mtime_ns, size, width, height, duration, codec) rows by path.
+
+        Callers compare mtime and size with the file's current stat.
+        """
+        found = {}
+        with self._lock:
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                rows = self._conn.execute(
+                    "SELECT path, mtime_ns, size, width, height, duration, codec FROM media_info "
+                    f"WHERE path IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update((row[0], row[1:]) for row in rows)
+        return found
+
+    def record_media(self, rows: list[tuple]) -> None:
+        """Store (path, mtime_ns, size, width, height, duration, codec) rows."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO media_info "
+                "(path, mtime_ns, size, width, height, duration, codec) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def lookup_hashes(self, thumbs: list[str]) -> dict[str, int]:
+        """Stored perceptual hashes for the given pack keys."""
+        found = {}
+        with self._lock:
+            for i in range(0, len(thumbs), 500):
+                chunk = thumbs[i:i + 500]
+                rows = self._conn.execute(
+                    "SELECT thumb, dhash FROM thumbnail_hashes "
+                    f"WHERE thumb IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                # SQLite integers are signed; hashes are unsigned 64-bit
+                found.update((thumb, value & 0xFFFFFFFFFFFFFFFF) for thumb, value in rows)
+        return found
+
+    def record_hashes(self, hashes: dict[str, int]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO thumbnail_hashes (thumb, dhash) VALUES (?, ?)",
+                [(thumb, value - (1 << 64) if value >= 1 << 63 else value)
+                 for thumb, value in hashes.items()],
+            )
+            self._conn.commit()
+
+    def lookup_colours(self, thumbs: list[str]) -> dict[str, tuple[int, str]]:
+        """Stored (average, palette) colour rows for the given pack keys."""
+        found = {}
+        with self._lock:
+            for i in range(0, len(thumbs), 500):
+                chunk = thumbs[i:i + 500]
+                rows = self._conn.execute(
+                    "SELECT thumb, average, palette FROM thumbnail_colours "
+                    f"WHERE thumb IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update((thumb, (average, palette)) for thumb, average, palette in rows)
+        return found
+
+    def record_colours(self, colours: dict[str, tuple[int, str]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO thumbnail_colours (thumb, average, palette) "
+                "VALUES (?, ?, ?)",
+                [(thumb, average, palette) for thumb, (average, palette) in colours.items()],
+            )
+            self._conn.commit()
+
+    def prune_derived(self) -> int:
+        """Drop hashes and colours of thumbnails the manifest no longer references."""
+        removed = 0
+        with self._lock:
+            for table in ("thumbnail_hashes", "thumbnail_colours"):
+                removed += self._conn.execute(
+                    f"DELETE FROM {table} WHERE thumb NOT IN (SELECT thumb FROM thumbnails)"
+                ).rowcount
+            self._conn.commit()
+        return removed
+
+    def flush(self) -> None:
+        """Write buffered access times and hit/miss counts."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE thumbnails SET accessed = ? WHERE path = ?",
+                [(t, p) for p, t in self._pending_access.items()],
+            )
+            self._pending_access.clear()
+        for name, delta in (("hits", self._pending_hits), ("misses", self._pending_misses)):
+            if delta:
+                self._conn.execute(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (name, delta),
+                )
+        self._pending_hits = self._pending_misses = 0
+        self._conn.commit()
+
+    def thumbnail_rows(self) -> list[tuple[str, int, int, str, float]]:
+        """All (path, width, height, thumb, accessed) rows, for cache maintenance."""
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute(
+                "SELECT path, width, height, thumb, accessed FROM thumbnails"
+            ).fetchall()
+
+    def scaled_video_rows(self) -> list[tuple[str, str, float]]:
+        """All (path, source, accessed) rows for scaled videos."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT path, source, accessed FROM scaled_videos"
+            ).fetchall()
+
+    def forget_thumbnails(self, keys: list[tuple[str, int, int]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM thumbnails WHERE path = ? AND width = ? AND height = ?", keys
+            )
+            self._conn.commit()
+
+    def media_paths(self) -> list[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT path FROM media_info")]
+
+    def forget_media(self, paths: list[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM media_info WHERE path = ?", [(p,) for p in paths]
+            )
+            self._conn.commit()
+
+    def forget_scaled_videos(self, paths: list[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM scaled_videos WHERE path = ?", [(p,) for p in paths]
+            )
+            self._conn.commit()
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._flush_locked()
+            entries, failed = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(status = ?), 0) FROM thumbnails",
+                (STATUS_FAILED,),
+            ).fetchone()
+            counters = dict(self._conn.execute("SELECT name, value FROM counters"))
+        lifetime_hits = counters.get("hits", 0)
+        lifetime_total = lifetime_hits + counters.get("misses", 0)
+        return {
+            "entries": entries,
+            "failed": failed,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "lifetime_hit_rate": lifetime_hits / lifetime_total if lifetime_total else 0.0,
+        }
+
+
+_manifest: Optional[ThumbnailManifest] = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest() -> ThumbnailManifest:
+    """Return the process-wide manifest, opening it on first use."""
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = ThumbnailManifest()
+        return _manifest
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""Append-only, memory-mapped pack file of raw thumbnail pixels."""
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+from utils.constants import PACK_FILE
+
+FILE_MAGIC = b"WPYPACK1"
+RECORD_MAGIC = b"WREC"
+# magic, key digest, width, height, flags, channels, payload length
+RECORD = struct.Struct("<4s32sHHBB2xI")
+FLAG_TOMBSTONE = 1
+# Ranges closer than this are merged into one read-ahead request
+PREFETCH_GAP = 256 * 1024
+
+
+class Thumbnail(NamedTuple):
+    width: int
+    height: int
+    channels: int
+    pixels: bytes
+
+    @property
+    def stride(self) -> int:
+        return self.width * self.channels
+
+
+class _Slot(NamedTuple):
+    offset: int
+    length: int
+    width: int
+    height: int
+    channels: int
+
+
+class ThumbnailPack:
+    """Stores thumbnails as zlib-compressed pixel rows in one pack file.
+
+    A 30k-image library becomes one file instead of 30k PNGs: records are
+    appended, the index is rebuilt on open by walking record headers, and
+    reads go through ``mmap`` so a directory's thumbnails can be paged in
+    with a few large sequential reads (see ``prefetch``). Deleting appends
+    a tombstone; ``compact`` rewrites the live records to reclaim space.
+    Appends take an exclusive ``flock`` so several processes can share it.
+    """
+
+    def __init__(self, path: Path = PACK_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._index: dict[bytes, _Slot] = {}
+        self._map: Optional[mmap.mmap] = None
+        self._fd = -1
+        self._ino = 0
+        self._scanned = 0
+        self.dead_bytes = 0
+        self._open()
+
+    # -- public API ----------------------------------------------------
+
+    def put(self, key: str, width: int, height: int, channels: int, pixels: bytes) -> None:
+        payload = zlib.compress(pixels, 1)
+        header = RECORD.pack(RECORD_MAGIC, bytes.fromhex(key), width, height, 0,
+                             channels, len(payload))
+        self._append([(header, payload)])
+
+    def get(self, key: str) -> Optional[Thumbnail]:
+        digest = bytes.fromhex(key)
+        with self._lock:
+            slot = self._index.get(digest)
+            if slot is None:
+                # Possibly written by another process since we last looked
+                self._refresh()
+                slot = self._index.get(digest)
+            if slot is None:
+                return None
+            data = self._read(slot)
+        return self._decode(slot, data)
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Thumbnail]:
+        """Read several thumbnails in file order."""
+        with self._lock:
+            slots = [(k, self._index.get(bytes.fromhex(k))) for k in keys]
+            slots = sorted(((k, s) for k, s in slots if s is not None), key=lambda ks: ks[1].offset)
+            self._advise([s for _, s in slots])
+            raw = [(k, s, self._read(s)) for k, s in slots]
+        return {k: self._decode(s, data) for k, s, data in raw}
+
+    def prefetch(self, keys: Iterable[str]) -> None:
+        """Ask the kernel to read the given thumbnails ahead, in large runs."""
+        with self._lock:
+            slots = [self._index.get(bytes.fromhex(k)) for k in keys]
+            self._advise(sorted((s for s in slots if s is not None), key=lambda s: s.offset))
+
+    def delete(self, keys: Iterable[str]) -> None:
+        records = []
+        with self._lock:
+            for key in keys:
+                digest = bytes.fromhex(key)
+                if digest in self._index:
+                    records.append((RECORD.pack(RECORD_MAGIC, digest, 0, 0, FLAG_TOMBSTONE, 0, 0), b""))
+        if records:
+            self._append(records)
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            self._refresh()
+            return [digest.hex() for digest in self._index]
+
+    def __contains__(self, key: str) -> bool:
+        digest = bytes.fromhex(key)
+        with self._lock:
+            if digest not in self._index:
+                self._refresh()
+            return digest in self._index
+
+    def sizes(self) -> dict[str, int]:
+        """Stored bytes per key, for size-capped eviction."""
+        with self._lock:
+            self._refresh()
+            return {d.hex(): RECORD.size + s.length for d, s in self._index.items()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            live = sum(RECORD.size + s.length for s in self._index.values())
+            return {
+                "entries": len(self._index),
+                "live_bytes": live,
+                "dead_bytes": self.dead_bytes,
+                "file_bytes": self._scanned,
+            }
+
+    def compact(self) -> int:
+        """Rewrite only live records; returns the number of bytes reclaimed."""
+        tmp = self.path.with_suffix(".pack.tmp")
+        with self._lock:
+            self._lock_file()
+            try:
+                self._refresh()
+                before = self._scanned
+                with open(tmp, "wb") as out:
+                    out.write(FILE_MAGIC)
+                    for digest, slot in sorted(self._index.items(), key=lambda kv: kv[1].offset):
+                        out.write(RECORD.pack(RECORD_MAGIC, digest, slot.width, slot.height, 0,
+                                              slot.channels, slot.length))
+                        out.write(self._read(slot))
+                    out.flush()
+                    os.fsync(out.fileno())
+                os.replace(tmp, self.path)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._close()
+            self._open()
+            return max(0, before - self._scanned)
+
+    # -- internals -----------------------------------------------------
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        st = os.fstat(self._fd)
+        self._ino = st.st_ino
+        if st.st_size == 0:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size == 0:
+                    os.write(self._fd, FILE_MAGIC)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._index.clear()
+        self._scanned = len(FILE_MAGIC)
+        self.dead_bytes = 0
+        self._map = None
+        self._refresh()
+
+    def _close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _remap(self) -> int:
+        """Map the file at its current size and return that size.
+
+        Also remaps after the file shrank (``_append`` truncates a torn
+        tail): touching mapped pages past the end of the file is a SIGBUS.
+        """
+        size = os.fstat(self._fd).st_size
+        if self._map is not None and len(self._map) == size:
+            return size
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._fd, size, access=mmap.ACCESS_READ)
+        return size
+
+    def _refresh(self) -> None:
+        """Index records appended since the last scan (by us or others)."""
+        try:
+            if os.stat(self.path).st_ino != self._ino:
+                # Compacted by another process
+                self._close()
+                self._open()
+                return
+        except FileNotFoundError:
+            return
+        end = self._remap()  # the file's size now, not the old mapping's
+        if self._map[:len(FILE_MAGIC)] != FILE_MAGIC:
+            raise ValueError(f"{self.path} is not a thumbnail pack")
+        pos = self._scanned
+        while pos + RECORD.size <= end:
+            magic, digest, width, height, flags, channels, length = RECORD.unpack_from(self._map, pos)
+            if magic != RECORD_MAGIC or pos + RECORD.size + length > end:
+                break  # torn write at the tail; ignored until overwritten
+            previous = self._index.pop(digest, None)
+            if previous is not None:
+                self.dead_bytes += RECORD.size + previous.length
+            if flags & FLAG_TOMBSTONE:
+                self.dead_bytes += RECORD.size
+            else:
+                self._index[digest] = _Slot(pos + RECORD.size, length, width, height, channels)
+            pos += RECORD.size + length
+        self._scanned = pos
+
+    def _append(self, records: list[tuple[bytes, bytes]]) -> None:
+        with self._lock:
+            self._lock_file()
+            try:
+                self._refresh()
+                # Drop a torn tail left by a crashed writer before appending
+                os.ftruncate(self._fd, self._scanned)
+                os.lseek(self._fd, self._scanned, os.SEEK_SET)
+                os.write(self._fd, b"".join(h + p for h, p in records))
+                self._refresh()
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _lock_file(self) -> None:
+        """Take the append lock on the current pack file, following compactions."""
+        while True:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.stat(self.path).st_ino == self._ino:
+                    return
+            except FileNotFoundError:
+                pass
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._close()
+            self._open()
+
+    def _read(self, slot: _Slot) -> bytes:
+        if slot.offset + slot.length > len(self._map):
+            self._remap()
+        return self._map[slot.offset:slot.offset + slot.length]
+
+    def _advise(self, slots: list[_Slot]) -> None:
+        if not slots or not hasattr(mmap, "MADV_WILLNEED"):
+            return
+        page = mmap.PAGESIZE
+        start = end = None
+        for slot in slots + [None]:
+            if slot is not None and start is not None and slot.offset - end <= PREFETCH_GAP:
+                end = max(end, slot.offset + slot.length)
+                continue
+            if start is not None:
+                aligned = start - start % page
+                try:
+                    self._map.madvise(mmap.MADV_WILLNEED, aligned, end - aligned)
+                except (OSError, ValueError):
+                    pass
+            if slot is not None:
+                start, end = slot.offset, slot.offset + slot.length
+
+    @staticmethod
+    def _decode(slot: _Slot, data: bytes) -> Thumbnail:
+        return Thumbnail(slot.width, slot.height, slot.channels, zlib.decompress(data))
+
+
+_pack: Optional[ThumbnailPack] = None
+_pack_lock = threading.Lock()
+
+
+def get_pack() -> ThumbnailPack:
+    """Return the process-wide pack, opening it on first use."""
+    global _pack
+    with _pack_lock:
+        if _pack is None:
+            _pack = ThumbnailPack()
+        return _pack
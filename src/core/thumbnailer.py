@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""In-process still image thumbnailer built on GdkPixbuf."""
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from gi.repository import GdkPixbuf
+
+
+def _gdk_pixbuf():
+    """GdkPixbuf and GLib, imported on first use so ``core`` loads without PyGObject."""
+    import gi
+    gi.require_version("GdkPixbuf", "2.0")
+    from gi.repository import GdkPixbuf, GLib
+    return GdkPixbuf, GLib
+
+
+def cover_size(src_width: int, src_height: int, width: int, height: int) -> tuple[int, int]:
+    """Smallest size with the source aspect ratio that covers ``width`` x ``height``."""
+    scale = max(width / src_width, height / src_height)
+    return max(width, round(src_width * scale)), max(height, round(src_height * scale))
+
+
+def pixbuf_pixels(pixbuf: "GdkPixbuf.Pixbuf") -> tuple[int, bytes]:
+    """Tightly packed RGB/RGBA rows of ``pixbuf`` (no rowstride padding)."""
+    pixbuf = pixbuf.copy()  # sub-pixbufs share the parent's larger rows
+    channels = pixbuf.get_n_channels()
+    row = pixbuf.get_width() * channels
+    stride = pixbuf.get_rowstride()
+    data = pixbuf.get_pixels()
+    if stride == row:
+        return channels, bytes(data[:row * pixbuf.get_height()])
+    return channels, b"".join(data[y * stride:y * stride + row] for y in range(pixbuf.get_height()))
+
+
+class ImageThumbnailer:
+    """Long-lived decoder for still images.
+
+    Loads through GdkPixbuf at the final cover size, which lets loaders that
+    support it decode at reduced resolution (libjpeg DCT scaling for JPEG)
+    instead of decoding the full image first. The set of extensions the
+    installed loaders understand is probed once and reused. Without
+    PyGObject no extension is supported and callers fall back to ffmpeg.
+    """
+
+    def __init__(self):
+        self.extensions: set[str] = set()
+        try:
+            GdkPixbuf, _ = _gdk_pixbuf()
+        except (ImportError, ValueError):
+            return
+        for fmt in GdkPixbuf.Pixbuf.get_formats():
+            for ext in fmt.get_extensions():
+                self.extensions.add(f".{ext.lower()}")
+
+    def supports(self, filepath: Path) -> bool:
+        return filepath.suffix.lower() in self.extensions
+
+    def load_cover(self, filepath: Path, width: int,
+                   height: int) -> Optional["GdkPixbuf.Pixbuf"]:
+        """Decode ``filepath`` scaled to cover and centre-cropped to the target."""
+        GdkPixbuf, GLib = _gdk_pixbuf()
+        fmt, src_width, src_height = GdkPixbuf.Pixbuf.get_file_info(str(filepath))
+        if fmt is None or src_width <= 0 or src_height <= 0:
+            return None
+        cover_w, cover_h = cover_size(src_width, src_height, width, height)
+        try:
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(str(filepath), cover_w, cover_h, False)
+        except GLib.Error:
+            return None
+        x = (pixbuf.get_width() - width) // 2
+        y = (pixbuf.get_height() - height) // 2
+        return pixbuf.new_subpixbuf(x, y, width, height)
+
+    def render(self, filepath: Path, width: int, height: int) -> Optional[tuple[int, bytes]]:
+        """Return ``(channels, pixels)`` for a ``width`` x ``height`` thumbnail."""
+        pixbuf = self.load_cover(filepath, width, height)
+        if pixbuf is None:
+            return None
+        return pixbuf_pixels(pixbuf)
+
+
+_thumbnailer: Optional[ImageThumbnailer] = None
+
+
+def get_thumbnailer() -> ImageThumbnailer:
+    """Return the process-wide thumbnailer, probing loaders on first use."""
+    global _thumbnailer
+    if _thumbnailer is None:
+        _thumbnailer = ImageThumbnailer()
+    return _thumbnailer
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Thumbnail generation into the pack, and scheduling of it for a library."""
+
+import hashlib
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from utils.constants import VIDEO_EXTS, THUMB_WIDTH, THUMB_HEIGHT
+from core.library import LibraryItem, LibraryModel
+from core.thumbnail_manifest import STATUS_OK, STATUS_FAILED, get_manifest
+from core.thumbnail_pack import get_pack
+from core.thumbnailer import get_thumbnailer
+from core.worker_pool import WorkerPool, get_thumbnail_pool
+
+
+def ffmpeg_thumbnail(filepath: Path, width: int, height: int) -> Optional[bytes]:
+    """Render a cover-and-crop RGB thumbnail with ffmpeg (used for videos)."""
+    # Scale to *cover* the target rect, then crop to exact size
+    filters = (
+        f"scale={width}:{height}:force_original_aspect_ratio=increase,"
+        f"crop={width}:{height}"
+    )
+    if filepath.suffix.lower() in VIDEO_EXTS:
+        filters = f"thumbnail,{filters}"
+
+    result = subprocess.run([
+        "ffmpeg", "-v", "error", "-i", str(filepath),
+        "-vf", filters,
+        "-frames:v", "1", "-f", "rawvideo", "-pix_fmt", "rgb24", "-"
+    ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    expected = width * height * 3
+    if result.returncode != 0 or len(result.stdout) != expected:
+        return None
+    return result.stdout
+
+
+def generate_cached_thumbnail(filepath: Path, width: int = 170, height: int = 106,
+                              stat: Optional[os.stat_result] = None,
+                              force: bool = False) -> Optional[str]:
+    """Generate and cache thumbnail for a file, returning its pack key.
+
+    Produces a uniformly-sized thumbnail by scaling to cover the target
+    dimensions and then centre-cropping to exactly ``width`` x ``height``.
+    Still images are decoded in-process; ffmpeg is only started for videos
+    or formats the image loaders cannot handle. Pixels are stored in the
+    thumbnail pack and results (including failures) are recorded in the
+    manifest, so a warm cache is served without touching the filesystem.
+    Pass ``stat`` when the caller already has it to skip the ``stat()`` call,
+    and ``force`` to render again even though the cache has an entry (e.g.
+    one that turned out to be unreadable).
+    """
+    try:
+        filepath = filepath.expanduser()
+        stat = stat or filepath.stat()
+        source = os.path.abspath(filepath)
+        manifest = get_manifest()
+        pack = get_pack()
+        entry = None
+        if not force:
+            entry = manifest.lookup(source, stat.st_mtime_ns, stat.st_size, width, height)
+        if entry is not None:
+            if entry.status != STATUS_OK:
+                return None
+            if entry.thumb in pack:
+                return entry.thumb
+
+        cache_key = hashlib.sha256(
+            f"{filepath.resolve()}:{stat.st_mtime_ns}:{stat.st_size}:{width}x{height}".encode()
+        ).hexdigest()
+
+        rendered = None
+        if filepath.suffix.lower() not in VIDEO_EXTS:
+            thumbnailer = get_thumbnailer()
+            if thumbnailer.supports(filepath):
+                rendered = thumbnailer.render(filepath, width, height)
+        if rendered is None:
+            pixels = ffmpeg_thumbnail(filepath, width, height)
+            rendered = (3, pixels) if pixels is not None else None
+        if rendered is None:
+            manifest.record(source, stat.st_mtime_ns, stat.st_size, width, height,
+                            "", STATUS_FAILED)
+            return None
+
+        channels, pixels = rendered
+        pack.put(cache_key, width, height, channels, pixels)
+        manifest.record(source, stat.st_mtime_ns, stat.st_size, width, height, cache_key)
+        return cache_key
+    except Exception as e:
+        print(f"Failed to generate thumbnail for {filepath}: {e}")
+        return None
+
+
+def ensure_thumbnails(items: list[tuple[str, str, os.stat_result]]) -> dict[str, str]:
+    """Pack keys for ``(path, key or "", stat)`` items, generating missing ones in parallel."""
+    thumbs = {path: key for path, key, _ in items if key}
+    missing = [(path, st) for path, key, st in items if not key]
+
+    def generate(entry):
+        path, st = entry
+        return path, generate_cached_thumbnail(Path(path), THUMB_WIDTH, THUMB_HEIGHT, stat=st)
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 2) as executor:
+            thumbs.update((path, key) for path, key in executor.map(generate, missing) if key)
+    return thumbs
+
+
+class ThumbnailScheduler:
+    """Generates and decodes thumbnails for a ``LibraryModel`` on a worker pool.
+
+    ``request`` generates a thumbnail the manifest does not know yet;
+    ``request_decode`` loads an existing one through ``decode(key)`` (the
+    gallery turns pack records into textures there, off the main thread).
+    Jobs run lowest ``priority(item)`` first and are tagged with the model
+    generation, so ``cancel_stale`` drops them when another folder loads.
+    Results come back through the model's ``dispatch`` as
+    ``on_ready(item, key, decoded)``; without ``on_ready`` the item's
+    ``thumbnail`` is simply set.
+    """
+
+    def __init__(self, model: LibraryModel, pool: Optional[WorkerPool] = None,
+                 priority: Optional[Callable[[LibraryItem], float]] = None,
+                 decode: Optional[Callable[[str], Any]] = None,
+                 on_ready: Optional[Callable[[LibraryItem, str, Any], None]] = None,
+                 width: int = THUMB_WIDTH, height: int = THUMB_HEIGHT):
+        self.model = model
+        self.pool = pool or get_thumbnail_pool()
+        self.priority = priority or (lambda item: 0.0)
+        self.decode = decode
+        self.on_ready = on_ready
+        self.width = width
+        self.height = height
+        self.generated = 0
+        self.decoded = 0
+        self.failed = 0
+
+    def request(self, item: LibraryItem, force: bool = False) -> None:
+        """Generate ``item``'s thumbnail; ``force`` renders it even if one is cached."""
+        item.thumb_requested = True
+        generation = self.model.generation
+        self.pool.submit(self._generate_job, item, generation, force,
+                         tag=generation, priority=self.priority(item))
+
+    def request_decode(self, item: LibraryItem) -> None:
+        if item.decode_requested:
+            return
+        item.decode_requested = True
+        generation = self.model.generation
+        self.pool.submit(self._decode_job, item, generation, item.thumbnail,
+                         tag=generation, priority=self.priority(item))
+
+    def cancel_stale(self) -> int:
+        generation = self.model.generation
+        return self.pool.cancel(lambda job: job.tag != generation)
+
+    def reprioritize(self, limit: float) -> int:
+        """Re-order pending jobs by ``priority``, dropping those above ``limit``.
+
+        Dropped items can simply be requested again later.
+        """
+        generation = self.model.generation
+
+        def priority(job):
+            if job.tag != generation:
+                return None
+            item = job.args[0]
+            value = self.priority(item)
+            if value > limit:
+                if job.fn == self._decode_job:
+                    item.decode_requested = False
+                else:
+                    item.thumb_requested = False
+                return None
+            return value
+
+        return self.pool.reprioritize(priority)
+
+    def stats(self) -> dict:
+        return {"generated": self.generated, "decoded": self.decoded, "failed": self.failed}
+
+    # -- worker threads --------------------------------------------------
+
+    def _generate_job(self, item: LibraryItem, generation: int, force: bool = False) -> None:
+        if generation != self.model.generation:
+            return
+        key = generate_cached_thumbnail(Path(item.path), width=self.width, height=self.height,
+                                        stat=item.stat, force=force)
+        if generation != self.model.generation:
+            return
+        if key is None:
+            self.model.dispatch(self._failed, item, generation)
+            return
+        decoded = None
+        if self.decode is not None:
+            # Decode here too, so the owner thread only swaps the result in
+            try:
+                decoded = self.decode(key)
+            except Exception:
+                decoded = None
+        self.model.dispatch(self._generated, item, key, decoded, generation)
+
+    def _decode_job(self, item: LibraryItem, generation: int, key: str) -> None:
+        if generation != self.model.generation:
+            return
+        try:
+            decoded = self.decode(key) if self.decode is not None else None
+        except Exception:
+            decoded = None
+        self.model.dispatch(self._decode_done, item, key, decoded, generation)
+
+    # -- owner thread ----------------------------------------------------
+
+    def _generated(self, item: LibraryItem, key: str, decoded: Any, generation: int) -> None:
+        if generation != self.model.generation:
+            return
+        self.generated += 1
+        self._ready(item, key, decoded)
+
+    def _decode_done(self, item: LibraryItem, key: str, decoded: Any, generation: int) -> None:
+        item.decode_requested = False
+        if generation != self.model.generation or item.thumbnail != key:
+            return
+        if decoded is None:
+            if item.regenerated:
+                # Regenerated once and still unreadable; don't loop
+                self._failed(item, generation)
+                return
+            # Evicted from the pack since the manifest was read, or corrupt:
+            # render it again instead of serving the same record
+            item.regenerated = True
+            item.thumbnail = ""
+            self.request(item, force=True)
+            return
+        self.decoded += 1
+        self._ready(item, key, decoded)
+
+    def _failed(self, item: LibraryItem, generation: int) -> None:
+        if generation == self.model.generation:
+            self.failed += 1
+            item.thumbnail_failed = True
+
+    def _ready(self, item: LibraryItem, key: str, decoded: Any) -> None:
+        if self.on_ready is not None:
+            self.on_ready(item, key, decoded)
+        else:
+            item.thumbnail = key
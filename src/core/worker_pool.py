@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Bounded, self-tuning thread pool for background thumbnail work."""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class Job:
+    """A queued unit of work; ``tag`` lets callers cancel related jobs."""
+
+    __slots__ = ("fn", "args", "tag", "priority", "cancelled")
+
+    def __init__(self, fn: Callable, args: tuple, tag: Any, priority: float):
+        self.fn = fn
+        self.args = args
+        self.tag = tag
+        self.priority = priority
+        self.cancelled = False
+
+
+class WorkerPool:
+    """Reusable worker threads fed from a priority queue.
+
+    Concurrency starts at the CPU count and is re-tuned from measured job
+    latency: jobs that mostly wait on I/O or child processes (wall time well
+    above thread CPU time) allow more workers, up to ``max_workers``, while
+    CPU-bound jobs keep the pool at one worker per core. Idle workers above
+    the current target exit on their own.
+    """
+
+    TUNE_EVERY = 16
+
+    def __init__(self, max_workers: Optional[int] = None, name: str = "wallpygui-worker",
+                 nice: int = 0):
+        self.cpu_count = os.cpu_count() or 2
+        self.max_workers = max_workers or self.cpu_count * 2
+        self.target_workers = min(self.cpu_count, self.max_workers)
+        self.name = name
+        self.nice = nice
+
+        self._cond = threading.Condition()
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._workers = 0
+        self._idle = 0
+        self._completed = 0
+        self._avg_wall = 0.0
+        self._avg_cpu = 0.0
+
+    def submit(self, fn: Callable, *args, tag: Any = None, priority: float = 0.0) -> Job:
+        """Queue ``fn(*args)``; lower ``priority`` runs first, FIFO within ties."""
+        job = Job(fn, args, tag, priority)
+        with self._cond:
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            if self._idle:
+                self._cond.notify()
+            elif self._workers < self.target_workers:
+                self._spawn_worker()
+        return job
+
+    def cancel(self, predicate: Callable[[Job], bool]) -> int:
+        """Drop queued jobs matching ``predicate``; running jobs are unaffected."""
+        with self._cond:
+            kept = []
+            dropped = 0
+            for entry in self._heap:
+                if predicate(entry[2]):
+                    entry[2].cancelled = True
+                    dropped += 1
+                else:
+                    kept.append(entry)
+            if dropped:
+                heapq.heapify(kept)
+                self._heap = kept
+            return dropped
+
+    def reprioritize(self, priority_fn: Callable[[Job], Optional[float]]) -> int:
+        """Recompute queued priorities; jobs mapped to ``None`` are dropped.
+
+        Returns the number of dropped jobs.
+        """
+        with self._cond:
+            kept = []
+            dropped = 0
+            for _, seq, job in self._heap:
+                priority = priority_fn(job)
+                if priority is None:
+                    job.cancelled = True
+                    dropped += 1
+                else:
+                    job.priority = priority
+                    kept.append((priority, seq, job))
+            heapq.heapify(kept)
+            self._heap = kept
+            return dropped
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self._workers,
+                "target_workers": self.target_workers,
+                "queued": len(self._heap),
+                "completed": self._completed,
+                "avg_wall_ms": self._avg_wall * 1000,
+                "avg_cpu_ms": self._avg_cpu * 1000,
+            }
+
+    def _spawn_worker(self):
+        self._workers += 1
+        threading.Thread(target=self._worker_loop, name=self.name, daemon=True).start()
+
+    def _worker_loop(self):
+        if self.nice:
+            # Inherited by any process the job starts, too
+            lower_thread_priority(self.nice)
+        while True:
+            with self._cond:
+                while not self._heap:
+                    if self._workers > self.target_workers:
+                        self._workers -= 1
+                        return
+                    self._idle += 1
+                    self._cond.wait()
+                    self._idle -= 1
+                if self._workers > self.target_workers:
+                    self._workers -= 1
+                    return
+                _, _, job = heapq.heappop(self._heap)
+
+            wall_start = time.perf_counter()
+            cpu_start = time.thread_time()
+            try:
+                job.fn(*job.args)
+            except Exception as e:
+                print(f"[wallpygui] Background job failed: {e}")
+            self._record(time.perf_counter() - wall_start, time.thread_time() - cpu_start)
+
+    def _record(self, wall: float, cpu: float):
+        with self._cond:
+            self._completed += 1
+            self._avg_wall += (wall - self._avg_wall) * 0.1
+            self._avg_cpu += (cpu - self._avg_cpu) * 0.1
+            if self._completed % self.TUNE_EVERY:
+                return
+            # Classic sizing rule: cores * (1 + wait / compute)
+            ratio = self._avg_wall / max(self._avg_cpu, 1e-4)
+            target = round(self.cpu_count * min(ratio, 4.0))
+            self.target_workers = max(1, min(self.max_workers, target))
+            while self._heap and self._workers < self.target_workers:
+                self._spawn_worker()
+
+
+def lower_thread_priority(nice: int = 19) -> None:
+    """Lower the calling thread's CPU priority (best effort)."""
+    try:
+        # On Linux niceness is per thread, so this leaves the UI untouched
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+    except (AttributeError, OSError):
+        pass
+
+
+_thumbnail_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_thumbnail_pool() -> WorkerPool:
+    """Return the process-wide pool used for thumbnail generation."""
+    global _thumbnail_pool
+    with _pool_lock:
+        if _thumbnail_pool is None:
+            _thumbnail_pool = WorkerPool(name="wallpygui-thumbs")
+        return _thumbnail_pool
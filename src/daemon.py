@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Headless wallpaper service, served over a Unix socket by the daemon."""
+
+import json
+import os
+import random
+import socketserver
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from utils.ipc import DaemonUnavailable, encode, request, socket_path
+from utils.monitors import get_topology
+from utils.rotation import RotationScheduler
+from core.scanner import iter_wallpapers
+from utils.storage import StorageManager
+from utils.wallpaper_utils import restore, set_wallpaper
+
+
+class Library:
+    """Newest-first list of the wallpapers in one folder.
+
+    The list is rebuilt only when the folder's mtime changes (files added,
+    removed or renamed). Recursive libraries cannot see changes in
+    subfolders that way, so they are also rescanned every ``RESCAN_SECONDS``.
+    Safe to share between the daemon's connection threads.
+    """
+
+    RESCAN_SECONDS = 30
+
+    def __init__(self, directory: str, recursive: bool = False, max_depth: int = 3):
+        self.directory = os.path.abspath(directory)
+        self.recursive = recursive
+        self.max_depth = max_depth
+        self._paths: list[str] = []
+        self._positions: dict[str, int] = {}
+        self._signature: Optional[int] = None
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    def paths(self) -> list[str]:
+        try:
+            signature = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            signature = None
+        with self._lock:
+            expired = self.recursive and time.monotonic() - self._scanned_at > self.RESCAN_SECONDS
+            if signature != self._signature or expired or signature is None:
+                self._scan()
+                self._signature = signature
+            return self._paths
+
+    def position(self, path: str) -> Optional[int]:
+        self.paths()
+        with self._lock:
+            return self._positions.get(path)
+
+    def _scan(self) -> None:
+        try:
+            entries = list(iter_wallpapers(self.directory, recursive=self.recursive,
+                                           max_depth=self.max_depth))
+        except OSError as e:
+            print(f"[wallpygui] Cannot scan {self.directory}: {e}")
+            entries = []
+        entries.sort(key=lambda e: e.stat.st_mtime_ns, reverse=True)
+        self._paths = [e.path for e in entries]
+        self._positions = {p: i for i, p in enumerate(self._paths)}
+        self._scanned_at = time.monotonic()
+
+
+class WallpaperService:
+    """Carries out the client commands against a warm library.
+
+    Used by the daemon for every connection, and in-process by the CLI when
+    no daemon is running, so both paths behave the same. ``_lock`` makes
+    wallpaper changes take turns and is held for a whole apply;
+    ``_state_lock`` only guards the fields ``status`` reports, so a status
+    query answers while a switch is still running.
+    """
+
+    def __init__(self, config: Optional[dict] = None, directory: Optional[str] = None):
+        self.config = config or StorageManager.load_config()
+        self.current = restore()
+        if directory is None:
+            directory = os.path.dirname(self.current) if self.current else str(Path.home())
+        self.library = self._make_library(directory)
+        self.resize = self.config.get("default_resize", "crop")
+        self.started = time.time()
+        self.last_apply_ms = 0.0
+        self.last_apply_steps: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self.rotation = RotationScheduler(
+            source=self._rotation_source,
+            current=lambda: self.current,
+            apply=self._rotate_to,
+            interval=self.config.get("rotation_interval", 600),
+            shuffle=self.config.get("rotation_shuffle", False),
+            prefetch_lead=self.config.get("rotation_prefetch", 30),
+        )
+
+    def handle(self, cmd: str, args: dict) -> Any:
+        handler = getattr(self, f"cmd_{cmd}", None)
+        if handler is None:
+            raise ValueError(f"Unknown command: {cmd}")
+        return handler(**args)
+
+    def cmd_ping(self) -> str:
+        return "pong"
+
+    def cmd_status(self) -> dict:
+        with self._state_lock:
+            library = self.library
+            status = {
+                "pid": os.getpid(),
+                "directory": library.directory,
+                "current": self.current,
+                "resize": self.resize,
+                "uptime": time.time() - self.started,
+                "last_apply_ms": self.last_apply_ms,
+                "last_apply_steps": self.last_apply_steps,
+            }
+        status["wallpapers"] = len(library.paths())
+        status["outputs"] = [o._asdict() for o in get_topology().outputs()]
+        status["rotation"] = self.rotation.status()
+        return status
+
+    def cmd_set(self, path: str, resize: Optional[str] = None) -> str:
+        path = os.path.abspath(os.path.expanduser(path))
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"File not found: {path}")
+        with self._lock:
+            if os.path.dirname(path) != self.library.directory and \
+                    self.library.position(path) is None:
+                library = self._make_library(os.path.dirname(path))
+                with self._state_lock:
+                    self.library = library
+            return self._apply(path, resize)
+
+    def cmd_random(self, resize: Optional[str] = None) -> str:
+        with self._lock:
+            choices = [p for p in self.library.paths() if p != self.current]
+            if not choices:
+                raise LookupError(f"No other wallpapers in {self.library.directory}")
+            return self._apply(random.choice(choices), resize)
+
+    def cmd_next(self, resize: Optional[str] = None) -> str:
+        return self._step(1, resize)
+
+    def cmd_prev(self, resize: Optional[str] = None) -> str:
+        return self._step(-1, resize)
+
+    def cmd_rotate(self, action: str = "status", interval: Optional[float] = None,
+                   shuffle: Optional[bool] = None) -> dict:
+        if action == "start":
+            self.rotation.start(interval, shuffle)
+        elif action == "stop":
+            self.rotation.stop()
+        elif action != "status":
+            raise ValueError(f"Unknown rotate action: {action}")
+        return self.rotation.status()
+
+    def _rotation_source(self) -> tuple[str, list[str]]:
+        with self._state_lock:
+            library = self.library
+        return library.directory, list(library.paths())
+
+    def _rotate_to(self, path: str) -> None:
+        with self._lock:
+            self._apply(path, None, manual=False)
+
+    def _step(self, delta: int, resize: Optional[str]) -> str:
+        with self._lock:
+            paths = self.library.paths()
+            if not paths:
+                raise LookupError(f"No wallpapers in {self.library.directory}")
+            position = self.library.position(self.current)
+            if position is None:
+                position = -1 if delta > 0 else 0
+            return self._apply(paths[(position + delta) % len(paths)], resize)
+
+    def _apply(self, path: str, resize: Optional[str], manual: bool = True) -> str:
+        if resize:
+            with self._state_lock:
+                self.resize = resize
+        if manual and self.rotation.running:
+            # A hand-picked wallpaper gets a full interval on screen
+            self.rotation.postpone()
+        start = time.perf_counter()
+        steps = set_wallpaper(path, self.resize)
+        with self._state_lock:
+            self.last_apply_steps = steps
+            self.last_apply_ms = (time.perf_counter() - start) * 1000
+            self.current = path
+        return path
+
+    def _make_library(self, directory: str) -> Library:
+        return Library(directory, recursive=self.config.get("recursive_scan", False),
+                       max_depth=self.config.get("scan_max_depth", 3))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                message = json.loads(line)
+                cmd = message["cmd"]
+                if cmd == "stop":
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    reply = {"ok": True, "result": "stopping"}
+                else:
+                    reply = {"ok": True,
+                             "result": self.server.service.handle(cmd, message.get("args") or {})}
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            self.wfile.write(encode(reply))
+            self.wfile.flush()
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, service: WallpaperService, path: Path):
+        self.service = service
+        self.path = path
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(path), _Handler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def run_daemon(directory: Optional[str] = None, rotate: bool = False) -> int:
+    """Serve ``WallpaperService`` on the control socket until stopped."""
+    path = socket_path()
+    try:
+        request("ping", timeout=1.0)
+        print(f"[wallpygui] A daemon is already listening on {path}")
+        return 1
+    except (DaemonUnavailable, OSError):
+        pass
+    try:
+        # Left behind by a daemon that did not exit cleanly
+        if path.is_socket():
+            path.unlink()
+    except OSError:
+        pass
+
+    service = WallpaperService(directory=directory)
+    # Query outputs now and follow compositor events from here on
+    get_topology().outputs()
+    if rotate:
+        service.rotation.start()
+    server = DaemonServer(service, path)
+    print(f"[wallpygui] Daemon listening on {path} "
+          f"({len(service.library.paths())} wallpapers in {service.library.directory})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
@@ -9,13 +9,17 @@ import random
 import threading
 
 from utils.constants import APP_ID, APP_TITLE
+from utils.ipc import DaemonUnavailable, request
+from utils.perf import STARTUP_BENCH_DIR, has_mark, mark
 from utils.storage import StorageManager
-from utils.wallpaper_utils import set_wallpaper, restore
 from styles.themes import get_theme_css
 from components.gallery import Gallery
 from components.header_bar import HeaderBar
 from components.footer_bar import FooterBar
 
+# Wallpaper backends, cache GC, pre-scaling and rotation are imported where
+# they are first used, after the first frame is on screen.
+
 
 class WallpaperApp(Gtk.Application):
     """Application root."""
@@ -25,12 +29,21 @@ class WallpaperApp(Gtk.Application):
         self.window = None
 
         self.config = StorageManager.load_config()
-        self.current_dir = Path(restore()).parent if restore() else Path.home()
+        self._current_wallpaper = StorageManager.load_current_wallpaper()
+        if STARTUP_BENCH_DIR:
+            self.current_dir = Path(STARTUP_BENCH_DIR)
+        elif self._current_wallpaper:
+            self.current_dir = Path(self._current_wallpaper).parent
+        else:
+            self.current_dir = Path.home()
         self.resize_var = self.config.get("default_resize", "crop")
+        self.rotation = None
+        self.prescaler = None
     
     def do_activate(self):
         """Create and present main window"""
         if not self.window:
+            mark("activate")
             self.window = Gtk.ApplicationWindow(application=self)
             self.window.set_title(APP_TITLE)
             self.window.set_default_size(1040, 680)
@@ -39,9 +52,31 @@ class WallpaperApp(Gtk.Application):
             
             self._apply_theme()
             self._setup_main_layout()
-            self.gallery.load_directory(str(self.current_dir))
+            self.window.add_tick_callback(self._on_first_frame)
+            # Start scanning once the first frame is queued
+            GLib.idle_add(self._load_directory, str(self.current_dir))
+            # Trim caches once the UI is up and settled
+            GLib.timeout_add_seconds(30, self._start_cache_gc)
+            if STARTUP_BENCH_DIR:
+                GLib.timeout_add(20, self._quit_after_first_thumbnail)
+                GLib.timeout_add_seconds(30, self.quit)
         
         self.window.present()
+
+    def _on_first_frame(self, widget, frame_clock):
+        mark("first frame")
+        return GLib.SOURCE_REMOVE
+
+    def _quit_after_first_thumbnail(self):
+        if has_mark("first thumbnail"):
+            self.quit()
+            return False
+        return True
+
+    def _start_cache_gc(self):
+        from utils.cache_gc import start_background_gc
+        start_background_gc(self.config)
+        return False
     
     def _setup_main_layout(self):
         container = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
@@ -54,13 +89,24 @@ class WallpaperApp(Gtk.Application):
         self.header = HeaderBar(
             on_open_dir=self._on_open_dir,
             on_random=self._on_random_wallpaper,
-            on_search_changed=lambda q: self.gallery.set_filter(q)
+            on_search_changed=lambda q: self.gallery.set_filter(q),
+            on_rotate_toggled=self._on_rotate_toggled,
+            on_duplicates_toggled=lambda active: self.gallery.show_duplicates(active),
+            on_sort_changed=lambda mode: self.gallery.set_sort(mode),
+            on_colour_changed=lambda name: self.gallery.filter_colour(name),
+            on_min_width_changed=lambda width: self.gallery.filter_min_width(width),
+            on_aspect_changed=lambda aspect: self.gallery.filter_aspect(aspect),
         )
         container.append(self.header)
 
         self.gallery = Gallery(
             on_thumbnail_selected=self._on_gallery_selected,
-            on_thumbnail_double_clicked=self._on_gallery_double_clicked
+            on_thumbnail_double_clicked=self._on_gallery_double_clicked,
+            recursive=self.config.get("recursive_scan", False),
+            max_depth=self.config.get("scan_max_depth", 3),
+            fuzzy_search=self.config.get("fuzzy_search", True),
+            texture_cache_mb=self.config.get("texture_cache_mb", 64),
+            duplicate_distance=self.config.get("duplicate_distance", 6),
         )
         container.append(self.gallery)
 
@@ -89,13 +135,75 @@ class WallpaperApp(Gtk.Application):
                 if file:
                     directory = file.get_path()
                     self.current_dir = Path(directory)
-                    self.gallery.load_directory(directory)
+                    self._load_directory(directory)
             dlg.destroy()
             self._open_dir_dialog = None
 
         dialog.connect("response", on_response)
         dialog.show()
     
+    def _load_directory(self, directory: str):
+        self.gallery.load_directory(directory)
+        if self.prescaler is None and self.config.get("prescale_videos", False):
+            from utils.prescale import VideoPrescaler
+            self.prescaler = VideoPrescaler(
+                jobs=self.config.get("prescale_jobs", 1),
+                on_progress=lambda p: GLib.idle_add(self._on_prescale_progress, p),
+            )
+        if self.prescaler is not None:
+            self.footer.set_status("")
+            self.prescaler.start(directory, recursive=self.config.get("recursive_scan", False),
+                                 max_depth=self.config.get("scan_max_depth", 3))
+
+    def _on_prescale_progress(self, progress):
+        if progress.finished:
+            self.footer.set_status("")
+        else:
+            self.footer.set_status(f"Pre-scaling videos {progress.done + 1}/{progress.total}: "
+                                   f"{progress.current} {progress.fraction:.0%}")
+        return False
+
+    def _on_rotate_toggled(self, active: bool):
+        def worker():
+            try:
+                # The daemon keeps rotating after the window closes
+                request("rotate", action="start" if active else "stop")
+                return
+            except DaemonUnavailable:
+                pass
+            except Exception as e:
+                print(f"[wallpygui] Rotation via daemon failed: {e}")
+                return
+            if self.rotation is None:
+                from utils.rotation import RotationScheduler
+                self.rotation = RotationScheduler(
+                    source=lambda: (str(self.current_dir), self.gallery.playlist()),
+                    current=lambda: self._current_wallpaper,
+                    apply=self._apply_from_rotation,
+                    interval=self.config.get("rotation_interval", 600),
+                    shuffle=self.config.get("rotation_shuffle", False),
+                    prefetch_lead=self.config.get("rotation_prefetch", 30),
+                )
+            if active:
+                self.rotation.start()
+            else:
+                self.rotation.stop()
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _apply_from_rotation(self, path: str):
+        """Runs on the rotation thread."""
+        from utils.wallpaper_utils import set_wallpaper
+        set_wallpaper(path, self.resize_var)
+        self._current_wallpaper = path
+        GLib.idle_add(self._show_rotated, path)
+
+    def _show_rotated(self, path: str):
+        # Apply in the footer now means the wallpaper it shows
+        self._selected_path = path
+        self.footer.set_selected_path(path)
+        return False
+
     def _apply_theme(self):
         theme_name = self.config.get("theme", "catppuccin")
         css = get_theme_css(theme_name)
@@ -146,7 +254,15 @@ class WallpaperApp(Gtk.Application):
         def worker():
             success = True
             try:
-                set_wallpaper(path, resize)
+                try:
+                    # Keep a running daemon's state (current, next/prev) in step
+                    request("set", path=path, resize=resize)
+                except DaemonUnavailable:
+                    from utils.wallpaper_utils import set_wallpaper
+                    set_wallpaper(path, resize)
+                    if self.rotation is not None and self.rotation.running:
+                        self.rotation.postpone()
+                self._current_wallpaper = path
             except Exception as e:
                 success = False
                 print(f"[wallpygui] Error applying wallpaper: {e}")
@@ -164,6 +280,7 @@ class WallpaperApp(Gtk.Application):
         return False
     
 def main():
+    mark("imports done")
     app = WallpaperApp()
     return app.run(None)
 
@@ -204,14 +204,20 @@ def get_theme_css(theme_name: str = "catppuccin") -> str:
         border: 1px solid {border};
     }}
 
-    flowboxchild {{
+    gridview {{
+        background: transparent;
+        padding: 10px;
+    }}
+
+    gridview > child {{
         background: transparent;
         border: none;
         border-radius: 0px;
         padding: 0px;
+        margin: 5px;
     }}
 
-    flowboxchild:hover, flowboxchild:selected {{
+    gridview > child:hover, gridview > child:selected {{
         background: transparent;
     }}
 
@@ -229,7 +235,7 @@ def get_theme_css(theme_name: str = "catppuccin") -> str:
     }}
 
     /* Selected thumbnail */
-    .selected-thumb {{
+    .selected-thumb, gridview > child:selected .thumbnail-box {{
         border: 2px solid {accent};
         background: {bg_soft};
     }}
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Size- and age-capped LRU eviction for the thumbnail and video caches."""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from utils.constants import CACHE_DIR
+from core.thumbnail_manifest import get_manifest
+from core.thumbnail_pack import get_pack
+from core.worker_pool import lower_thread_priority
+
+THUMB_DIR = CACHE_DIR / "thumbnails"
+SCALED_VIDEO_DIR = CACHE_DIR / "scaled-videos"
+GC_STAMP = CACHE_DIR / "gc.stamp"
+GC_INTERVAL = 24 * 3600
+# Unreferenced files younger than this may belong to a job in progress
+ORPHAN_GRACE = 3600
+# Compact the pack once this much (and a quarter of it) is dead
+COMPACT_MIN_BYTES = 16 * 1024 * 1024
+
+
+def _dir_usage(directory: Path) -> dict[str, int]:
+    """Map file path -> size for every regular file in ``directory``."""
+    usage = {}
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        usage[entry.path] = entry.stat().st_size
+                except OSError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return usage
+
+
+def _is_settled(path: str, now: float) -> bool:
+    """True unless the file was written recently (it may still be in use)."""
+    try:
+        return now - os.stat(path).st_mtime > ORPHAN_GRACE
+    except OSError:
+        return False
+
+
+def _unlink(path: str) -> int:
+    try:
+        size = os.stat(path).st_size
+        os.unlink(path)
+        return size
+    except OSError:
+        return 0
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Disk usage of both caches plus manifest hit rates."""
+    pack = get_pack().stats()
+    videos = _dir_usage(SCALED_VIDEO_DIR)
+    return {
+        "thumbnails": {"files": pack["entries"], "bytes": pack["file_bytes"],
+                       "dead_bytes": pack["dead_bytes"]},
+        "scaled_videos": {"files": len(videos), "bytes": sum(videos.values())},
+        "manifest": get_manifest().stats(),
+    }
+
+
+def collect_garbage(config: Dict[str, Any]) -> Dict[str, int]:
+    """Evict orphaned, expired and least-recently-used cache entries.
+
+    Orphans are entries whose source file is gone and cached data that no
+    manifest row references (e.g. left behind when a source changed).
+    Remaining entries older than ``cache_max_age_days`` are dropped, then
+    the least recently used ones until each cache fits its size cap. The
+    thumbnail pack is compacted once enough of it is dead.
+    """
+    manifest = get_manifest()
+    now = time.time()
+    max_age = config.get("cache_max_age_days", 60) * 86400
+    report = {"orphans": 0, "expired": 0, "evicted": 0, "freed_bytes": 0}
+
+    # Thumbnails live in the pack; anything in THUMB_DIR is from the old
+    # one-PNG-per-thumbnail layout and no longer referenced
+    for path in _dir_usage(THUMB_DIR):
+        if _is_settled(path, now):
+            report["orphans"] += 1
+            report["freed_bytes"] += _unlink(path)
+
+    pack = get_pack()
+    sizes = pack.sizes()
+    rows = manifest.thumbnail_rows()
+    referenced = {row[3] for row in rows}
+    live = []
+    forget = []
+    for path, width, height, thumb, accessed in rows:
+        if not os.path.exists(path):
+            report["orphans"] += 1
+            forget.append((path, width, height, thumb))
+        elif max_age and now - accessed > max_age:
+            report["expired"] += 1
+            forget.append((path, width, height, thumb))
+        else:
+            live.append((accessed, path, width, height, thumb))
+    unreferenced = [key for key in sizes if key not in referenced]
+    report["orphans"] += len(unreferenced)
+
+    cap = config.get("thumbnail_cache_mb", 256) * 1024 * 1024
+    total = sum(sizes.get(row[4], 0) for row in live)
+    live.sort()
+    for accessed, path, width, height, thumb in live:
+        if total <= cap:
+            break
+        total -= sizes.get(thumb, 0)
+        report["evicted"] += 1
+        forget.append((path, width, height, thumb))
+    manifest.forget_thumbnails([row[:3] for row in forget])
+    pack.delete(unreferenced + [row[3] for row in forget if row[3]])
+    manifest.prune_derived()
+    gone = [path for path in manifest.media_paths() if not os.path.exists(path)]
+    report["orphans"] += len(gone)
+    manifest.forget_media(gone)
+
+    pack_stats = pack.stats()
+    if pack_stats["dead_bytes"] > max(COMPACT_MIN_BYTES, pack_stats["file_bytes"] // 4):
+        report["freed_bytes"] += pack.compact()
+
+    # Scaled videos
+    usage = _dir_usage(SCALED_VIDEO_DIR)
+    rows = {path: (source, accessed) for path, source, accessed in manifest.scaled_video_rows()}
+    forget_videos = []
+    live_videos = []
+    for path, size in usage.items():
+        source, accessed = rows.get(path, (None, 0.0))
+        if source is None and not _is_settled(path, now):
+            continue
+        if source is None or not os.path.exists(source):
+            report["orphans"] += 1
+            forget_videos.append(path)
+        elif max_age and now - accessed > max_age:
+            report["expired"] += 1
+            forget_videos.append(path)
+        else:
+            live_videos.append((accessed, path, size))
+    forget_videos.extend(path for path in rows if path not in usage)
+
+    cap = config.get("video_cache_mb", 4096) * 1024 * 1024
+    total = sum(size for _, _, size in live_videos)
+    live_videos.sort()
+    for accessed, path, size in live_videos:
+        if total <= cap:
+            break
+        total -= size
+        report["evicted"] += 1
+        forget_videos.append(path)
+    for path in forget_videos:
+        report["freed_bytes"] += _unlink(path)
+    manifest.forget_scaled_videos(forget_videos)
+
+    GC_STAMP.parent.mkdir(parents=True, exist_ok=True)
+    GC_STAMP.touch()
+    return report
+
+
+def start_background_gc(config: Dict[str, Any], force: bool = False) -> None:
+    """Run ``collect_garbage`` on a low-priority thread, at most once a day."""
+    try:
+        if not force and time.time() - GC_STAMP.stat().st_mtime < GC_INTERVAL:
+            return
+    except FileNotFoundError:
+        pass
+
+    def worker():
+        lower_thread_priority()
+        try:
+            report = collect_garbage(config)
+            if report["freed_bytes"]:
+                print(f"[wallpygui] Cache cleanup freed {report['freed_bytes'] // 1024} KiB")
+        except Exception as e:
+            print(f"[wallpygui] Cache cleanup failed: {e}")
+
+    threading.Thread(target=worker, name="wallpygui-cache-gc", daemon=True).start()
@@ -3,15 +3,45 @@ from pathlib import Path
 
 # Supported file extensions
 SUPPORTED_EXTS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif", ".mp4", ".mkv", ".mov"}
+VIDEO_EXTS = {".mp4", ".mkv", ".mov"}
+
+# Gallery thumbnail size
+THUMB_WIDTH = 170
+THUMB_HEIGHT = 106
+
+# Colour filter names, chromatic ones with their hue in degrees
+COLOUR_HUES = (("red", 0), ("orange", 30), ("yellow", 55), ("green", 120),
+               ("cyan", 185), ("blue", 225), ("purple", 275), ("pink", 325))
+COLOUR_NAMES = tuple(name for name, _ in COLOUR_HUES) + ("white", "grey", "black")
+
+# Aspect ratio filters, and the minimum widths offered as size filters
+ASPECT_RATIOS = {"21:9": 64 / 27, "16:9": 16 / 9, "16:10": 16 / 10, "3:2": 3 / 2,
+                 "4:3": 4 / 3, "1:1": 1.0, "9:16": 9 / 16}
+MIN_WIDTHS = (1920, 2560, 3840)
 
 # Cache directory and files
+# Created by whichever writer needs it first, not at import time
 CACHE_DIR = Path.home() / ".cache" / "wallpygui"
-CACHE_DIR.mkdir(parents=True, exist_ok=True)
 CONFIG_FILE = CACHE_DIR / "config.json"
+MANIFEST_FILE = CACHE_DIR / "manifest.sqlite3"
+PACK_FILE = CACHE_DIR / "thumbnails.pack"
 
 # Default configuration
 DEFAULT_CONFIG = {
     "default_resize": "crop",
+    "recursive_scan": False,
+    "scan_max_depth": 3,
+    "fuzzy_search": True,
+    "thumbnail_cache_mb": 256,
+    "texture_cache_mb": 64,
+    "video_cache_mb": 4096,
+    "cache_max_age_days": 60,
+    "prescale_videos": False,
+    "prescale_jobs": 1,
+    "rotation_interval": 600,
+    "rotation_shuffle": False,
+    "rotation_prefetch": 30,
+    "duplicate_distance": 6,
     "theme": "catppuccin"  # catppuccin, dracula, nord, gruvbox
 }
 
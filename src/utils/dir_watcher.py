@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Coalescing directory watcher built on Gio.FileMonitor."""
+
+from gi.repository import Gio, GLib
+import time
+from typing import Callable, Optional
+
+
+class DirectoryWatcher:
+    """Watches one directory and reports touched paths in coalesced bursts.
+
+    Every create/delete/move/change event only records the affected path.
+    ``on_changes`` is called on the main loop with the set of touched paths
+    once events have been quiet for ``delay_ms`` (or at most every
+    ``max_delay_ms`` during a long burst), so a sync tool dropping hundreds
+    of files causes a handful of updates rather than hundreds. The callee
+    decides what happened by looking at the paths again.
+    """
+
+    EVENTS = {
+        Gio.FileMonitorEvent.CREATED,
+        Gio.FileMonitorEvent.DELETED,
+        Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+        Gio.FileMonitorEvent.ATTRIBUTE_CHANGED,
+        Gio.FileMonitorEvent.MOVED_IN,
+        Gio.FileMonitorEvent.MOVED_OUT,
+        Gio.FileMonitorEvent.RENAMED,
+    }
+
+    def __init__(self, on_changes: Callable[[set[str]], None],
+                 delay_ms: int = 300, max_delay_ms: int = 2000):
+        self.on_changes = on_changes
+        self.delay_ms = delay_ms
+        self.max_delay_ms = max_delay_ms
+        self._monitor: Optional[Gio.FileMonitor] = None
+        self._pending: set[str] = set()
+        self._first_event = 0.0
+        self._source = 0
+
+    def watch(self, directory: str) -> None:
+        self.stop()
+        try:
+            self._monitor = Gio.File.new_for_path(directory).monitor_directory(
+                Gio.FileMonitorFlags.WATCH_MOVES, None
+            )
+        except GLib.Error as e:
+            print(f"[wallpygui] Cannot watch {directory}: {e.message}")
+            return
+        self._monitor.connect("changed", self._on_changed)
+
+    def stop(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        if self._source:
+            GLib.source_remove(self._source)
+            self._source = 0
+        self._pending.clear()
+
+    def _on_changed(self, monitor, file, other_file, event_type):
+        if event_type not in self.EVENTS:
+            return
+        if not self._pending:
+            self._first_event = time.monotonic()
+        for f in (file, other_file):
+            if f is not None and f.get_path():
+                self._pending.add(f.get_path())
+
+        if self._source:
+            GLib.source_remove(self._source)
+            self._source = 0
+        waited_ms = (time.monotonic() - self._first_event) * 1000
+        delay = 0 if waited_ms >= self.max_delay_ms else self.delay_ms
+        self._source = GLib.timeout_add(delay, self._flush)
+
+    def _flush(self):
+        self._source = 0
+        paths, self._pending = self._pending, set()
+        if paths:
+            self.on_changes(paths)
+        return False
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Client side of the daemon's Unix socket protocol.
+
+Requests and replies are single JSON objects, one per line:
+``{"cmd": "next", "args": {}}`` is answered with ``{"ok": true,
+"result": ...}`` or ``{"ok": false, "error": "..."}``. This module only
+needs the standard library so keybind-driven clients start quickly.
+"""
+
+import json
+import os
+import socket
+import tempfile
+from pathlib import Path
+from typing import Any
+
+
+def socket_path() -> Path:
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "wallpygui.sock"
+    return Path(tempfile.gettempdir()) / f"wallpygui-{os.getuid()}.sock"
+
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening on the socket."""
+
+
+class DaemonError(Exception):
+    """The daemon received the request but could not carry it out."""
+
+
+def encode(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def request(cmd: str, timeout: float = 120.0, **args) -> Any:
+    """Send one command and return its result.
+
+    Raises ``DaemonUnavailable`` when nothing is listening, so callers can
+    fall back to doing the work in-process.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(str(socket_path()))
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise DaemonUnavailable(str(e)) from None
+        sock.sendall(encode({"cmd": cmd, "args": args}))
+        with sock.makefile("rb") as reader:
+            line = reader.readline()
+    finally:
+        sock.close()
+    if not line:
+        raise DaemonError("daemon closed the connection")
+    reply = json.loads(line)
+    if not reply.get("ok"):
+        raise DaemonError(reply.get("error", "unknown error"))
+    return reply.get("result")
+
+
+def is_running() -> bool:
+    try:
+        request("ping", timeout=1.0)
+        return True
+    except (DaemonUnavailable, DaemonError, OSError):
+        return False
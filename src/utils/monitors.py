@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""Cached monitor topology, invalidated by compositor events."""
+
+import json
+import os
+import socket
+import subprocess
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+from utils import tracing
+
+# A JSON list of {"name", "width", "height", "scale"} objects used instead
+# of asking the compositor; it is re-read whenever its mtime changes.
+OUTPUTS_FILE_ENV = "WALLPYGUI_OUTPUTS_FILE"
+
+# Hyprland socket2 events after which the monitor list may differ (a
+# config reload may change modes; ``refresh`` only reports real changes)
+HYPRLAND_EVENTS = {"monitoradded", "monitoraddedv2", "monitorremoved", "monitorremovedv2",
+                   "configreloaded"}
+
+
+class Output(NamedTuple):
+    name: str
+    width: int
+    height: int
+    scale: float = 1.0
+
+
+def hyprland_socket(name: str = ".socket.sock") -> Optional[str]:
+    """Path of one of Hyprland's IPC sockets, if running inside Hyprland."""
+    signature = os.getenv("HYPRLAND_INSTANCE_SIGNATURE")
+    if not signature:
+        return None
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR", f"/run/user/{os.getuid()}")
+    for base in (os.path.join(runtime_dir, "hypr"), "/tmp/hypr"):
+        path = os.path.join(base, signature, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def hyprland_request(command: str) -> Optional[bytes]:
+    """Send one request to Hyprland's command socket and return the reply."""
+    path = hyprland_socket()
+    if path is None:
+        return None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(2)
+        sock.connect(path)
+        sock.sendall(command.encode())
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _parse_hyprland(monitors: list) -> list[Output]:
+    results = []
+    for o in monitors:
+        name = o.get("name") or o.get("id") or o.get("description")
+        w = o.get("width") or (o.get("size", {}).get("width"))
+        h = o.get("height") or (o.get("size", {}).get("height"))
+        if name and w and h:
+            results.append(Output(str(name), int(w), int(h), float(o.get("scale") or 1.0)))
+    return results
+
+
+def _parse_niri(data) -> list[Output]:
+    if isinstance(data, dict):
+        data = data.get("outputs", data)
+    arr = list(data.values()) if isinstance(data, dict) else list(data)
+    results = []
+    for o in arr:
+        if not isinstance(o, dict):
+            continue
+        name = o.get("name") or o.get("connector") or o.get("id")
+        modes = o.get("modes") or []
+        current = o.get("current_mode")
+        mode = modes[current] if isinstance(current, int) and current < len(modes) else {}
+        w = (
+            mode.get("width")
+            or o.get("width")
+            or (o.get("rect", {}).get("w"))
+            or (o.get("current-mode", {}).get("width"))
+            or (o.get("mode", {}).get("width"))
+            or (o.get("mode", {}).get("size", {}).get("width"))
+        )
+        h = (
+            mode.get("height")
+            or o.get("height")
+            or (o.get("rect", {}).get("h"))
+            or (o.get("current-mode", {}).get("height"))
+            or (o.get("mode", {}).get("height"))
+            or (o.get("mode", {}).get("size", {}).get("height"))
+        )
+        scale = (o.get("logical") or {}).get("scale") or 1.0
+        if name and w and h:
+            results.append(Output(str(name), int(w), int(h), float(scale)))
+    return results
+
+
+class MonitorTopology:
+    """Outputs of the running compositor, queried once and kept until they change.
+
+    Hyprland is asked over its command socket and niri over ``$NIRI_SOCKET``
+    (falling back to ``hyprctl``/``niri msg``). A background thread follows
+    Hyprland's socket2 events or niri's event stream and re-queries the
+    list when monitors may have been added, removed or reconfigured;
+    ``on_change`` callbacks run on that thread, and only when the list
+    actually differs (events like config reloads fire far more often).
+    With ``WALLPYGUI_OUTPUTS_FILE`` set, the outputs come from that JSON
+    file instead, which is how tests and setups without a supported
+    compositor describe their monitors.
+    """
+
+    RECONNECT_DELAY = 5.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._outputs: Optional[list[Output]] = None
+        self._file_mtime: Optional[int] = None
+        self._listeners: list[Callable[[], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+
+    def outputs(self) -> list[Output]:
+        self._check_outputs_file()
+        with self._lock:
+            if self._outputs is not None:
+                return list(self._outputs)
+        with tracing.span("query outputs") as sp:
+            outputs = self._query()
+            sp.set(outputs=[o.name for o in outputs])
+        with self._lock:
+            self._outputs = outputs
+        self._ensure_watcher()
+        return list(outputs)
+
+    def sizes(self) -> list[tuple[int, int]]:
+        """Distinct output resolutions, largest first."""
+        return sorted({(o.width, o.height) for o in self.outputs()}, reverse=True)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            changed = self._outputs is not None
+            self._outputs = None
+            listeners = list(self._listeners)
+        if changed:
+            self._notify(listeners)
+
+    def refresh(self) -> None:
+        """Re-query the outputs and notify listeners if they changed."""
+        with self._lock:
+            previous = self._outputs
+        if previous is None:
+            return  # nothing cached; the next ``outputs()`` queries anyway
+        outputs = self._query()
+        with self._lock:
+            self._outputs = outputs
+            listeners = list(self._listeners)
+        if outputs != previous:
+            self._notify(listeners)
+
+    @staticmethod
+    def _notify(listeners: list[Callable[[], None]]) -> None:
+        for callback in listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[wallpygui] Monitor change handler failed: {e}")
+
+    def on_change(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            self._listeners.append(callback)
+
+    # -- querying --------------------------------------------------------
+
+    def _query(self) -> list[Output]:
+        path = os.getenv(OUTPUTS_FILE_ENV)
+        if path:
+            try:
+                with open(path) as f:
+                    return [Output(o["name"], int(o["width"]), int(o["height"]),
+                                   float(o.get("scale", 1.0))) for o in json.load(f)]
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"[wallpygui] Cannot read {path}: {e}")
+                return []
+        for query in (self._query_hyprland, self._query_niri):
+            try:
+                outputs = query()
+            except Exception:
+                continue
+            if outputs:
+                return outputs
+        return []
+
+    @staticmethod
+    def _query_hyprland() -> list[Output]:
+        if not os.getenv("HYPRLAND_INSTANCE_SIGNATURE"):
+            return []
+        reply = None
+        try:
+            reply = hyprland_request("j/monitors")
+        except OSError:
+            pass
+        if reply is None:
+            reply = subprocess.check_output(["hyprctl", "monitors", "-j"],
+                                            stderr=subprocess.DEVNULL)
+        return _parse_hyprland(json.loads(reply))
+
+    @staticmethod
+    def _query_niri() -> list[Output]:
+        path = os.getenv("NIRI_SOCKET")
+        if path:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.settimeout(2)
+                    sock.connect(path)
+                    sock.sendall(b'"Outputs"\n')
+                    with sock.makefile("rb") as reader:
+                        reply = json.loads(reader.readline())
+                return _parse_niri(reply["Ok"]["Outputs"])
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        data = json.loads(subprocess.check_output(["niri", "msg", "-j", "outputs"],
+                                                  stderr=subprocess.DEVNULL))
+        return _parse_niri(data)
+
+    def _check_outputs_file(self) -> None:
+        path = os.getenv(OUTPUTS_FILE_ENV)
+        if not path:
+            return
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._file_mtime:
+            self._file_mtime = mtime
+            self.invalidate()
+
+    # -- event subscription ------------------------------------------------
+
+    def _ensure_watcher(self) -> None:
+        if os.getenv(OUTPUTS_FILE_ENV):
+            return
+        with self._lock:
+            if self._watcher is not None:
+                return
+            if hyprland_socket(".socket2.sock"):
+                target = self._follow_hyprland
+            elif os.getenv("NIRI_SOCKET"):
+                target = self._follow_niri
+            else:
+                return
+            self._watcher = threading.Thread(target=self._follow, args=(target,),
+                                             name="wallpygui-monitors", daemon=True)
+            self._watcher.start()
+
+    def _follow(self, target: Callable[[], None]) -> None:
+        while True:
+            try:
+                target()
+            except (OSError, ValueError):
+                pass
+            # Lost the compositor (restart, crash): anything cached may be stale
+            self.invalidate()
+            time.sleep(self.RECONNECT_DELAY)
+
+    def _follow_hyprland(self) -> None:
+        path = hyprland_socket(".socket2.sock")
+        if path is None:
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(path)
+            with sock.makefile("r") as events:
+                for line in events:
+                    if line.partition(">>")[0] in HYPRLAND_EVENTS:
+                        self.refresh()
+
+    def _follow_niri(self) -> None:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(os.environ["NIRI_SOCKET"])
+            sock.sendall(b'"EventStream"\n')
+            with sock.makefile("rb") as events:
+                events.readline()  # {"Ok": "Handled"}
+                for line in events:
+                    # niri has no output events; workspaces move whenever
+                    # an output appears, disappears or changes (but also on
+                    # ordinary workspace changes, so compare before notifying)
+                    if "WorkspacesChanged" in json.loads(line):
+                        self.refresh()
+
+
+_topology: Optional[MonitorTopology] = None
+_topology_lock = threading.Lock()
+
+
+def get_topology() -> MonitorTopology:
+    """Return the process-wide topology, creating it on first use."""
+    global _topology
+    with _topology_lock:
+        if _topology is None:
+            _topology = MonitorTopology()
+        return _topology
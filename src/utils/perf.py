@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Lightweight runtime counters, reported when WALLPYGUI_PERF is set."""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from utils import tracing
+
+PERF_ENABLED = bool(os.getenv("WALLPYGUI_PERF"))
+# Set by benchmarks/startup.py: open this folder, report startup marks, quit
+STARTUP_BENCH_DIR = os.getenv("WALLPYGUI_STARTUP_BENCH")
+# Moved back by wallpygui.py through ``set_start`` so marks include interpreter start-up
+_START = time.time()
+_marks: dict[str, float] = {}
+
+
+class RateCounter:
+    """Counts events and reports the rate over the last completed second."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._count = 0
+        self.total = 0
+        self.rate = 0.0
+
+    def add(self, n: int = 1) -> None:
+        with self._lock:
+            self._roll(time.monotonic())
+            self._count += n
+            self.total += n
+
+    def per_second(self) -> float:
+        with self._lock:
+            self._roll(time.monotonic())
+            return self.rate
+
+    def _roll(self, now: float) -> None:
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            # An idle gap of several seconds reads as zero, not a stale rate
+            self.rate = self._count / elapsed if elapsed < 2.0 else 0.0
+            self._count = 0
+            self._window_start = now
+
+
+class StepTimer:
+    """Wall time per named step of one operation, in milliseconds.
+
+    Each step is also a tracing span when WALLPYGUI_TRACE is set.
+    """
+
+    def __init__(self):
+        self.steps: dict[str, float] = {}
+
+    @contextmanager
+    def step(self, name: str, **attrs):
+        start = time.perf_counter()
+        try:
+            with tracing.span(name, **attrs) as sp:
+                yield sp
+        finally:
+            self.steps[name] = self.steps.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def total(self) -> float:
+        return sum(self.steps.values())
+
+    def summary(self) -> str:
+        parts = ", ".join(f"{name} {ms:.1f}" for name, ms in self.steps.items())
+        return f"{self.total():.1f} ms ({parts})"
+
+
+def set_start(t0: float) -> None:
+    """Count startup marks from ``t0`` (a ``time.time()`` value) instead of this import."""
+    global _START
+    _START = t0
+
+
+def mark(name: str) -> None:
+    """Record when ``name`` first happened, in ms since the process started."""
+    if name in _marks:
+        return
+    _marks[name] = (time.time() - _START) * 1000
+    if PERF_ENABLED or STARTUP_BENCH_DIR:
+        print(f"[wallpygui] startup: {name} {_marks[name]:.1f} ms", flush=True)
+
+
+def has_mark(name: str) -> bool:
+    return name in _marks
+
+
+def log(message: str) -> None:
+    if PERF_ENABLED:
+        print(f"[wallpygui] perf: {message}")
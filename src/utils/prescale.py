@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Background pre-scaling of a folder's videos to the output resolution."""
+
+import os
+import threading
+from typing import Callable, NamedTuple, Optional
+
+from utils.constants import VIDEO_EXTS
+from core.scanner import iter_wallpapers
+from utils.monitors import get_topology
+from utils.wallpaper_utils import video_variants
+from core.worker_pool import WorkerPool
+
+
+class PrescaleProgress(NamedTuple):
+    done: int
+    total: int
+    current: str
+    fraction: float
+
+    @property
+    def finished(self) -> bool:
+        return self.done >= self.total
+
+
+class VideoPrescaler:
+    """Encodes the per-output copies ``use_mpv`` would make, before they're needed.
+
+    Videos are queued newest first on a dedicated pool of ``jobs`` workers
+    running at nice 19 (ffmpeg inherits it), so applying a video later
+    finds a warm cache entry and only starts mpvpaper. ``on_progress`` is
+    called from worker threads.
+    """
+
+    def __init__(self, jobs: int = 1,
+                 on_progress: Optional[Callable[[PrescaleProgress], None]] = None):
+        self.on_progress = on_progress
+        self._pool = WorkerPool(max_workers=jobs, name="wallpygui-prescale", nice=19)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._done = 0
+        self._total = 0
+        self._last_start: Optional[tuple] = None
+        # Different monitors need different copies
+        get_topology().on_change(self._on_outputs_changed)
+
+    def start(self, directory: str, recursive: bool = False, max_depth: int = 3) -> None:
+        """Queue every video in ``directory``; replaces any previous folder's queue."""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._last_start = (directory, recursive, max_depth)
+        self._pool.cancel(lambda job: job.tag != generation)
+        threading.Thread(target=self._plan, args=(directory, recursive, max_depth, generation),
+                         name="wallpygui-prescale-plan", daemon=True).start()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._last_start = None
+        self._pool.cancel(lambda job: True)
+
+    def _on_outputs_changed(self) -> None:
+        last = self._last_start
+        if last is not None:
+            self.start(*last)
+
+    def _plan(self, directory: str, recursive: bool, max_depth: int, generation: int) -> None:
+        videos = []
+        sizes = get_topology().sizes()
+        if sizes:
+            try:
+                videos = list(iter_wallpapers(directory, exts=VIDEO_EXTS, recursive=recursive,
+                                              max_depth=max_depth))
+            except OSError as e:
+                print(f"[wallpygui] Cannot scan {directory} for videos: {e}")
+        videos.sort(key=lambda e: e.stat.st_mtime_ns, reverse=True)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._done = 0
+            self._total = len(videos)
+        if not videos:
+            self._report("", 1.0)
+            return
+        for priority, entry in enumerate(videos):
+            self._pool.submit(self._scale, entry.path, sizes, generation,
+                              tag=generation, priority=priority)
+
+    def _scale(self, path: str, sizes: list[tuple[int, int]], generation: int) -> None:
+        if generation != self._generation:
+            return
+        name = os.path.basename(path)
+
+        def progress(fraction: float):
+            if generation == self._generation:
+                self._report(name, fraction)
+
+        try:
+            # The pool already runs ``jobs`` videos side by side
+            video_variants(path, sizes, max_parallel=1, on_progress=progress)
+        except Exception as e:
+            print(f"[wallpygui] Pre-scaling {name} failed: {e}")
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._done += 1
+        self._report(name, 1.0)
+
+    def _report(self, name: str, fraction: float) -> None:
+        if self.on_progress:
+            self.on_progress(PrescaleProgress(self._done, self._total, name, fraction))
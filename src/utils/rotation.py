@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Timed wallpaper rotation with prefetch of the upcoming wallpaper."""
+
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from utils.constants import VIDEO_EXTS
+from utils.perf import log
+
+
+class Playlist:
+    """Order in which one folder's wallpapers are shown.
+
+    Sequential playlists follow the given order starting after the current
+    wallpaper. Shuffled ones deal a random permutation and only reshuffle
+    once every wallpaper has been shown, so nothing repeats early.
+    """
+
+    def __init__(self, shuffle: bool = False):
+        self.shuffle = shuffle
+        self._bag: list[str] = []
+
+    def peek(self, paths: list[str], current: str) -> Optional[str]:
+        if not paths:
+            return None
+        if not self.shuffle:
+            try:
+                return paths[(paths.index(current) + 1) % len(paths)]
+            except ValueError:
+                return paths[0]
+        known = set(paths)
+        self._bag = [p for p in self._bag if p in known and p != current]
+        if not self._bag:
+            self._bag = [p for p in paths if p != current] or list(paths)
+            random.shuffle(self._bag)
+        return self._bag[0]
+
+    def advance(self, path: str) -> None:
+        if path in self._bag:
+            self._bag.remove(path)
+
+
+def prefetch_wallpaper(path: str) -> None:
+    """Warm everything applying ``path`` will need.
+
+    Videos get their per-output scaled copies encoded (the slow part of
+    applying one); images are read ahead into the page cache. Images are
+    not pre-scaled: awww scales them per output itself, in one pass, and
+    a pre-scaled copy would only help with a single output size.
+    """
+    if Path(path).suffix.lower() in VIDEO_EXTS:
+        from utils.monitors import get_topology
+        from utils.wallpaper_utils import video_variants
+        sizes = get_topology().sizes()
+        if sizes:
+            video_variants(path, sizes, max_parallel=1)
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+
+class RotationScheduler:
+    """Applies the next wallpaper every ``interval`` seconds on its own thread.
+
+    ``source`` returns the current folder and its wallpapers (one playlist
+    is kept per folder, so switching folders and back resumes a shuffle),
+    ``current`` the wallpaper on screen and ``apply`` switches to a path;
+    all three are called on the scheduler thread. ``prefetch_lead``
+    seconds before a switch the upcoming wallpaper is prefetched. Ticks
+    never overlap: if an apply (or a suspend) overruns one or more
+    intervals, the missed ticks collapse into a single switch.
+    """
+
+    def __init__(self, source: Callable[[], tuple[str, list[str]]],
+                 current: Callable[[], str], apply: Callable[[str], None],
+                 interval: float = 600, shuffle: bool = False, prefetch_lead: float = 30,
+                 prefetch: Callable[[str], None] = prefetch_wallpaper):
+        self.source = source
+        self.current = current
+        self.apply = apply
+        self.interval = interval
+        self.shuffle = shuffle
+        self.prefetch_lead = prefetch_lead
+        self.prefetch = prefetch
+        self.skipped = 0
+        self._playlists: dict[str, Playlist] = {}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+        self._deadline = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None, shuffle: Optional[bool] = None) -> None:
+        if interval is not None:
+            self.interval = max(1.0, float(interval))
+        if shuffle is not None and shuffle != self.shuffle:
+            self.shuffle = shuffle
+            self._playlists.clear()
+        self._stop = False
+        self.postpone()
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="wallpygui-rotation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop = True
+        self._wake.set()
+
+    def postpone(self) -> None:
+        """Restart the interval, e.g. after the user picked a wallpaper by hand."""
+        self._deadline = time.monotonic() + self.interval
+        self._wake.set()
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "shuffle": self.shuffle,
+            "next_in": max(0.0, self._deadline - time.monotonic()) if self.running else None,
+            "skipped_ticks": self.skipped,
+        }
+
+    def _upcoming(self) -> tuple[Optional[Playlist], Optional[str]]:
+        directory, paths = self.source()
+        playlist = self._playlists.get(directory)
+        if playlist is None:
+            playlist = self._playlists[directory] = Playlist(self.shuffle)
+        return playlist, playlist.peek(paths, self.current())
+
+    def _run(self) -> None:
+        prefetched = None
+        while not self._stop:
+            self._wake.clear()
+            now = time.monotonic()
+            deadline = self._deadline
+            if now < deadline - self.prefetch_lead or (prefetched and now < deadline):
+                wait_until = deadline if prefetched else deadline - self.prefetch_lead
+                self._wake.wait(max(0.0, wait_until - now))
+                if self._deadline != deadline:
+                    prefetched = None  # postponed; the upcoming item may differ
+                continue
+
+            playlist, path = self._upcoming()
+            if path is None:
+                self._wake.wait(self.interval)
+                continue
+            if prefetched != path:
+                try:
+                    self.prefetch(path)
+                except Exception as e:
+                    print(f"[wallpygui] Prefetching {path} failed: {e}")
+                prefetched = path
+                continue  # wait for the actual tick
+
+            start = time.monotonic()
+            try:
+                self.apply(path)
+                playlist.advance(path)
+            except Exception as e:
+                print(f"[wallpygui] Rotation failed to apply {path}: {e}")
+            prefetched = None
+            log(f"rotation: applied {os.path.basename(path)} "
+                f"{(start - deadline) * 1000:+.0f} ms from schedule")
+
+            if self._deadline == deadline:
+                next_deadline = deadline + self.interval
+                now = time.monotonic()
+                if next_deadline <= now:
+                    # Overran (slow apply, suspend): don't fire the backlog
+                    self.skipped += int((now - deadline) // self.interval)
+                    next_deadline = now + self.interval
+                self._deadline = next_deadline
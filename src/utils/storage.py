@@ -21,12 +21,22 @@ class StorageManager:
     def save_json(path: Path, data: Any) -> bool:
         """Save data to a JSON file."""
         try:
+            path.parent.mkdir(parents=True, exist_ok=True)
             path.write_text(json.dumps(data, indent=2))
             return True
         except Exception as e:
             print(f"Failed to save {path}: {e}")
             return False
     
+    @staticmethod
+    def load_current_wallpaper() -> str:
+        """Path of the last applied wallpaper, or "" if none was saved."""
+        try:
+            with open(Path.home() / ".cache" / "wallpaper") as file:
+                return file.read().strip()
+        except OSError:
+            return ""
+
     @staticmethod
     def load_config() -> Dict[str, Any]:
         """Load application configuration."""
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Process-wide LRU cache of decoded thumbnail textures."""
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import gi
+gi.require_version("Gdk", "4.0")
+from gi.repository import Gdk, GLib
+
+from core.thumbnail_pack import Thumbnail, get_pack
+
+
+def texture_from_thumbnail(thumb: Thumbnail) -> Gdk.Texture:
+    fmt = Gdk.MemoryFormat.R8G8B8A8 if thumb.channels == 4 else Gdk.MemoryFormat.R8G8B8
+    return Gdk.MemoryTexture.new(thumb.width, thumb.height, fmt,
+                                 GLib.Bytes.new(thumb.pixels), thumb.stride)
+
+
+class TextureCache:
+    """Keeps recently shown thumbnail textures within a memory budget.
+
+    Keys are pack keys, which already encode the source path, mtime, size
+    and thumbnail dimensions, so an entry can never be stale: switching
+    back to a folder shows its thumbnails without touching the pack. The
+    least recently used textures are dropped once ``resident_bytes``
+    exceeds the budget.
+    """
+
+    def __init__(self, budget_bytes: int = 64 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[Gdk.Texture, int]] = OrderedDict()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def set_budget(self, budget_bytes: int) -> None:
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            self._evict_locked()
+
+    def lookup(self, key: str) -> Optional[Gdk.Texture]:
+        """Return a cached texture without loading it."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get(self, key: str) -> Optional[Gdk.Texture]:
+        """Return the texture for ``key``, loading it from the pack on a miss."""
+        texture = self.lookup(key)
+        if texture is not None:
+            return texture
+        thumb = get_pack().get(key)
+        if thumb is None:
+            return None
+        return self.put(key, thumb)
+
+    def put(self, key: str, thumb: Thumbnail) -> Gdk.Texture:
+        texture = texture_from_thumbnail(thumb)
+        nbytes = len(thumb.pixels)
+        with self._lock:
+            self.misses += 1
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.resident_bytes -= previous[1]
+            self._entries[key] = (texture, nbytes)
+            self.resident_bytes += nbytes
+            self._evict_locked()
+        return texture
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.resident_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "resident_bytes": self.resident_bytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _evict_locked(self) -> None:
+        while self.resident_bytes > self.budget_bytes and self._entries:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.resident_bytes -= nbytes
+            self.evictions += 1
+
+
+_cache: Optional[TextureCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_texture_cache() -> TextureCache:
+    """Return the process-wide texture cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TextureCache()
+        return _cache
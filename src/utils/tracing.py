@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Optional structured tracing spans, enabled with WALLPYGUI_TRACE.
+
+``WALLPYGUI_TRACE=/tmp/apply.json`` writes Chrome trace events (open the
+file in chrome://tracing or ui.perfetto.dev); any other file name gets
+one JSON object per line. When tracing is off, ``span`` returns a shared
+no-op object, so instrumented code pays one function call per span.
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from typing import Optional
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, tracer: "Tracer", name: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.parent: Optional[str] = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = self.tracer.stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._t0
+        self.tracer.stack().pop()
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer.emit(self, duration)
+        return False
+
+
+class Tracer:
+    """Writes finished spans to ``path`` as Chrome trace events or JSON lines."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.chrome = path.endswith(".json")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._file = None
+
+    def stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def emit(self, span: Span, duration: float) -> None:
+        if self.chrome:
+            # The unterminated array form, so appends never rewrite the file
+            event = {"name": span.name, "ph": "X", "ts": span.start * 1e6,
+                     "dur": duration * 1e6, "pid": os.getpid(),
+                     "tid": threading.get_native_id(), "args": span.attrs}
+            line = json.dumps(event, default=str) + ",\n"
+        else:
+            record = {"name": span.name, "ts": span.start, "dur_ms": duration * 1000,
+                      "parent": span.parent, "pid": os.getpid(),
+                      "tid": threading.get_native_id(), **span.attrs}
+            line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            try:
+                if self._file is None:
+                    new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+                    self._file = open(self.path, "a", buffering=1)
+                    if new and self.chrome:
+                        self._file.write("[\n")
+                self._file.write(line)
+            except OSError as e:
+                print(f"[wallpygui] Tracing disabled: {e}")
+                disable()
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable(path: str) -> None:
+    global _tracer
+    _tracer = Tracer(path)
+
+
+def disable() -> None:
+    global _tracer
+    _tracer = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, **attrs):
+    """Context manager timing a block; ``.set()`` adds attributes to it."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, attrs)
+
+
+def run(cmd: list, **kwargs) -> subprocess.CompletedProcess:
+    """``subprocess.run`` recorded as a span with its wall time and exit code."""
+    with span(f"exec {os.path.basename(cmd[0])}", argv=cmd) as sp:
+        result = subprocess.run(cmd, **kwargs)
+        sp.set(returncode=result.returncode)
+        return result
+
+
+if os.getenv("WALLPYGUI_TRACE"):
+    enable(os.environ["WALLPYGUI_TRACE"])
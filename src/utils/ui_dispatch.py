@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Batched, time-budgeted delivery of worker results to the GTK main loop."""
+
+from gi.repository import GLib
+from collections import deque
+import threading
+import time
+from typing import Callable, Optional
+
+from utils.perf import PERF_ENABLED, RateCounter, log
+
+
+class MainThreadBatcher:
+    """Thread-safe callback queue drained from a single idle source.
+
+    Workers call ``post`` instead of ``GLib.idle_add``. Each main-loop turn
+    runs queued callbacks until ``budget_ms`` is spent and then yields, so
+    input and redraws are not starved when thousands of results arrive at
+    once.
+    """
+
+    def __init__(self, budget_ms: float = 4.0):
+        self.budget = budget_ms / 1000
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self.dispatches = RateCounter()
+        self.callbacks = RateCounter()
+        self._last_report = 0.0
+
+    def post(self, fn: Callable, *args) -> None:
+        """Queue ``fn(*args)`` to run on the main thread; safe from any thread."""
+        with self._lock:
+            self._queue.append((fn, args))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        GLib.idle_add(self._drain)
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> dict:
+        return {
+            "dispatches_per_second": self.dispatches.per_second(),
+            "callbacks_per_second": self.callbacks.per_second(),
+            "pending": self.pending(),
+        }
+
+    def _drain(self):
+        start = time.perf_counter()
+        self.dispatches.add()
+        ran = 0
+        try:
+            while True:
+                with self._lock:
+                    if not self._queue:
+                        self._scheduled = False
+                        return False
+                    fn, args = self._queue.popleft()
+                try:
+                    fn(*args)
+                except Exception as e:
+                    print(f"[wallpygui] UI callback failed: {e}")
+                ran += 1
+                if time.perf_counter() - start >= self.budget:
+                    return True
+        finally:
+            self.callbacks.add(ran)
+            if PERF_ENABLED and start - self._last_report >= 1.0:
+                self._last_report = start
+                stats = self.stats()
+                log(f"ui {stats['dispatches_per_second']:.0f} dispatches/s, "
+                    f"{stats['callbacks_per_second']:.0f} callbacks/s, "
+                    f"{stats['pending']} pending")
+
+
+_batcher: Optional[MainThreadBatcher] = None
+
+
+def get_ui_batcher() -> MainThreadBatcher:
+    """Return the process-wide batcher (create it on the main thread)."""
+    global _batcher
+    if _batcher is None:
+        _batcher = MainThreadBatcher()
+    return _batcher
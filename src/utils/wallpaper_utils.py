@@ -2,25 +2,30 @@
 import os
 import subprocess
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 import hashlib
+import mimetypes
 import shutil
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from utils.constants import CACHE_DIR
+from utils import tracing
+from utils.constants import CACHE_DIR, VIDEO_EXTS
+from utils.monitors import get_topology, hyprland_request
+from utils.perf import StepTimer, log
+from utils.storage import StorageManager
+from core.metadata import probe_video
+from core.thumbnail_manifest import get_manifest
 
 
 def restore() -> str:
     """Restore the last used wallpaper path."""
-    file_path = os.path.expanduser("~/.cache/wallpaper")
-    if os.path.exists(file_path):
-        with open(file_path, "r") as file:
-            wallpaper = file.read().strip()
-            return wallpaper
-    return ""
+    return StorageManager.load_current_wallpaper()
 
 
 def no_stdout(cmd: list) -> subprocess.CompletedProcess:
-    return subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return tracing.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
 
 def spawn(cmd: list) -> subprocess.Popen:
@@ -29,38 +34,93 @@ def spawn(cmd: list) -> subprocess.Popen:
     Stdout/stderr are suppressed, and the process starts a new session so it
     won't terminate with the parent.
     """
-    return subprocess.Popen(
-        cmd,
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-        start_new_session=True,
-    )
+    with tracing.span(f"spawn {os.path.basename(cmd[0])}", argv=cmd) as sp:
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        sp.set(pid=proc.pid)
+        return proc
+
+
+class _BackendState:
+    """What this process knows about the wallpaper backends.
+
+    ``mpvpaper`` holds the players we spawned. ``awww_ready`` is set once
+    the awww daemon answered and cleared when a command to it fails.
+    """
+
+    def __init__(self):
+        self.mpvpaper: list[subprocess.Popen] = []
+        self.awww_ready = False
+
+
+_backend = _BackendState()
+
+
+def _find_processes(name: str) -> Optional[list[int]]:
+    """PIDs of processes called ``name``, read from /proc (None without /proc)."""
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+    pids = []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/comm") as f:
+                if f.read().strip() == name:
+                    pids.append(int(entry))
+        except OSError:
+            continue
+    return pids
 
 
 def stop_video_wallpaper() -> None:
-    """Stop any existing mpvpaper process before switching wallpaper modes."""
-    if shutil.which("pkill"):
-        no_stdout(["pkill", "mpvpaper"])
+    """Stop the video wallpaper before switching wallpaper modes.
+
+    Players this process started are stopped directly. Without any on
+    record (the video was set by the CLI, the daemon or a previous run)
+    every ``mpvpaper`` is stopped, as ``pkill`` did, but found by reading
+    /proc instead of starting a process.
+    """
+    if _backend.mpvpaper:
+        for proc in _backend.mpvpaper:
+            if proc.poll() is None:
+                proc.terminate()
+        _backend.mpvpaper.clear()
+        return
+    pids = _find_processes("mpvpaper")
+    if pids is None:
+        if shutil.which("pkill"):
+            no_stdout(["pkill", "mpvpaper"])
+    else:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
 
 
 def reload_hyprland_if_running() -> None:
     """Reload Hyprland only when this process is running inside Hyprland."""
-    if os.getenv("HYPRLAND_INSTANCE_SIGNATURE") and shutil.which("hyprctl"):
+    if not os.getenv("HYPRLAND_INSTANCE_SIGNATURE"):
+        return
+    # Same request hyprctl sends, without starting it
+    try:
+        if hyprland_request("reload") is not None:
+            return
+    except OSError:
+        pass
+    if shutil.which("hyprctl"):
         no_stdout(["hyprctl", "reload"])
 
 
-def use_awww(img_path: str, resize: str = "crop") -> None:
-    """Set wallpaper using awww."""
-    stop_video_wallpaper()
-    # Ensure awww daemon is running; if not, initialize it
-    try:
-        probe = subprocess.run(["awww", "query"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        if probe.returncode != 0:
-            no_stdout(["awww", "init"])
-    except Exception:
-        # Best-effort: continue to try setting the image
-        pass
-    no_stdout([
+def _awww_img(img_path: str, resize: str) -> int:
+    return no_stdout([
         "awww",
         "img",
         "--filter",
@@ -72,175 +132,221 @@ def use_awww(img_path: str, resize: str = "crop") -> None:
         "--transition-type",
         "center",
         img_path,
-    ])
+    ]).returncode
 
 
-def use_mpv(img_path: str) -> None:
-    """Set video wallpaper using mpvpaper, supporting Hyprland and Niri."""
-    import json
-
-    stop_video_wallpaper()
-
-    def get_outputs() -> list[dict]:
-        # Try Hyprland
+def use_awww(img_path: str, resize: str = "crop", timer: Optional[StepTimer] = None) -> None:
+    """Set wallpaper using awww."""
+    timer = timer or StepTimer()
+    with timer.step("stop video"):
+        stop_video_wallpaper()
+    if _backend.awww_ready:
+        with timer.step("awww img"):
+            if _awww_img(img_path, resize) == 0:
+                return
+        # The daemon went away since we last talked to it
+        _backend.awww_ready = False
+    # Ensure awww daemon is running; if not, initialize it
+    with timer.step("awww query"):
         try:
-            hypr_json = subprocess.check_output(["hyprctl", "monitors", "-j"], text=True)
-            hypr_outputs = json.loads(hypr_json)
-            results = []
-            for o in hypr_outputs:
-                name = o.get("name") or o.get("id") or o.get("description")
-                w = o.get("width") or (o.get("size", {}).get("width"))
-                h = o.get("height") or (o.get("size", {}).get("height"))
-                if name and w and h:
-                    results.append({"name": name, "width": int(w), "height": int(h)})
-            if results:
-                return results
+            probe = no_stdout(["awww", "query"])
+            if probe.returncode != 0:
+                no_stdout(["awww", "init"])
         except Exception:
+            # Best-effort: continue to try setting the image
             pass
+    with timer.step("awww img"):
+        _backend.awww_ready = _awww_img(img_path, resize) == 0
 
-        # Try Niri
-        try:
-            niri_json = subprocess.check_output(["niri", "msg", "-j", "outputs"], text=True)
-            data = json.loads(niri_json)
-            arr = data.get("outputs", data if isinstance(data, list) else [])
-            results = []
-            for o in arr:
-                name = o.get("name") or o.get("connector") or o.get("id")
-                w = (
-                    o.get("width")
-                    or (o.get("rect", {}).get("w"))
-                    or (o.get("current-mode", {}).get("width"))
-                    or (o.get("mode", {}).get("width"))
-                    or (o.get("mode", {}).get("size", {}).get("width"))
-                )
-                h = (
-                    o.get("height")
-                    or (o.get("rect", {}).get("h"))
-                    or (o.get("current-mode", {}).get("height"))
-                    or (o.get("mode", {}).get("height"))
-                    or (o.get("mode", {}).get("size", {}).get("height"))
-                )
-                if name and w and h:
-                    results.append({"name": name, "width": int(w), "height": int(h)})
-            if results:
-                return results
-        except Exception:
-            pass
 
-        return []
-    outputs = get_outputs()
-    width = min(o["width"] for o in outputs) if outputs else None
-    height = min(o["height"] for o in outputs) if outputs else None
-
-    result = subprocess.check_output([
-        "ffprobe",
-        "-v",
-        "error",
-        "-select_streams",
-        "v:0",
-        "-show_entries",
-        "stream=width,height",
-        "-of",
-        "csv=s=x:p=0",
-        img_path,
-    ], text=True).strip()
-
-    v_width, v_height = map(int, result.split("x"))
-
-    video = img_path
-    if width and v_width > width:
-        source = Path(img_path).resolve()
-        source_stat = source.stat()
-        scale_key = hashlib.sha256(
-            f"{source}:{source_stat.st_mtime_ns}:{source_stat.st_size}:{width}x{height}".encode()
-        ).hexdigest()
-        scaled = CACHE_DIR / "scaled-videos" / f"{scale_key}.mp4"
-        scaled.parent.mkdir(parents=True, exist_ok=True)
+def scaled_video_path(source: Path, width: int, height: int) -> Path:
+    """Cache location of ``source`` scaled to fit ``width`` x ``height``."""
+    source = source.resolve()
+    source_stat = source.stat()
+    scale_key = hashlib.sha256(
+        f"{source}:{source_stat.st_mtime_ns}:{source_stat.st_size}:{width}x{height}".encode()
+    ).hexdigest()
+    return CACHE_DIR / "scaled-videos" / f"{scale_key}.mp4"
+
+
+# ffmpeg is multi-threaded itself; a couple of encodes saturate most CPUs
+MAX_PARALLEL_ENCODES = 2
+
+_scale_locks: dict[str, threading.Lock] = {}
+_scale_locks_guard = threading.Lock()
+
+
+def scale_video(img_path: str, width: int, height: int,
+                on_progress: Optional[Callable[[float], None]] = None) -> Optional[str]:
+    """Return a copy of the video scaled to fit the output, encoding it if needed.
+
+    Concurrent calls for the same file (an apply while the pre-scaler is
+    busy with it) wait for the first encode instead of starting another.
+    ``on_progress`` receives the encoded fraction, 0.0 to 1.0.
+    """
+    scaled = scaled_video_path(Path(img_path), width, height)
+    with _scale_locks_guard:
+        lock = _scale_locks.setdefault(str(scaled), threading.Lock())
+    with lock, tracing.span("scale video", size=f"{width}x{height}") as sp:
+        sp.set(cached=scaled.exists())
         if not scaled.exists():
-            result = no_stdout([
+            scaled.parent.mkdir(parents=True, exist_ok=True)
+            # Never leave a half-written file under the final name
+            partial = scaled.with_name(f"{scaled.stem}.{os.getpid()}.part.mp4")
+            duration = probe_video(img_path).duration
+            proc = subprocess.Popen([
                 "ffmpeg",
                 "-y",
+                "-nostats",
+                "-progress",
+                "pipe:1",
                 "-i",
                 img_path,
                 "-vf",
                 f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
                 f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2",
-                str(scaled),
-            ])
-            if result.returncode != 0:
-                scaled.unlink(missing_ok=True)
+                str(partial),
+            ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            for line in proc.stdout:
+                key, _, value = line.strip().partition("=")
+                if on_progress and duration and key == "out_time_us" and value.isdigit():
+                    on_progress(min(1.0, int(value) / 1e6 / duration))
+            returncode = proc.wait()
+            sp.set(returncode=returncode)
+            if returncode == 0:
+                os.replace(partial, scaled)
+            else:
+                partial.unlink(missing_ok=True)
+                return None
+        get_manifest().record_scaled_video(str(scaled), str(Path(img_path).resolve()))
+        return str(scaled)
+
 
-        if scaled.exists():
-            video = str(scaled)
+def video_variants(img_path: str, sizes: list[tuple[int, int]], max_parallel: int = 2,
+                   on_progress: Optional[Callable[[float], None]] = None
+                   ) -> dict[tuple[int, int], str]:
+    """Map each output size to the file mpvpaper should play there.
+
+    Sizes the video is larger than get their own scaled copy (encoded up
+    to ``max_parallel`` at a time); the others play the original.
+    ``on_progress`` receives the overall encoded fraction.
+    """
+    info = probe_video(img_path)
+    v_width, v_height = info.width, info.height
+    variants = {size: img_path for size in sizes}
+    todo = [(w, h) for w, h in set(sizes) if v_width > w or v_height > h]
+    if not todo:
+        return variants
+    fractions = dict.fromkeys(todo, 0.0)
+
+    def encode(size: tuple[int, int]) -> Optional[str]:
+        def progress(fraction: float):
+            fractions[size] = fraction
+            if on_progress:
+                on_progress(sum(fractions.values()) / len(fractions))
+        return scale_video(img_path, *size, on_progress=progress)
+
+    if len(todo) == 1 or max_parallel <= 1:
+        results = map(encode, todo)
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_parallel, len(todo)),
+                                thread_name_prefix="wallpygui-encode") as pool:
+            results = list(pool.map(encode, todo))
+    for size, scaled in zip(todo, results):
+        if scaled:
+            variants[size] = scaled
+    return variants
+
+
+def use_mpv(img_path: str) -> None:
+    """Set video wallpaper using mpvpaper, supporting Hyprland and Niri.
+
+    Every output plays a copy that matches its own resolution; outputs with
+    the same resolution share one.
+    """
+    stop_video_wallpaper()
 
+    outputs = get_topology().outputs()
     if outputs:
+        variants = video_variants(img_path, [(o.width, o.height) for o in outputs],
+                                  max_parallel=MAX_PARALLEL_ENCODES)
         for o in outputs:
             # Use non-blocking spawn; mpvpaper is long-running
-            spawn(["mpvpaper", "-s", "-o", "no-audio loop", o["name"], video])
+            _backend.mpvpaper.append(
+                spawn(["mpvpaper", "-s", "-o", "no-audio loop", o.name,
+                       variants[(o.width, o.height)]])
+            )
     else:
         # Fallback: try all outputs if compositor detection failed
-        spawn(["mpvpaper", "-s", "-o", "no-audio loop", "*", video])
-def set_wallpaper(img_path: str, resize: str = "crop") -> None:
-    """Apply wallpaper depending on type (image/video)."""
-    file_type = subprocess.check_output([
-        "file", "-b", "--mime-type", img_path
-    ], text=True).strip()
+        _backend.mpvpaper.append(spawn(["mpvpaper", "-s", "-o", "no-audio loop", "*", img_path]))
+
+
+def detect_mime_type(path: str) -> str:
+    """MIME type from the file name and its first bytes, without running ``file``.
+
+    Without PyGObject (e.g. the CLI on a minimal system) only the name is used.
+    """
+    try:
+        from gi.repository import Gio
+    except ImportError:
+        mime = mimetypes.guess_type(path)[0]
+    else:
+        try:
+            with open(path, "rb") as f:
+                head = f.read(4096)
+        except OSError:
+            head = None
+        content_type, _uncertain = Gio.content_type_guess(path, head)
+        mime = Gio.content_type_get_mime_type(content_type) if content_type else None
+    if mime and mime.split("/")[0] in ("image", "video"):
+        return mime
+    # Unknown to shared-mime-info; fall back to the extension
+    if Path(path).suffix.lower() in VIDEO_EXTS:
+        return "video/x-unknown"
+    return mime or "application/octet-stream"
+
+
+def set_wallpaper(img_path: str, resize: str = "crop") -> dict[str, float]:
+    """Apply wallpaper depending on type (image/video).
+
+    Returns the time spent in each step, in milliseconds.
+    """
+    timer = StepTimer()
+    with tracing.span("set_wallpaper", path=img_path, resize=resize):
+        return _set_wallpaper(img_path, resize, timer)
+
+
+def _set_wallpaper(img_path: str, resize: str, timer: StepTimer) -> dict[str, float]:
+    with timer.step("detect") as sp:
+        file_type = detect_mime_type(img_path)
+        sp.set(mime=file_type)
 
     if not os.getenv("WAL_BACKEND"):
         os.environ["WAL_BACKEND"] = "haishoku"
 
     if file_type.startswith("image/"):
-        use_awww(img_path, resize)
+        use_awww(img_path, resize, timer)
     elif file_type.startswith("video/"):
-        use_mpv(img_path)
+        with timer.step("mpvpaper"):
+            use_mpv(img_path)
     else:
         raise ValueError(f"Unsupported file type: {file_type}")
 
-    reload_hyprland_if_running()
+    with timer.step("hyprland reload"):
+        reload_hyprland_if_running()
     # External colorscheme command removed
 
-    # Save current wallpaper path
-    with open(os.path.expanduser("~/.cache/wallpaper"), "w") as file:
-        file.write(img_path)
-    apply_to_hyperpaper_cfg()
-
+    with timer.step("save"):
+        # Save current wallpaper path
+        state_file = os.path.expanduser("~/.cache/wallpaper")
+        os.makedirs(os.path.dirname(state_file), exist_ok=True)
+        with open(state_file, "w") as file:
+            file.write(img_path)
+    with timer.step("hyprlock config"):
+        apply_to_hyperpaper_cfg()
+    log(f"apply {os.path.basename(img_path)}: {timer.summary()}")
+    return timer.steps
 
-def generate_cached_thumbnail(filepath: Path, width: int = 170, height: int = 106) -> Optional[str]:
-    """Generate and cache thumbnail for a file.
-
-    Produces a uniformly-sized thumbnail by scaling to cover the target
-    dimensions and then centre-cropping to exactly ``width`` x ``height``.
-    """
-    try:
-        filepath = filepath.expanduser()
-        stat = filepath.stat()
-        cache_key = hashlib.sha256(
-            f"{filepath.resolve()}:{stat.st_mtime_ns}:{stat.st_size}:{width}x{height}".encode()
-        ).hexdigest()
-        thumb_dir = CACHE_DIR / "thumbnails"
-        thumb_dir.mkdir(parents=True, exist_ok=True)
-        thumb_path = thumb_dir / f"{cache_key}.png"
-
-        if thumb_path.exists():
-            return str(thumb_path)
-
-        # Scale to *cover* the target rect, then crop to exact size
-        filters = (
-            f"scale={width}:{height}:force_original_aspect_ratio=increase,"
-            f"crop={width}:{height}"
-        )
-        if filepath.suffix.lower() in {".mp4", ".mkv", ".mov"}:
-            filters = f"thumbnail,{filters}"
-
-        result = no_stdout([
-            "ffmpeg", "-y", "-i", str(filepath),
-            "-vf", filters,
-            "-frames:v", "1", str(thumb_path)
-        ])
-        return str(thumb_path) if result.returncode == 0 and thumb_path.exists() else None
-    except Exception as e:
-        print(f"Failed to generate thumbnail for {filepath}: {e}")
-        return None
 
 def apply_to_hyperpaper_cfg() -> None:
     """Apply wallpaper settings to hyprlock config if it exists."""
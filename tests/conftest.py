@@ -0,0 +1,15 @@
+"""Shared setup: ``src`` on the path and a throwaway home for the caches."""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# utils.constants places the manifest and thumbnail pack under $HOME when
+# first imported, so point it at a scratch directory before any test does.
+_HOME = tempfile.mkdtemp(prefix="wallpygui-tests-")
+atexit.register(shutil.rmtree, _HOME, ignore_errors=True)
+os.environ["HOME"] = _HOME
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
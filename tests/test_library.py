@@ -0,0 +1,177 @@
+import os
+import queue
+
+import pytest
+
+from core.colours import Colours
+from core.library import (FILTER_DIFFERENT, FILTER_LOOSER, FILTER_STRICTER, FILTER_UNCHANGED,
+                          SORT_ASPECT, SORT_HUE, SORT_RESOLUTION, SORT_SIZE, LibraryModel)
+from core.metadata import MediaInfo
+
+# name -> (size in bytes, age in seconds)
+FILES = {
+    "red_sunset.png": (300, 40),
+    "blue_lake.jpg": (100, 30),
+    "blue_sky.png": (200, 20),
+    "forest.mp4": (400, 10),
+}
+
+
+def touch(path, size, age):
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    mtime = 1_700_000_000 - age
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def folder(tmp_path):
+    for name, (size, age) in FILES.items():
+        touch(tmp_path / name, size, age)
+    (tmp_path / "notes.txt").write_text("not a wallpaper")
+    return tmp_path
+
+
+class Owner:
+    """Collects what the model posts to its owning thread and runs it on demand."""
+
+    def __init__(self):
+        self.calls = queue.Queue()
+        self.added = []
+        self.removed = []
+
+    def dispatch(self, fn, *args):
+        self.calls.put((fn, args))
+
+    def run_pending(self):
+        while not self.calls.empty():
+            fn, args = self.calls.get()
+            fn(*args)
+
+    def run_next(self, timeout=5):
+        fn, args = self.calls.get(timeout=timeout)
+        fn(*args)
+
+
+@pytest.fixture
+def owner():
+    return Owner()
+
+
+@pytest.fixture
+def model(folder, owner):
+    model = LibraryModel(dispatch=owner.dispatch,
+                         on_added=owner.added.extend,
+                         on_removed=owner.removed.extend)
+    model.load(str(folder), background=False)
+    owner.run_pending()
+    return model
+
+
+def names(model):
+    return [item.name for item in model.visible()]
+
+
+def test_load_lists_supported_files_newest_first(model):
+    assert not model.loading
+    assert names(model) == ["forest.mp4", "blue_sky.png", "blue_lake.jpg", "red_sunset.png"]
+    assert model.playlist() == [item.path for item in model.visible()]
+
+
+def test_search_filters_and_reports_the_change(model):
+    assert model.search("blue") == FILTER_STRICTER
+    assert names(model) == ["blue_sky.png", "blue_lake.jpg"]
+    assert model.search("blue sky") == FILTER_STRICTER
+    assert names(model) == ["blue_sky.png"]
+    assert model.search("blue") == FILTER_LOOSER
+    assert model.search("red") == FILTER_DIFFERENT
+    assert model.search("") == FILTER_LOOSER
+    assert len(names(model)) == len(FILES)
+
+
+def test_duplicate_groups_come_in_group_order(model, folder):
+    groups = [[str(folder / "red_sunset.png"), str(folder / "blue_sky.png")]]
+    assert model.show_duplicates(groups) == FILTER_STRICTER
+    assert names(model) == ["red_sunset.png", "blue_sky.png"]
+    assert model.show_duplicates(None) == FILTER_LOOSER
+    assert model.show_duplicates(None) == FILTER_UNCHANGED
+
+
+def test_sort_by_size(model):
+    model.set_sort(SORT_SIZE)
+    assert names(model) == ["forest.mp4", "red_sunset.png", "blue_sky.png", "blue_lake.jpg"]
+
+
+def test_unknown_sort_mode_is_rejected(model):
+    with pytest.raises(ValueError):
+        model.set_sort("alphabetical")
+
+
+def test_media_sorts_put_unindexed_items_last(model, folder):
+    model.set_media({
+        str(folder / "blue_lake.jpg"): MediaInfo(3840, 2160, 0.0, "jpeg"),
+        str(folder / "blue_sky.png"): MediaInfo(1920, 1200, 0.0, "png"),
+        str(folder / "forest.mp4"): MediaInfo(2560, 1080, 12.0, "h264"),
+    })
+    model.set_sort(SORT_RESOLUTION)
+    assert names(model) == ["blue_lake.jpg", "forest.mp4", "blue_sky.png", "red_sunset.png"]
+    model.set_sort(SORT_ASPECT)
+    assert names(model) == ["forest.mp4", "blue_lake.jpg", "blue_sky.png", "red_sunset.png"]
+
+
+def test_media_filter_updates_as_the_index_fills(model, folder):
+    assert model.filter_media(min_width=2560) == FILTER_STRICTER
+    assert names(model) == []
+    assert model.needs_media()
+    assert model.set_media({str(folder / "blue_lake.jpg"): MediaInfo(3840, 2160, 0.0, "jpeg"),
+                            str(folder / "blue_sky.png"): MediaInfo(1920, 1080, 0.0, "png")}
+                           ) == FILTER_LOOSER
+    assert names(model) == ["blue_lake.jpg"]
+    assert model.filter_media(aspect="16:9") == FILTER_LOOSER
+    assert names(model) == ["blue_sky.png", "blue_lake.jpg"]
+    assert model.filter_media() == FILTER_LOOSER
+    assert not model.needs_media()
+
+
+def test_colour_filter_and_hue_sort(model, folder):
+    model.set_colours({
+        str(folder / "red_sunset.png"): Colours(0xCC2020, ((0xCC2020, 0.8), (0x101010, 0.2))),
+        str(folder / "blue_lake.jpg"): Colours(0x2040CC, ((0x2040CC, 0.6), (0xEEEEEE, 0.4))),
+        str(folder / "blue_sky.png"): Colours(0x3060E0, ((0xEEEEEE, 0.7), (0x3060E0, 0.3))),
+    })
+    assert model.filter_colour("blue") == FILTER_STRICTER
+    assert names(model) == ["blue_sky.png", "blue_lake.jpg"]
+    assert model.filter_colour("blue") == FILTER_UNCHANGED
+    assert model.filter_colour(None) == FILTER_LOOSER
+
+    model.set_sort(SORT_HUE)
+    assert model.needs_colours()
+    # Chromatic by hue (red before blue), then neutrals, then items without colours
+    assert names(model) == ["red_sunset.png", "blue_lake.jpg", "blue_sky.png", "forest.mp4"]
+
+
+def test_apply_changes_adds_removes_and_replaces(model, folder, owner):
+    os.remove(folder / "blue_lake.jpg")
+    touch(folder / "night.webp", 50, 0)
+    touch(folder / "red_sunset.png", 900, 5)
+    model.apply_changes([str(folder / "blue_lake.jpg"), str(folder / "night.webp"),
+                         str(folder / "red_sunset.png"), str(folder / "forest.mp4")])
+    owner.run_next()
+
+    assert sorted(item.name for item in owner.removed) == ["blue_lake.jpg", "red_sunset.png"]
+    added = [item.name for item in owner.added[len(FILES):]]
+    assert sorted(added) == ["night.webp", "red_sunset.png"]
+    assert names(model) == ["night.webp", "red_sunset.png", "forest.mp4", "blue_sky.png"]
+    assert model.items[str(folder / "red_sunset.png")].stat.st_size == 900
+
+
+def test_apply_changes_from_a_previous_load_is_ignored(model, folder, owner):
+    touch(folder / "night.webp", 50, 0)
+    model.apply_changes([str(folder / "night.webp")])
+    stale = owner.calls.get(timeout=5)  # posted, but not run until after the reload
+    touch(folder / "night.webp", 80, 0)
+    model.load(str(folder), background=False)
+    owner.calls.put(stale)
+    owner.run_pending()
+    assert not owner.removed
+    assert model.items[str(folder / "night.webp")].stat.st_size == 80
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from core.scanner import scan_newest_first
+
+
+@pytest.fixture
+def folder(tmp_path):
+    # Ages shuffled against the names, so directory order says nothing about age
+    for i in range(200):
+        path = tmp_path / f"{i:03d}.png"
+        path.write_bytes(b"")
+        os.utime(path, (1_700_000_000 + (i * 37) % 200, 1_700_000_000 + (i * 37) % 200))
+    (tmp_path / "notes.txt").write_text("not a wallpaper")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "deep.jpg").write_bytes(b"")
+    return tmp_path
+
+
+def mtimes(batch):
+    return [e.stat.st_mtime_ns for e in batch]
+
+
+def test_batches_are_newest_first(folder):
+    batches = list(scan_newest_first(str(folder), batch_size=50, first=16))
+    assert len(batches[0]) == 16
+    flat = [e for batch in batches for e in batch]
+    assert len(flat) == 200
+    assert mtimes(flat) == sorted(mtimes(flat), reverse=True)
+
+
+def test_slow_walk_yields_a_provisional_first_batch(folder):
+    batches = list(scan_newest_first(str(folder), batch_size=50, first=16, first_seconds=0))
+    assert mtimes(batches[0]) == sorted(mtimes(batches[0]), reverse=True)
+    rest = [e for batch in batches[1:] for e in batch]
+    assert mtimes(rest) == sorted(mtimes(rest), reverse=True)
+    names = [e.name for batch in batches for e in batch]
+    assert len(names) == len(set(names)) == 200
+
+
+def test_recursive_scan_finds_subfolders(folder):
+    names = {e.name for batch in scan_newest_first(str(folder), recursive=True) for e in batch}
+    assert "deep.jpg" in names
+    assert "notes.txt" not in names
@@ -0,0 +1,71 @@
+from core.search_index import NameIndex, normalize
+
+
+def build(names, fuzzy=True):
+    index = NameIndex(fuzzy=fuzzy)
+    for name in names:
+        index.add(name, name)
+    return index
+
+
+def test_normalize_folds_case_accents_and_separators():
+    assert normalize("Café_Night-Sky.v2") == "cafe night sky v2"
+
+
+def test_empty_query_means_no_search():
+    index = build(["forest.png"])
+    assert index.search("") is None
+    assert index.search("   ") is None
+
+
+def test_substring_matches_rank_above_fuzzy_ones():
+    index = build(["mountain_lake.png", "my_old_tree.jpg", "desert.png"])
+    scores = index.search("mountain")
+    assert set(scores) == {"mountain_lake.png"}
+    assert scores["mountain_lake.png"] >= 1.1
+
+    scores = index.search("mot")
+    assert scores["mountain_lake.png"] < 1
+    assert "desert.png" not in scores
+
+
+def test_without_fuzzy_only_substrings_match():
+    index = build(["mountain_lake.png", "mist.png"], fuzzy=False)
+    assert index.search("mtn") == {}
+    assert set(index.search("lake")) == {"mountain_lake.png"}
+
+
+def test_refining_a_query_keeps_results_consistent():
+    index = build(["red_car.png", "red_sunset.png", "blue_car.png"])
+    assert set(index.search("red")) == {"red_car.png", "red_sunset.png"}
+    assert set(index.search("red c")) == {"red_car.png"}
+    assert set(index.search("car")) == {"red_car.png", "blue_car.png"}
+
+
+def test_remove_and_clear():
+    index = build(["a_cat.png", "b_cat.png"])
+    index.remove("a_cat.png")
+    assert len(index) == 1
+    assert set(index.search("cat")) == {"b_cat.png"}
+    index.clear()
+    assert len(index) == 0
+    assert index.search("cat") == {}
+
+
+def test_short_queries_match_substrings_ranked_by_position():
+    index = build(["sky.png", "blue_sky.png", "husky.png", "tree.png"])
+    scores = index.search("sk")
+    assert set(scores) == {"sky.png", "blue_sky.png", "husky.png"}
+    assert scores["sky.png"] > scores["blue_sky.png"] > scores["husky.png"]
+    for name, score in scores.items():
+        assert index.score("sk", name) == score
+    # No fuzzy matches for short queries
+    assert index.search("st") == {}
+
+
+def test_fuzzy_matches_only_fill_in_for_few_substring_hits():
+    names = [f"sunset_{i}.png" for i in range(30)] + ["seaside_unit.png"]
+    index = build(names)
+    assert "seaside_unit.png" not in index.search("sun")
+    assert set(index.search("suni")) == {"seaside_unit.png"}
+    assert index.score("suni", "seaside_unit.png") == index.search("suni")["seaside_unit.png"]
@@ -0,0 +1,90 @@
+import pytest
+
+from core.thumbnail_pack import Thumbnail, ThumbnailPack
+
+KEY_A = "aa" * 32
+KEY_B = "bb" * 32
+
+
+@pytest.fixture
+def pack(tmp_path):
+    pack = ThumbnailPack(tmp_path / "thumbnails.pack")
+    yield pack
+    pack._close()
+
+
+def pixels(width, height, channels, value):
+    return bytes([value]) * (width * height * channels)
+
+
+def test_put_and_get(pack):
+    pack.put(KEY_A, 4, 3, 3, pixels(4, 3, 3, 7))
+    thumb = pack.get(KEY_A)
+    assert thumb == Thumbnail(4, 3, 3, pixels(4, 3, 3, 7))
+    assert thumb.stride == 12
+    assert KEY_A in pack
+    assert pack.get(KEY_B) is None
+
+
+def test_get_many_skips_missing_keys(pack):
+    pack.put(KEY_A, 2, 2, 4, pixels(2, 2, 4, 1))
+    found = pack.get_many([KEY_A, KEY_B])
+    assert list(found) == [KEY_A]
+
+
+def test_records_survive_reopening(tmp_path, pack):
+    pack.put(KEY_A, 2, 2, 3, pixels(2, 2, 3, 9))
+    other = ThumbnailPack(pack.path)
+    try:
+        assert other.get(KEY_A).pixels == pixels(2, 2, 3, 9)
+    finally:
+        other._close()
+
+
+def test_other_instances_see_appends(pack):
+    other = ThumbnailPack(pack.path)
+    try:
+        other.put(KEY_B, 1, 1, 3, b"\x01\x02\x03")
+        assert KEY_B in pack
+        assert pack.get(KEY_B).pixels == b"\x01\x02\x03"
+    finally:
+        other._close()
+
+
+def test_delete_and_compact(pack):
+    pack.put(KEY_A, 8, 8, 3, pixels(8, 8, 3, 1))
+    pack.put(KEY_B, 8, 8, 3, pixels(8, 8, 3, 2))
+    pack.delete([KEY_A])
+    assert KEY_A not in pack
+    assert pack.stats()["dead_bytes"] > 0
+
+    reclaimed = pack.compact()
+    assert reclaimed > 0
+    stats = pack.stats()
+    assert stats["entries"] == 1
+    assert stats["dead_bytes"] == 0
+    assert pack.keys() == [KEY_B]
+    assert pack.get(KEY_B).pixels == pixels(8, 8, 3, 2)
+
+
+def test_overwrite_keeps_newest(pack):
+    pack.put(KEY_A, 1, 1, 3, b"\x00\x00\x00")
+    pack.put(KEY_A, 1, 1, 3, b"\xff\xff\xff")
+    assert pack.get(KEY_A).pixels == b"\xff\xff\xff"
+    assert pack.sizes().keys() == {KEY_A}
+
+
+def test_torn_tail_is_truncated_and_unmapped(pack):
+    pack.put(KEY_A, 2, 2, 3, pixels(2, 2, 3, 5))
+    # A writer that crashed mid-record leaves a partial header behind
+    with open(pack.path, "ab") as f:
+        f.write(b"WREC" + b"\0" * 20000)
+    assert KEY_B not in pack
+
+    pack.put(KEY_B, 1, 1, 3, b"\x01\x02\x03")
+    size = pack.path.stat().st_size
+    assert size < 20000
+    assert len(pack._map) == size
+    assert pack.stats()["file_bytes"] == size
+    assert pack.get(KEY_A).pixels == pixels(2, 2, 3, 5)
+    assert pack.get(KEY_B).pixels == b"\x01\x02\x03"
@@ -0,0 +1,102 @@
+import os
+import queue
+
+import pytest
+
+from core import thumbnails
+from core.library import LibraryModel
+from core.thumbnail_manifest import get_manifest
+from core.thumbnail_pack import RECORD, RECORD_MAGIC, get_pack
+from core.thumbnails import ThumbnailScheduler
+from core.worker_pool import WorkerPool
+from utils.constants import THUMB_HEIGHT, THUMB_WIDTH
+
+CORRUPT_KEY = "cd" * 32
+PIXELS = b"\x10\x20\x30" * (THUMB_WIDTH * THUMB_HEIGHT)
+
+
+@pytest.fixture
+def corrupt(tmp_path, monkeypatch):
+    """A wallpaper whose cached thumbnail record is unreadable, and a counting renderer."""
+    path = tmp_path / "wallpaper.mp4"  # a video, so no in-process image loader is tried
+    path.write_bytes(b"\0" * 64)
+    st = os.stat(path)
+    pack = get_pack()
+    pack._append([(RECORD.pack(RECORD_MAGIC, bytes.fromhex(CORRUPT_KEY), THUMB_WIDTH,
+                               THUMB_HEIGHT, 0, 3, 8), b"not zlib")])
+    get_manifest().record(str(path), st.st_mtime_ns, st.st_size, THUMB_WIDTH, THUMB_HEIGHT,
+                          CORRUPT_KEY)
+    renders = []
+
+    def render(filepath, width, height):
+        renders.append(filepath)
+        return PIXELS
+
+    monkeypatch.setattr(thumbnails, "ffmpeg_thumbnail", render)
+    return path, renders
+
+
+def loaded_model(directory):
+    calls = queue.Queue()
+    model = LibraryModel(dispatch=lambda fn, *args: calls.put((fn, args)))
+    model.load(str(directory), background=False)
+    while not calls.empty():
+        fn, args = calls.get()
+        fn(*args)
+    return model, calls
+
+
+def run(calls, done, limit=20):
+    """Run posted callbacks until ``done()``; bounded, so a retry loop fails instead of hanging."""
+    for _ in range(limit):
+        if done():
+            return
+        fn, args = calls.get(timeout=5)
+        fn(*args)
+    raise AssertionError("still not done after %d callbacks" % limit)
+
+
+def test_corrupt_thumbnail_is_rendered_again(corrupt):
+    path, renders = corrupt
+    model, calls = loaded_model(path.parent)
+    item = model.items[str(path)]
+    assert item.thumbnail == CORRUPT_KEY
+
+    ready = []
+
+    def decode(key):
+        return get_pack().get(key)
+
+    def on_ready(item, key, decoded):
+        ready.append((key, decoded))
+        item.thumbnail = key
+
+    scheduler = ThumbnailScheduler(model, pool=WorkerPool(max_workers=1), decode=decode,
+                                   on_ready=on_ready)
+    scheduler.request_decode(item)
+    run(calls, lambda: ready or item.thumbnail_failed)
+
+    assert len(renders) == 1
+    assert not item.thumbnail_failed
+    key, decoded = ready[0]
+    assert key != CORRUPT_KEY
+    assert item.thumbnail == key
+    assert decoded.pixels == PIXELS
+
+
+def test_thumbnail_still_unreadable_after_rendering_fails(corrupt):
+    path, renders = corrupt
+    model, calls = loaded_model(path.parent)
+    item = model.items[str(path)]
+
+    scheduler = ThumbnailScheduler(model, pool=WorkerPool(max_workers=1),
+                                   decode=lambda key: None,
+                                   on_ready=lambda item, key, decoded: (
+                                       setattr(item, "thumbnail", key),
+                                       scheduler.request_decode(item)))
+    scheduler.request_decode(item)
+    run(calls, lambda: item.thumbnail_failed)
+
+    assert len(renders) == 1
+    assert scheduler.failed == 1
+    assert calls.empty()
@@ -3,11 +3,24 @@
 
 import sys
 import os
+import time
+
+# Start of the clock for startup marks (see utils/perf.py). benchmarks/startup.py
+# passes its own, taken before the interpreter started; it is removed from the
+# environment so processes started by the app don't inherit it.
+_T0 = float(os.environ.pop("WALLPYGUI_T0", "") or time.time())
 
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from main import main
-
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Subcommands run without loading GTK
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from utils import perf
+    perf.set_start(_T0)
+
+    from main import main
     main()